@@ -2,14 +2,24 @@
 
 This module creates a deep underwriting agent that coordinates specialized sub-agents
 to process auto loan applications and make risk-based decisions.
+
+The graph is compiled once per process and shared by every application. The
+applicant name and date of a run are passed in the run config (see
+`loan_run_config`) and filled into the agents' prompts at model-call time.
 """
 
+import re
+import threading
+import uuid
 from datetime import datetime
-from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
 
 from deepagents import create_deep_agent
 from deepagents.backends import CompositeBackend, FilesystemBackend, StateBackend
+from langchain.agents.middleware import AgentMiddleware, ModelRequest, ModelResponse
 from langchain.chat_models import init_chat_model
+from langchain_core.runnables import RunnableConfig
+from langgraph.config import get_config
 from langgraph.graph.state import CompiledStateGraph
 
 from agents.loan_underwriting import (
@@ -19,24 +29,134 @@ from agents.loan_underwriting import (
     RISK_CALCULATION_AGENT_INSTRUCTIONS,
     ask_box_ai_about_loan,
     calculate,
+    calculate_batch,
+    compute_risk_metrics,
     extract_structured_loan_data,
+    extract_structured_loan_data_batch,
     list_loan_documents,
+    lookup_policy_rule,
     search_loan_folder,
+    search_policy_index,
     think_tool,
     upload_text_file_to_box,
 )
 from app_config import conf
+from utils.agent_metrics import AgentMetrics, AgentMetricsCallbackHandler
 
+_loan_orchestrator: Optional[CompiledStateGraph] = None
+_loan_orchestrator_lock = threading.Lock()
 
-def loan_orchestrator_create(applicant_name: str) -> CompiledStateGraph:
-    """Create the loan underwriting orchestrator agent.
+
+class LoanRunPromptMiddleware(AgentMiddleware):
+    """Fill an agent's prompt template with the applicant and date of the run.
+
+    The values are read from the run config (`configurable`), which is
+    inherited by the sub-agents, so one compiled graph serves every applicant.
+    """
+
+    def __init__(self, template: str) -> None:
+        """Create the middleware.
+
+        Args:
+            template: Prompt with `{applicant_name}` and `{date}` placeholders
+        """
+        super().__init__()
+        self.template = template
+
+    def _with_run_prompt(self, request: ModelRequest) -> ModelRequest:
+        configurable = get_config().get("configurable", {})
+        applicant_name = configurable.get("applicant_name")
+        if not applicant_name:
+            raise ValueError(
+                "The run config has no applicant_name, use loan_run_config()"
+            )
+        prompt = self.template.format(
+            date=configurable.get("current_date")
+            or datetime.now().strftime("%Y-%m-%d"),
+            applicant_name=applicant_name,
+        )
+        # Keep the instructions the deep agent middleware added
+        if request.system_prompt:
+            prompt = f"{prompt}\n\n{request.system_prompt}"
+        return request.override(system_prompt=prompt)
+
+    def wrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], ModelResponse],
+    ) -> ModelResponse:
+        return handler(self._with_run_prompt(request))
+
+    async def awrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], Awaitable[ModelResponse]],
+    ) -> ModelResponse:
+        return await handler(self._with_run_prompt(request))
+
+
+def loan_run_config(
+    applicant_name: str,
+    current_date: Optional[str] = None,
+    thread_id: Optional[str] = None,
+    **configurable: Any,
+) -> RunnableConfig:
+    """Build the run config of one loan application.
+
+    Args:
+        applicant_name: Name of the loan applicant
+        current_date: Date given to the agents (default: today, YYYY-MM-DD)
+        thread_id: Conversation thread (default: a new unique ID)
+        **configurable: Extra `configurable` entries
 
     Returns:
-        CompiledStateGraph: The configured deep agent for loan underwriting
+        RunnableConfig: Config to pass to `invoke`/`astream` of the orchestrator
+    """
+    config: RunnableConfig = {
+        "configurable": {
+            **configurable,
+            "applicant_name": applicant_name,
+            "current_date": current_date or datetime.now().strftime("%Y-%m-%d"),
+            "thread_id": thread_id or f"{applicant_name}-{uuid.uuid4().hex}",
+        }
+    }
+    if conf.AGENT_METRICS_ENABLED:
+        # Inherited by the sub-agents, models and tools of the run
+        config["callbacks"] = [
+            AgentMetricsCallbackHandler(
+                "loan_underwriting",
+                on_run_end=lambda metrics: write_run_metrics(applicant_name, metrics),
+            )
+        ]
+    return config
+
+
+def write_run_metrics(applicant_name: str, metrics: AgentMetrics) -> None:
+    """Write the metrics of a run to the applicant's memories folder.
+
+    Writes `{applicant_name}_metrics.md` (summary tables) and
+    `{applicant_name}_metrics.json` (latency histograms and totals).
+
+    Args:
+        applicant_name: Name of the loan applicant
+        metrics: Metrics of the run
     """
-    # Get current date for context
-    current_date = datetime.now().strftime("%Y-%m-%d")
+    folder = conf.local_agents_memory / applicant_name
+    folder.mkdir(parents=True, exist_ok=True)
+    (folder / f"{applicant_name}_metrics.md").write_text(
+        metrics.summary_markdown(f"Run Metrics: {applicant_name}"), encoding="utf-8"
+    )
+    (folder / f"{applicant_name}_metrics.json").write_text(
+        metrics.to_json(), encoding="utf-8"
+    )
+
+
+def _build_loan_orchestrator() -> CompiledStateGraph:
+    """Build and compile the loan underwriting orchestrator agent.
 
+    Returns:
+        CompiledStateGraph: The configured deep agent for loan underwriting
+    """
     # Define sub-agents for loan processing workflow
 
     # Sub-agent 1: Document Extraction & Box Integration
@@ -47,14 +167,15 @@ def loan_orchestrator_create(applicant_name: str) -> CompiledStateGraph:
             "Use this agent to locate folders, list documents, and extract structured data from loan files."
             "A box_upload_cache.json file exists in the memories folder with the location of all demo files in box."
         ),
-        "system_prompt": BOX_EXTRACT_AGENT_INSTRUCTIONS.format(
-            date=current_date, applicant_name=applicant_name
-        ),
+        "system_prompt": "",
+        "middleware": [LoanRunPromptMiddleware(BOX_EXTRACT_AGENT_INSTRUCTIONS)],
         "tools": [
             search_loan_folder,
             list_loan_documents,
+            search_policy_index,  # Local full-text search, before Box AI
             ask_box_ai_about_loan,
             extract_structured_loan_data,
+            extract_structured_loan_data_batch,
             think_tool,
             # upload_text_file_to_box,
         ],
@@ -68,10 +189,11 @@ def loan_orchestrator_create(applicant_name: str) -> CompiledStateGraph:
             "Use this agent to query policy thresholds, approval authority levels, and compliance rules."
             "A box_upload_cache.json file exists in the memories folder with the location of all demo files in box."
         ),
-        "system_prompt": POLICY_AGENT_INSTRUCTIONS.format(
-            date=current_date, applicant_name=applicant_name
-        ),
+        "system_prompt": "",
+        "middleware": [LoanRunPromptMiddleware(POLICY_AGENT_INSTRUCTIONS)],
         "tools": [
+            lookup_policy_rule,  # Compiled policy rule table, answers locally
+            search_policy_index,  # Local full-text search of the policy documents
             ask_box_ai_about_loan,  # Can query policy documents in Box
             think_tool,
             # upload_text_file_to_box,
@@ -86,10 +208,11 @@ def loan_orchestrator_create(applicant_name: str) -> CompiledStateGraph:
             "Use this agent to calculate DTI, LTV, identify policy violations, and assess risk levels."
             "A box_upload_cache.json file exists in the memories folder with the location of all demo files in box."
         ),
-        "system_prompt": RISK_CALCULATION_AGENT_INSTRUCTIONS.format(
-            date=current_date, applicant_name=applicant_name
-        ),
+        "system_prompt": "",
+        "middleware": [LoanRunPromptMiddleware(RISK_CALCULATION_AGENT_INSTRUCTIONS)],
         "tools": [
+            compute_risk_metrics,
+            calculate_batch,
             calculate,
             think_tool,
             # upload_text_file_to_box,
@@ -125,9 +248,7 @@ def loan_orchestrator_create(applicant_name: str) -> CompiledStateGraph:
     agent = create_deep_agent(
         model=model,
         tools=[upload_text_file_to_box],
-        system_prompt=LOAN_ORCHESTRATOR_INSTRUCTIONS.format(
-            date=current_date, applicant_name=applicant_name
-        ),
+        middleware=[LoanRunPromptMiddleware(LOAN_ORCHESTRATOR_INSTRUCTIONS)],
         subagents=[
             box_extract_agent,
             policy_agent,
@@ -138,3 +259,65 @@ def loan_orchestrator_create(applicant_name: str) -> CompiledStateGraph:
     )
 
     return agent
+
+
+def get_loan_orchestrator() -> CompiledStateGraph:
+    """Return the loan underwriting orchestrator, compiling it on first use.
+
+    The graph is shared by every application of the process: pass the
+    applicant with `config=loan_run_config(applicant_name)` on each run.
+
+    Returns:
+        CompiledStateGraph: The shared deep agent for loan underwriting
+    """
+    global _loan_orchestrator
+    if _loan_orchestrator is None:
+        with _loan_orchestrator_lock:
+            if _loan_orchestrator is None:
+                _loan_orchestrator = _build_loan_orchestrator()
+    return _loan_orchestrator
+
+
+def loan_orchestrator_create(applicant_name: str) -> CompiledStateGraph:
+    """Create the loan underwriting orchestrator agent for one applicant.
+
+    Binds the run config of the applicant to the shared compiled graph,
+    nothing is rebuilt.
+
+    Args:
+        applicant_name: Name of the loan applicant
+
+    Returns:
+        CompiledStateGraph: The configured deep agent for loan underwriting
+    """
+    return get_loan_orchestrator().with_config(loan_run_config(applicant_name))
+
+
+DECISION_PATTERN = re.compile(
+    r"AUTO[- ]APPROVE|HUMAN REVIEW|ESCALATION(?: REQUIRED)?|AUTO[- ]DENY",
+    re.IGNORECASE,
+)
+
+
+def extract_loan_decision(state: Dict[str, Any]) -> str:
+    """Find the underwriting decision in the final message of a run.
+
+    Args:
+        state: Final state returned by `invoke`/`ainvoke` of the orchestrator
+
+    Returns:
+        str: AUTO-APPROVE, HUMAN REVIEW, ESCALATION REQUIRED, AUTO-DENY or UNKNOWN
+    """
+    messages = state.get("messages", [])
+    if not messages:
+        return "UNKNOWN"
+    text = getattr(messages[-1], "text", None) or str(messages[-1].content)
+    # Prefer the "**Decision:** ..." line of the report format
+    decision_line = re.search(r"Decision:\**\s*(.+)", text)
+    match = DECISION_PATTERN.search(decision_line.group(1) if decision_line else "")
+    match = match or DECISION_PATTERN.search(text)
+    if not match:
+        return "UNKNOWN"
+    decision = match.group(0).upper().replace("AUTO ", "AUTO-")
+    # A bare "Escalation" is the same outcome as "Escalation Required"
+    return "ESCALATION REQUIRED" if decision.startswith("ESCALATION") else decision
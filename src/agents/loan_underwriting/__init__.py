@@ -10,9 +10,14 @@ from agents.loan_underwriting.loan_prompts import (
 from agents.loan_underwriting.loan_tools import (
     ask_box_ai_about_loan,
     calculate,
+    calculate_batch,
+    compute_risk_metrics,
     extract_structured_loan_data,
+    extract_structured_loan_data_batch,
     list_loan_documents,
+    lookup_policy_rule,
     search_loan_folder,
+    search_policy_index,
     think_tool,
     upload_text_file_to_box,
 )
@@ -25,9 +30,14 @@ __all__ = [
     "BOX_UPLOADER_AGENT_INSTRUCTIONS",
     "search_loan_folder",
     "list_loan_documents",
+    "lookup_policy_rule",
+    "search_policy_index",
     "ask_box_ai_about_loan",
     "extract_structured_loan_data",
+    "extract_structured_loan_data_batch",
     "think_tool",
     "calculate",
+    "calculate_batch",
+    "compute_risk_metrics",
     "upload_text_file_to_box",
 ]
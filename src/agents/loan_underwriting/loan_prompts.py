@@ -208,6 +208,7 @@ Return data in this JSON format:
 
 ## Available Tools
 
+- `search_policy_index()`: Search the text of the applicant's documents locally (pass `applicant_name`). Use it first to find a single value or passage; if it reports no good match, use `ask_box_ai_about_loan()`
 - `read_file()`: Read any file from the application folder
 - `list_directory()`: List contents of a directory
 - `think_tool()`: Reflect on extraction progress
@@ -256,6 +257,9 @@ When asked about policy rules:
 
 ## Available Tools
 
+- `lookup_policy_rule()`: Look up thresholds, violation levels and approval authority from the compiled policy rule table. Answers instantly and cites the source document, section and version. Use it first for any threshold or authority question.
+- `search_policy_index()`: Search the policy documents locally for any other policy question. Returns ranked passages with their source document and section.
+- `ask_box_ai_about_loan()`: Ask Box AI about the policy documents, only when neither tool finds a good match
 - `read_file()`: Read policy documents
 - `think_tool()`: Reflect on policy interpretation
 
@@ -274,11 +278,16 @@ When answering policy questions, structure your response:
 ## Example Queries
 
 - "What is the maximum DTI ratio for standard approval?"
+  → `lookup_policy_rule(metric="dti")`
   → Answer: 43% per Auto Loan Underwriting Standards
 - "What LTV is allowed for a 3-year-old used vehicle?"
-  → Answer: 100% per Vehicle Valuation Guidelines Section 2.2
-- "What approval level is needed for DTI between 43-45%?"
-  → Answer: Senior Underwriter per Exception Approval Authority
+  → `lookup_policy_rule(metric="ltv", vehicle_type="used", vehicle_age=3)`
+  → Answer: 115% per Auto Loan Underwriting Standards, Collateral Standards
+- "What approval level is needed for a DTI of 44%?"
+  → `lookup_policy_rule(metric="dti", value=0.44)`
+  → Answer: Minor violation, Manager Approval per Exception Approval Authority
+- "What documents are required for self-employed applicants?"
+  → `search_policy_index(query="self-employed required documents")`
 """
 
 RISK_CALCULATION_AGENT_INSTRUCTIONS = """
@@ -389,7 +398,9 @@ Return structured risk assessment:
 
 ## Available Tools
 
-- `calculate()`: Perform mathematical calculations
+- `compute_risk_metrics()`: Compute the complete risk assessment (all metrics, violations, depreciation and risk level) in one call. Pass the application data from the box-extract-agent as JSON. Use it first.
+- `calculate_batch()`: Evaluate several named calculations that reference each other in one call (e.g. `{{"monthly_debt": "1200 + 380", "income": 5200, "dti": "round(monthly_debt / income, 4)"}}`). Prefer it to a sequence of `calculate()` calls
+- `calculate()`: Perform a single additional calculation (e.g. to double-check a figure or handle a case the engine does not cover)
 - `think_tool()`: Show your calculation work
 
 
@@ -4,19 +4,40 @@ This module provides LangChain tool wrappers for Box AI functionality
 used by the loan underwriting sub-agents.
 """
 
+import ast
+import asyncio
+import json
+import logging
+import operator
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from graphlib import CycleError, TopologicalSorter
 from pathlib import Path as PPath
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple, Union
 
 from box_ai_agents_toolkit import (
     box_ai_ask_file_multi,
     box_ai_extract_structured_enhanced_using_fields,
-    box_folder_items_list,
     box_locate_folder_by_name,
 )
-from langchain_core.tools import tool
+from langchain_core.tools import InjectedToolArg, StructuredTool, tool
+from typing_extensions import Annotated
 
+from agents.loan_underwriting.policy_index import policy_search_index
+from agents.loan_underwriting.policy_rules import RATIO_METRICS, policy_rule_table
+from agents.loan_underwriting.risk_engine import compute_risk_assessments
 from app_config import conf
-from utils.box_api_auth import get_box_client
+from utils.box_ai_cache import ask_cache_key, box_ai_cache, folder_file_versions
+from utils.box_api_auth import get_shared_box_client
 from utils.box_api_generic import local_file_upload
+from utils.box_cache import box_folder_items_list_cached
+from utils.box_executor import run_in_box_executor
+from utils.box_rate_limit import PRIORITY_BATCH, box_priority
+from utils.box_trace import box_tracer, traced, with_trace_context
+
+logger = logging.getLogger(__name__)
 
 
 @tool(parse_docstring=True)
@@ -30,12 +51,11 @@ def search_loan_folder(applicant_name: str) -> str:
         Folder ID and path information
     """
     try:
-        if conf.box_client is None:
-            conf.box_client = get_box_client()
+        client = get_shared_box_client()
         # Search for folder in Box
         parent_folder_id = conf.BOX_DEMO_PARENT_FOLDER
         folder = box_locate_folder_by_name(
-            client=conf.box_client,
+            client=client,
             folder_name=applicant_name,
             parent_folder_id=parent_folder_id,
         )
@@ -59,11 +79,8 @@ def list_loan_documents(folder_id: str) -> str:
         List of files in the folder with names and IDs
     """
     try:
-        if conf.box_client is None:
-            conf.box_client = get_box_client()
-        response = box_folder_items_list(
-            client=conf.box_client, folder_id=folder_id, is_recursive=False
-        )
+        client = get_shared_box_client()
+        response = box_folder_items_list_cached(client, folder_id)
 
         result = f"Documents in folder {folder_id}:\n\n"
 
@@ -86,7 +103,11 @@ def list_loan_documents(folder_id: str) -> str:
 
 
 @tool(parse_docstring=True)
-def ask_box_ai_about_loan(folder_id: str, question: str) -> str:
+def ask_box_ai_about_loan(
+    folder_id: str,
+    question: str,
+    use_cache: Annotated[bool, InjectedToolArg] = True,
+) -> str:
     """Ask Box AI a question about documents in a loan application folder.
 
     Uses Box AI to analyze documents and answer questions about the loan application.
@@ -94,17 +115,15 @@ def ask_box_ai_about_loan(folder_id: str, question: str) -> str:
     Args:
         folder_id: Box folder ID containing the loan application
         question: Question to ask about the loan application
+        use_cache: Serve repeated questions about unchanged documents from the local cache (default: True)
 
     Returns:
         Box AI's response with information from the documents
     """
     try:
-        if conf.box_client is None:
-            conf.box_client = get_box_client()
+        client = get_shared_box_client()
         # First, get all file IDs from the folder
-        folder_response = box_folder_items_list(
-            client=conf.box_client, folder_id=folder_id, is_recursive=False
-        )
+        folder_response = box_folder_items_list_cached(client, folder_id)
 
         file_ids = []
 
@@ -120,10 +139,20 @@ def ask_box_ai_about_loan(folder_id: str, question: str) -> str:
         if not file_ids:
             return f"No files found in folder {folder_id}"
 
-        # Ask Box AI about the files
-        ai_response = box_ai_ask_file_multi(
-            client=conf.box_client, file_ids=file_ids, prompt=question
-        )
+        # Reuse a previous answer if the same question was asked about
+        # the same file versions
+        use_cache = use_cache and conf.BOX_AI_CACHE_ENABLED
+        cache_key = ask_cache_key(folder_file_versions(folder_response), question)
+        ai_response = box_ai_cache.get_ask(cache_key) if use_cache else None
+
+        if ai_response is None:
+            # Ask Box AI about the files
+            with box_tracer.span("box_ai_ask_file_multi", files=len(file_ids)):
+                ai_response = box_ai_ask_file_multi(
+                    client=client, file_ids=file_ids, prompt=question
+                )
+            if use_cache and "AI_response" in ai_response:
+                box_ai_cache.put_ask(cache_key, question, ai_response)
 
         # Format the response
         result = f"Box AI Response for: {question}\n\n"
@@ -144,62 +173,429 @@ def ask_box_ai_about_loan(folder_id: str, question: str) -> str:
         return f"Error asking Box AI about folder {folder_id}: {str(e)}"
 
 
+def _parse_fields_schema(fields_schema: str) -> List[Dict[str, Any]]:
+    """Parse a Box AI extract fields schema passed as a JSON string.
+
+    Raises:
+        ValueError: If the schema is not a JSON array of field definitions
+    """
+    try:
+        fields = json.loads(fields_schema)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Error parsing fields_schema: {str(e)}") from e
+    if not isinstance(fields, list):
+        raise ValueError(
+            "Error: fields_schema must be a JSON array of field definitions"
+        )
+    return fields
+
+
+# Document type (file name prefix) -> keywords of the field keys it holds.
+# A keyword matches whole "_"-separated words of the key: "year" matches
+# vehicle_year, not years_at_address. Checked in order, so more specific
+# document types come first.
+DOCUMENT_TYPE_FIELD_ROUTES: Dict[str, Tuple[str, ...]] = {
+    "tax_return": ("tax", "taxes", "agi", "adjusted_gross", "filing_status"),
+    "trade_in": ("trade_in", "payoff", "negative_equity"),
+    "vehicle_valuation": (
+        "valuation",
+        "appraised",
+        "appraisal",
+        "book_value",
+        "vehicle_value",
+        "market_value",
+    ),
+    "credit_report": (
+        "credit",
+        "score",
+        "debt",
+        "debts",
+        "collection",
+        "collections",
+        "delinquency",
+        "delinquencies",
+        "delinquent",
+        "repossession",
+        "repossessions",
+        "bankruptcy",
+        "bankruptcies",
+        "payment_history",
+        "tradeline",
+        "tradelines",
+    ),
+    "pay_stub": (
+        "income",
+        "gross",
+        "salary",
+        "wage",
+        "wages",
+        "pay",
+        "employment",
+        "employer",
+        "employed",
+        "hire",
+        "hired",
+    ),
+    "purchase_agreement": (
+        "purchase",
+        "price",
+        "down_payment",
+        "loan",
+        "term",
+        "apr",
+        "interest",
+        "dealer",
+    ),
+    "vehicle_info": ("vehicle", "vin", "make", "model", "year", "mileage"),
+    "drivers_license": ("dob", "birth", "license", "address"),
+}
+
+
+def _key_has_keyword(key: str, keyword: str) -> bool:
+    """Check whether the words of a field key contain those of a keyword."""
+    return f"_{keyword}_" in "_" + re.sub(r"[^a-z0-9]+", "_", key.lower()) + "_"
+
+
+@traced()
+def _list_folder_files(
+    folder_id: str,
+) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+    """Return the file items of a folder and their current versions.
+
+    Raises:
+        ValueError: If the folder has no files
+    """
+    client = get_shared_box_client()
+    folder_response = box_folder_items_list_cached(client, folder_id)
+
+    files = [
+        item
+        for item in folder_response.get("folder_items", [])
+        if item.get("type") == "file"
+    ]
+    if not files:
+        raise ValueError(f"No files found in folder {folder_id}")
+    return files, folder_file_versions(folder_response)
+
+
+def _extract_fields(
+    folder_id: str,
+    file_versions: Dict[str, str],
+    fields: List[Dict[str, Any]],
+    use_cache: bool,
+) -> Dict[str, Any]:
+    """Extract fields from a set of files, serving cached fields locally.
+
+    Only the fields missing from the Box AI cache for these file versions
+    are sent to Box AI.
+
+    Raises:
+        ValueError: If Box AI returned an error
+    """
+    use_cache = use_cache and conf.BOX_AI_CACHE_ENABLED
+    answer = box_ai_cache.get_extract_fields(file_versions, fields) if use_cache else {}
+    missing_fields = [field for field in fields if field.get("key") not in answer]
+
+    if missing_fields:
+        # Extract structured data using Box AI
+        with box_tracer.span(
+            "box_ai_extract_structured_enhanced_using_fields",
+            files=len(file_versions),
+            fields=len(missing_fields),
+            cached_fields=len(answer),
+        ):
+            ai_response = box_ai_extract_structured_enhanced_using_fields(
+                client=get_shared_box_client(),
+                file_ids=list(file_versions),
+                fields=missing_fields,
+            )
+        if "error" in ai_response:
+            raise ValueError(
+                f"Error extracting structured data from folder {folder_id}: {ai_response['error']}"
+            )
+
+        extracted = ai_response.get("AI_response", {}).get("answer", {})
+        if isinstance(extracted, dict):
+            if use_cache:
+                box_ai_cache.put_extract_fields(
+                    file_versions, missing_fields, extracted
+                )
+            answer.update(extracted)
+    return answer
+
+
+def _merge_in_schema_order(
+    fields: List[Dict[str, Any]], answer: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Order extracted values like the schema, keeping any extra keys last."""
+    merged = {
+        field["key"]: answer.get(field["key"]) for field in fields if field.get("key")
+    }
+    merged.update({k: v for k, v in answer.items() if k not in merged})
+    return merged
+
+
+@traced()
+def _extract_folder_data(
+    folder_id: str, fields: List[Dict[str, Any]], use_cache: bool = True
+) -> Dict[str, Any]:
+    """Extract structured fields from all files of a folder with Box AI Extract.
+
+    Fields already extracted from the same document versions are served from
+    the Box AI cache; only the missing ones are sent to Box AI.
+
+    Args:
+        folder_id: Box folder ID containing the loan application
+        fields: Field definitions to extract
+        use_cache: Whether to read and populate the extraction cache
+
+    Returns:
+        Extracted values keyed by field key, in schema order
+
+    Raises:
+        ValueError: If the folder has no files or Box AI returned an error
+    """
+    _, file_versions = _list_folder_files(folder_id)
+    answer = _extract_fields(folder_id, file_versions, fields, use_cache)
+    return _merge_in_schema_order(fields, answer)
+
+
+def _route_fields_by_document_type(
+    files: List[Dict[str, Any]], fields: List[Dict[str, Any]]
+) -> Dict[str, Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]:
+    """Group fields with the documents that hold them.
+
+    A field is routed by its optional "documentType" entry, otherwise by the
+    first DOCUMENT_TYPE_FIELD_ROUTES keyword among the words of its key.
+    Fields that match no document present in the folder go to the "all"
+    group, which is extracted against every file.
+
+    Returns:
+        Dictionary of {document_type: (files, fields)}
+    """
+    files_by_type: Dict[str, List[Dict[str, Any]]] = {}
+    for item in files:
+        name = item.get("name", "").lower()
+        for document_type in DOCUMENT_TYPE_FIELD_ROUTES:
+            if name.startswith(document_type):
+                files_by_type.setdefault(document_type, []).append(item)
+                break
+
+    groups: Dict[str, Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]] = {}
+    for field in fields:
+        document_type = field.get("documentType")
+        if document_type not in files_by_type:
+            key = str(field.get("key", "")).lower()
+            document_type = next(
+                (
+                    doc_type
+                    for doc_type, keywords in DOCUMENT_TYPE_FIELD_ROUTES.items()
+                    if doc_type in files_by_type
+                    and any(_key_has_keyword(key, keyword) for keyword in keywords)
+                ),
+                "all",
+            )
+        if document_type not in groups:
+            groups[document_type] = (files_by_type.get(document_type, files), [])
+        groups[document_type][1].append(field)
+    return groups
+
+
+def _extract_folder_data_by_document(
+    folder_id: str, fields: List[Dict[str, Any]], use_cache: bool = True
+) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+    """Extract each field group from its own document type, in parallel.
+
+    Args:
+        folder_id: Box folder ID containing the loan application
+        fields: Field definitions to extract
+        use_cache: Whether to read and populate the extraction cache
+
+    Returns:
+        Tuple of the merged values in schema order and per-document timings
+        {document_type: {"files": [...], "fields": int, "seconds": float}}
+
+    Raises:
+        ValueError: If the folder has no files or any group failed
+    """
+    files, file_versions = _list_folder_files(folder_id)
+    groups = _route_fields_by_document_type(files, fields)
+
+    def extract_group(
+        document_type: str,
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        group_files, group_fields = groups[document_type]
+        group_versions = {item["id"]: file_versions[item["id"]] for item in group_files}
+        started = time.perf_counter()
+        answer = _extract_fields(folder_id, group_versions, group_fields, use_cache)
+        timing = {
+            "files": [item.get("name") for item in group_files],
+            "fields": len(group_fields),
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+        logger.info(
+            "Extracted %d field(s) from %s in %.2fs",
+            timing["fields"],
+            document_type,
+            timing["seconds"],
+        )
+        return answer, timing
+
+    workers = min(len(groups), conf.BOX_BATCH_MAX_CONCURRENCY)
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        outcomes = dict(
+            zip(groups, executor.map(with_trace_context(extract_group), groups))
+        )
+
+    # Routed groups win; the "all" group only fills values still missing
+    merged: Dict[str, Any] = {}
+    timings: Dict[str, Dict[str, Any]] = {}
+    for document_type in sorted(outcomes, key=lambda doc_type: doc_type == "all"):
+        answer, timings[document_type] = outcomes[document_type]
+        for key, value in answer.items():
+            if merged.get(key) is None:
+                merged[key] = value
+
+    # A field routed to the wrong document comes back empty: look for it in
+    # every file, like the extraction without routing does
+    missing_fields = [
+        field
+        for document_type, (_, group_fields) in groups.items()
+        if document_type != "all"
+        for field in group_fields
+        if merged.get(field.get("key")) is None
+    ]
+    if missing_fields:
+        started = time.perf_counter()
+        answer = _extract_fields(folder_id, file_versions, missing_fields, use_cache)
+        timings["fallback"] = {
+            "files": [item.get("name") for item in files],
+            "fields": len(missing_fields),
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+        logger.info(
+            "Re-extracted %d empty routed field(s) from every file in %.2fs",
+            timings["fallback"]["fields"],
+            timings["fallback"]["seconds"],
+        )
+        for key, value in answer.items():
+            if merged.get(key) is None:
+                merged[key] = value
+    return _merge_in_schema_order(fields, merged), timings
+
+
 @tool(parse_docstring=True)
-def extract_structured_loan_data(folder_id: str, fields_schema: str) -> str:
+def extract_structured_loan_data(
+    folder_id: str,
+    fields_schema: str,
+    per_document: bool = False,
+    use_cache: Annotated[bool, InjectedToolArg] = True,
+) -> str:
     """Extract structured data from loan application documents using Box AI Extract.
 
     Args:
         folder_id: Box folder ID containing the loan application
         fields_schema: JSON string defining fields to extract as a list of field definitions, e.g., '[{"type": "string", "key": "applicant_name", "displayName": "Applicant Name"}, {"type": "number", "key": "credit_score", "displayName": "Credit Score"}]'
+        per_document: Route each field to the document type that holds it (e.g. credit score to the credit report, gross income to the pay stub) and extract the groups in parallel. A field may name its document with "documentType", e.g. "pay_stub" (default: False)
+        use_cache: Reuse fields already extracted from the same document versions (default: True)
 
     Returns:
         Extracted structured data from the documents
     """
-    import json
+    try:
+        fields = _parse_fields_schema(fields_schema)
+        if not per_document:
+            data = _extract_folder_data(folder_id, fields, use_cache)
+            return f"Extracted Data from Folder {folder_id}:\n\n" + json.dumps(
+                data, indent=2
+            )
 
+        data, timings = _extract_folder_data_by_document(folder_id, fields, use_cache)
+        result = f"Extracted Data from Folder {folder_id}:\n\n"
+        result += json.dumps(data, indent=2)
+        result += "\n\nPer-document timings:\n"
+        for document_type, timing in timings.items():
+            result += f"  - {document_type} ({', '.join(timing['files'])}): {timing['fields']} field(s) in {timing['seconds']}s\n"
+        return result
+    except ValueError as e:
+        return str(e)
+    except Exception as e:
+        return f"Error extracting structured data from folder {folder_id}: {str(e)}"
+
+
+def _extract_folder_result(
+    folder_id: str, fields: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Extract one folder and wrap the outcome as {"data": ...} or {"error": ...}.
+
+    Runs with batch priority, so interactive Box calls are served first
+    when the rate limit is reached.
+    """
     try:
-        if conf.box_client is None:
-            conf.box_client = get_box_client()
-        # First, get all file IDs from the folder
-        folder_response = box_folder_items_list(
-            client=conf.box_client, folder_id=folder_id, is_recursive=False
-        )
+        with box_priority(PRIORITY_BATCH):
+            return {"data": _extract_folder_data(folder_id, fields)}
+    except Exception as e:
+        logger.warning("Batch extraction failed for folder %s: %s", folder_id, e)
+        return {"error": str(e)}
 
-        file_ids = []
-        for item in folder_response.get("folder_items", []):
-            if item.get("type") == "file":
-                file_ids.append(item.get("id"))
-        # if isinstance(folder_response, dict) and "items" in folder_response:
-        #     for item in folder_response["items"]:
-        #         if item.get("type") == "file":
-        #             file_ids.append(item.get("id"))
-        if not file_ids:
-            return f"No files found in folder {folder_id}"
 
-        # Parse the fields schema
-        try:
-            fields = json.loads(fields_schema)
-            if not isinstance(fields, list):
-                return "Error: fields_schema must be a JSON array of field definitions"
-        except json.JSONDecodeError as e:
-            return f"Error parsing fields_schema: {str(e)}"
+@tool(parse_docstring=True)
+def extract_structured_loan_data_batch(
+    folder_ids: List[str],
+    fields_schema: str,
+    max_concurrency: Annotated[int, InjectedToolArg] = 0,
+) -> str:
+    """Extract the same structured fields from several loan application folders at once.
 
-        # Extract structured data using Box AI
-        ai_response = box_ai_extract_structured_enhanced_using_fields(
-            client=conf.box_client, file_ids=file_ids, fields=fields
+    Use this instead of calling extract_structured_loan_data once per applicant.
+    Folders are processed concurrently; a failure in one folder does not affect the others.
+
+    Args:
+        folder_ids: Box folder IDs, one per loan application
+        fields_schema: JSON string defining fields to extract, same format as for extract_structured_loan_data
+        max_concurrency: Maximum number of folders extracted at the same time (default: BOX_BATCH_MAX_CONCURRENCY)
+
+    Returns:
+        Compact JSON object mapping each folder ID to {"data": {...}} or {"error": "..."}
+    """
+    try:
+        fields = _parse_fields_schema(fields_schema)
+    except ValueError as e:
+        return str(e)
+
+    workers = max_concurrency or conf.BOX_BATCH_MAX_CONCURRENCY
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        outcomes = executor.map(
+            with_trace_context(
+                lambda folder_id: _extract_folder_result(folder_id, fields)
+            ),
+            folder_ids,
         )
+        results = dict(zip(folder_ids, outcomes))
+    return json.dumps(results, separators=(",", ":"), default=str)
 
-        # Format the response
-        result = f"Extracted Data from Folder {folder_id}:\n\n"
-        if isinstance(ai_response, dict):
-            ai_response_content = ai_response.get("AI_response", {})
-            result += json.dumps(ai_response_content.get("answer", {}), indent=2)
-        else:
-            result += str(ai_response)
 
-        return result
-    except Exception as e:
-        return f"Error extracting structured data from folder {folder_id}: {str(e)}"
+async def _aextract_structured_loan_data_batch(
+    folder_ids: List[str], fields_schema: str, max_concurrency: int = 0
+) -> str:
+    """Async implementation of extract_structured_loan_data_batch."""
+    try:
+        fields = _parse_fields_schema(fields_schema)
+    except ValueError as e:
+        return str(e)
+
+    semaphore = asyncio.Semaphore(max_concurrency or conf.BOX_BATCH_MAX_CONCURRENCY)
+
+    async def extract_one(folder_id: str) -> Dict[str, Any]:
+        async with semaphore:
+            return await run_in_box_executor(_extract_folder_result, folder_id, fields)
+
+    outcomes = await asyncio.gather(*(extract_one(fid) for fid in folder_ids))
+    results = dict(zip(folder_ids, outcomes))
+    return json.dumps(results, separators=(",", ":"), default=str)
+
+
+extract_structured_loan_data_batch.coroutine = _aextract_structured_loan_data_batch  # type: ignore[attr-defined]
 
 
 @tool(parse_docstring=True)
@@ -224,12 +620,105 @@ def think_tool(reflection: str) -> str:
     return f"✓ Reflection recorded: {reflection}"
 
 
+# Operators allowed in `calculate` expressions
+CALC_OPERATORS: Dict[type, Callable[..., Any]] = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.Pow: operator.pow,
+    ast.Mod: operator.mod,
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos,
+}
+
+# Functions allowed in `calculate` expressions
+CALC_FUNCTIONS: Dict[str, Callable[..., Any]] = {
+    "min": min,
+    "max": max,
+    "round": round,
+    "abs": abs,
+}
+
+# An expression compiled to a function of the variable values
+CompiledExpression = Callable[[Dict[str, float]], float]
+
+
+def _compile_node(node: ast.AST) -> CompiledExpression:
+    """Compile an expression AST node into nested closures."""
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        value = node.value
+        return lambda variables: value
+    if isinstance(node, ast.Name):
+        name = node.id
+
+        def variable(variables: Dict[str, float]) -> float:
+            if name not in variables:
+                raise ValueError(f"Unknown variable: {name}")
+            return variables[name]
+
+        return variable
+    if isinstance(node, ast.BinOp) and type(node.op) in CALC_OPERATORS:
+        binary = CALC_OPERATORS[type(node.op)]
+        left, right = _compile_node(node.left), _compile_node(node.right)
+        return lambda variables: binary(left(variables), right(variables))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in CALC_OPERATORS:
+        unary = CALC_OPERATORS[type(node.op)]
+        operand = _compile_node(node.operand)
+        return lambda variables: unary(operand(variables))
+    if (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Name)
+        and node.func.id in CALC_FUNCTIONS
+        and not node.keywords
+    ):
+        function = CALC_FUNCTIONS[node.func.id]
+        arguments = [_compile_node(argument) for argument in node.args]
+        return lambda variables: function(
+            *(argument(variables) for argument in arguments)
+        )
+    raise ValueError(f"Unsupported operation: {type(node).__name__}")
+
+
+@lru_cache(maxsize=1024)
+def _compile_expression(expression: str) -> Tuple[CompiledExpression, FrozenSet[str]]:
+    """Parse and compile an expression once.
+
+    Args:
+        expression: Arithmetic expression, may reference variables
+
+    Returns:
+        The compiled expression and the variable names it references
+
+    Raises:
+        SyntaxError: If the expression cannot be parsed
+        ValueError: If the expression uses an unsupported operation
+    """
+    tree = ast.parse(expression.strip(), mode="eval")
+    function_names = {
+        id(node.func) for node in ast.walk(tree) if isinstance(node, ast.Call)
+    }
+    names = frozenset(
+        node.id
+        for node in ast.walk(tree)
+        if isinstance(node, ast.Name) and id(node) not in function_names
+    )
+    return _compile_node(tree.body), names
+
+
+def _format_result(result: float) -> str:
+    """Show floats with up to 4 decimal places, without trailing zeros."""
+    if isinstance(result, float):
+        return f"{result:.4f}".rstrip("0").rstrip(".")
+    return str(result)
+
+
 @tool(parse_docstring=True)
 def calculate(expression: str) -> str:
     """Perform mathematical calculations for loan risk analysis.
 
     Safely evaluates mathematical expressions. Supports basic arithmetic
-    operators (+, -, *, /, **, %) and common functions.
+    operators (+, -, *, /, **, %) and the min, max, round and abs functions.
 
     Args:
         expression: Mathematical expression to evaluate (e.g., "(1200 + 380) / 5200")
@@ -237,48 +726,249 @@ def calculate(expression: str) -> str:
     Returns:
         Result of the calculation
     """
-    import ast
-    import operator
-    from typing import Any
-
-    # Allowed operations
-    operators_map = {
-        ast.Add: operator.add,
-        ast.Sub: operator.sub,
-        ast.Mult: operator.mul,
-        ast.Div: operator.truediv,
-        ast.Pow: operator.pow,
-        ast.Mod: operator.mod,
-        ast.USub: operator.neg,
+    try:
+        compiled, _ = _compile_expression(expression)
+        return f"{expression} = {_format_result(compiled({}))}"
+    except Exception as e:
+        return f"Error calculating '{expression}': {str(e)}"
+
+
+@tool(parse_docstring=True)
+def calculate_batch(expressions: Dict[str, Union[str, int, float]]) -> str:
+    """Evaluate several named calculations that can reference each other, in one call.
+
+    Each expression may use the names of the other expressions as variables.
+    They are evaluated in dependency order, whatever their order in the
+    input. Supports +, -, *, /, **, % and the min, max, round and abs functions.
+
+    Args:
+        expressions: Mapping of variable name to expression or number, e.g. {"monthly_debt": "1200 + 380", "income": 5200, "dti": "round(monthly_debt / income, 4)"}
+
+    Returns:
+        One "name = expression = result" line per variable in evaluation order, with an error line for any variable that could not be computed
+    """
+    if not expressions:
+        return "Error: no expressions given"
+
+    compiled: Dict[str, CompiledExpression] = {}
+    errors: Dict[str, str] = {}
+    graph: Dict[str, FrozenSet[str]] = {}
+    for name, expression in expressions.items():
+        if not name.isidentifier() or name in CALC_FUNCTIONS:
+            errors[name] = f"invalid variable name '{name}'"
+            continue
+        try:
+            compiled[name], graph[name] = _compile_expression(str(expression))
+        except (SyntaxError, ValueError) as e:
+            errors[name] = f"cannot parse '{expression}': {str(e)}"
+    for name, dependencies in graph.items():
+        unknown = sorted(dependencies - expressions.keys())
+        if unknown:
+            errors[name] = f"unknown variable(s): {', '.join(unknown)}"
+
+    # Report the variables of each cycle and sort the rest; the variables
+    # depending on a cycle then fail like any other dependent
+    sortable = {
+        name: dependencies & graph.keys() for name, dependencies in graph.items()
     }
+    while True:
+        try:
+            order = list(TopologicalSorter(sortable).static_order())
+            break
+        except CycleError as e:
+            cycle = e.args[1]
+            for name in cycle:
+                errors[name] = f"circular reference {' -> '.join(cycle)}"
+                sortable.pop(name, None)
+            for name in sortable:
+                sortable[name] = sortable[name] - set(cycle)
 
-    def eval_expr(node: Any) -> float:
-        """Recursively evaluate AST node."""
-        if isinstance(node, ast.Num):
-            return node.n  # type: ignore
-        elif isinstance(node, ast.BinOp):
-            return operators_map[type(node.op)](
-                eval_expr(node.left), eval_expr(node.right)
-            )
-        elif isinstance(node, ast.UnaryOp):
-            return operators_map[type(node.op)](eval_expr(node.operand))
+    values: Dict[str, float] = {}
+    lines = []
+    for name in order:
+        if name not in errors:
+            failed = sorted(graph[name] & errors.keys())
+            if failed:
+                errors[name] = f"depends on failed {', '.join(failed)}"
+            else:
+                try:
+                    values[name] = compiled[name](values)
+                except Exception as e:
+                    errors[name] = str(e)
+        expression = str(expressions[name])
+        if name in errors:
+            lines.append(f"{name} = {expression} -> Error: {errors[name]}")
+        elif expression.strip() == _format_result(values[name]):
+            lines.append(f"{name} = {expression}")
         else:
-            raise ValueError(f"Unsupported operation: {type(node)}")
+            lines.append(f"{name} = {expression} = {_format_result(values[name])}")
+    # Invalid names never entered the graph, cycles were taken out of it
+    evaluated = set(order)
+    lines += [
+        f"{name} = {expressions[name]} -> Error: {error}"
+        if name in graph
+        else f"{name} -> Error: {error}"
+        for name, error in errors.items()
+        if name not in evaluated
+    ]
+    return "\n".join(lines)
+
+
+@tool(parse_docstring=True)
+def compute_risk_metrics(applications_json: str) -> str:
+    """Compute the complete risk assessment of loan applications in one call.
+
+    Calculates DTI, LTV against the maximum for the vehicle age, the
+    projected vehicle value at loan maturity, the severity of every policy
+    violation and the overall risk level, using the thresholds of the
+    underwriting policy. The proposed payment is amortized from "apr" and
+    "term_months" when not given.
+
+    Args:
+        applications_json: JSON object of one application, or JSON array of several, using the extraction schema (income.monthly_gross, credit.score, credit.monthly_debts, credit.recent_repo, credit.bankruptcy, vehicle.year, vehicle.vehicle_type, vehicle.vehicle_value, loan_request.amount, loan_request.term_months, loan_request.monthly_payment or loan_request.apr) or flat fields (monthly_income, monthly_debt, proposed_payment, credit_score, loan_amount, vehicle_value, vehicle_age, term_months)
 
+    Returns:
+        JSON risk assessment (metrics, violations, risk_level, violation_breakdown, vehicle_depreciation), or a JSON array of assessments for an array input. A violation with severity "unknown" could not be checked (e.g. LTV without the vehicle value or age): ask for the missing data
+    """
     try:
-        # Parse and evaluate expression
-        tree = ast.parse(expression, mode="eval")
-        result = eval_expr(tree.body)
-
-        # Format result nicely
-        if isinstance(result, float):
-            # Show up to 4 decimal places, remove trailing zeros
-            formatted = f"{result:.4f}".rstrip("0").rstrip(".")
-            return f"{expression} = {formatted}"
-        else:
-            return f"{expression} = {result}"
-    except Exception as e:
-        return f"Error calculating '{expression}': {str(e)}"
+        applications = json.loads(applications_json)
+    except json.JSONDecodeError as e:
+        return f"Error: applications_json is not valid JSON: {str(e)}"
+
+    single = isinstance(applications, dict)
+    if single:
+        applications = [applications]
+    if not isinstance(applications, list) or not all(
+        isinstance(application, dict) for application in applications
+    ):
+        return "Error: applications_json must be a JSON object or an array of objects"
+
+    try:
+        assessments = compute_risk_assessments(applications)
+    except (ValueError, TypeError) as e:
+        return f"Error computing risk metrics: {str(e)}"
+
+    return json.dumps(assessments[0] if single else assessments, indent=2)
+
+
+def _policy_rule_summary(rule: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep the fields of a policy rule that matter to an agent."""
+    section = " / ".join(part for part in (rule["section"], rule["subsection"]) if part)
+    summary = {
+        "rule": rule["text"],
+        "source": f"{rule['document']}, {section}",
+        "version": rule["version"],
+    }
+    for key in ("kind", "low", "high", "unit", "severity", "authority"):
+        if rule[key] is not None:
+            summary[key] = rule[key]
+    if rule["conditions"]:
+        summary["conditions"] = rule["conditions"]
+    return summary
+
+
+@tool(parse_docstring=True)
+def lookup_policy_rule(
+    metric: str,
+    value: Optional[float] = None,
+    vehicle_type: Optional[str] = None,
+    vehicle_age: Optional[float] = None,
+) -> str:
+    """Look up underwriting policy thresholds and approval authority locally.
+
+    Answers from the rule table compiled from the policy documents (underwriting
+    standards, vehicle valuation guidelines, exception approval authority),
+    without calling Box AI. With a value, also returns the violation level and
+    the authority needed to approve it.
+
+    Args:
+        metric: Rule metric - dti, ltv, credit_score, employment, collections, bankruptcy, repossession, loan_amount, term, down_payment, collateral_coverage, depreciation or violations
+        value: Optional applicant value to classify - ratio for dti/ltv (0.44 or 44), points for credit_score, months for employment
+        vehicle_type: Optional "new" or "used", selects the LTV limit
+        vehicle_age: Optional vehicle age in years, selects the LTV limit
+
+    Returns:
+        JSON with the policy version, the matching thresholds, the violation levels of the metric and, when a value is given, its classification
+    """
+    metric = metric.strip().lower().replace(" ", "_").replace("-", "_")
+    metrics = policy_rule_table.metrics()
+    if metric not in metrics:
+        return f"Error: unknown policy metric '{metric}'. Available metrics: {', '.join(metrics)}"
+
+    result: Dict[str, Any] = {"policy_version": policy_rule_table.version}
+    if metric in ("dti", "ltv"):
+        thresholds = policy_rule_table.thresholds(metric, vehicle_type, vehicle_age)
+    else:
+        thresholds = [
+            rule
+            for rule in policy_rule_table.rules(metric)
+            if rule["kind"] != "violation"
+        ]
+    result["rules"] = [_policy_rule_summary(rule) for rule in thresholds]
+    result["violation_levels"] = [
+        _policy_rule_summary(rule)
+        for rule in policy_rule_table.rules(metric, kind="violation")
+    ]
+
+    if value is not None:
+        if metric in RATIO_METRICS and value > 3:
+            value = value / 100  # Given as a percentage
+        classification = policy_rule_table.violation(
+            metric, value, vehicle_type, vehicle_age
+        )
+        result["classification"] = {
+            "value": classification["value"],
+            "measure": classification["measure"],
+            "compliant": classification["compliant"],
+            "severity": classification["severity"],
+            "authority": classification["authority"],
+        }
+        if classification["note"]:
+            result["classification"]["note"] = classification["note"]
+
+    return json.dumps(result, indent=2)
+
+
+@tool(parse_docstring=True)
+def search_policy_index(
+    query: str, applicant_name: Optional[str] = None, max_results: int = 5
+) -> str:
+    """Search the policy and loan application documents locally, before asking Box AI.
+
+    Ranks passages of the policy documents and of the uploaded application
+    documents (pay stubs, credit reports, tax returns...) with a local
+    full-text index. Use `ask_box_ai_about_loan` only when no good match is found.
+
+    Args:
+        query: Keywords or question, e.g. "maximum LTV used vehicle" or "gross monthly income"
+        applicant_name: Optional applicant name, searches only their documents
+        max_results: Maximum number of passages returned
+
+    Returns:
+        JSON with "good_match" and the ranked passages with their source, section and score
+    """
+    results = policy_search_index.search(query, max_results, applicant_name)
+    good_match = bool(results) and (
+        results[0]["coverage"] >= conf.SEARCH_INDEX_MIN_COVERAGE
+    )
+    response: Dict[str, Any] = {
+        "good_match": good_match,
+        "results": [
+            {
+                "source": result["source"],
+                "section": result["title"],
+                "score": result["score"],
+                "coverage": result["coverage"],
+                "text": result["text"],
+            }
+            for result in results
+        ],
+    }
+    if not good_match:
+        response["hint"] = (
+            "No good local match, use ask_box_ai_about_loan to ask Box AI instead"
+        )
+    return json.dumps(response, indent=2)
 
 
 @tool(parse_docstring=True)
@@ -296,8 +986,7 @@ def upload_text_file_to_box(
         Confirmation message with uploaded file details
     """
     try:
-        if conf.box_client is None:
-            conf.box_client = get_box_client()
+        client = get_shared_box_client()
 
         # translate local file path from virtual to real path
         if not conf.local_agents_memory:
@@ -307,7 +996,7 @@ def upload_text_file_to_box(
             "/memories/"
         )
         file_id = local_file_upload(
-            client=conf.box_client,
+            client=client,
             local_file_path=real_file_path,
             parent_folder_id=parent_folder_id,
         )
@@ -315,3 +1004,43 @@ def upload_text_file_to_box(
         return f"File '{file_name}' uploaded successfully to folder ID {parent_folder_id} (File ID: {file_id})"
     except Exception as e:
         return f"Error uploading file '{file_name}' to folder ID {parent_folder_id}: {str(e)}"
+
+
+def _add_box_coroutine(box_tool: StructuredTool) -> None:
+    """Register a native async implementation for a Box tool.
+
+    The coroutine runs the blocking Box SDK calls on the bounded Box I/O
+    executor, so `ainvoke`/`astream` callers never block the event loop and
+    concurrent sub-agents overlap their Box round trips.
+
+    Args:
+        box_tool: Tool whose sync function makes blocking Box SDK calls
+    """
+    func = box_tool.func
+    assert func is not None
+
+    async def coroutine(*args, **kwargs) -> str:
+        return await run_in_box_executor(func, *args, **kwargs)
+
+    box_tool.coroutine = coroutine
+
+
+def _trace_box_tool(box_tool: StructuredTool) -> None:
+    """Record each call of a Box tool as a span, the parent of its Box requests.
+
+    Args:
+        box_tool: Tool whose sync function makes blocking Box SDK calls
+    """
+    assert box_tool.func is not None
+    box_tool.func = traced(box_tool.name)(box_tool.func)
+
+
+for _box_tool in (
+    search_loan_folder,
+    list_loan_documents,
+    ask_box_ai_about_loan,
+    extract_structured_loan_data,
+    upload_text_file_to_box,
+):
+    _trace_box_tool(_box_tool)  # type: ignore[arg-type]
+    _add_box_coroutine(_box_tool)  # type: ignore[arg-type]
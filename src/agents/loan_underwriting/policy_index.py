@@ -0,0 +1,221 @@
+"""Local full-text index of the policy and loan application documents.
+
+The policy markdown files are indexed from disk and re-indexed when their
+content changes, so searches always reflect the current policies. The
+application documents (PDFs) are indexed from the text representation Box
+generates for them, fetched after each upload for the files whose SHA-1
+changed. Agents search this index first and only ask Box AI when it has no
+good match.
+
+Sources are named by their path relative to the `data` directory, e.g.
+"Policies/Auto Loan Underwriting Standards.md" or
+"Applications/Sarah Chen/Sarah Documents/pay_stub_sarah_chen.pdf".
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from box_ai_agents_toolkit import box_file_text_extract
+from box_sdk_gen import BoxClient
+
+from app_config import conf
+from utils.box_sync import SyncManifest, file_sha1
+from utils.search_index import BM25Index, split_markdown_passages, split_text_passages
+
+logger = logging.getLogger(__name__)
+
+# Folder of the data directory holding the application documents. The demo
+# goal samples hold the expected answers and are deliberately not indexed.
+APPLICATIONS_FOLDER = "Applications"
+
+# Files Box cannot extract text from
+SKIPPED_SUFFIXES = (".jpg", ".jpeg", ".png", ".gif")
+
+DATA_DIR = Path(__file__).parent.parent.parent.parent / "data"
+
+
+def _policy_dir() -> Path:
+    policy_dir = Path(conf.POLICY_DIR)
+    if not policy_dir.is_absolute():
+        policy_dir = Path(__file__).parent.parent.parent.parent / policy_dir
+    return policy_dir
+
+
+def _source_name(path: Path, data_dir: Path) -> str:
+    try:
+        return path.relative_to(data_dir).as_posix()
+    except ValueError:
+        return path.name
+
+
+class PolicySearchIndex:
+    """BM25 index of the loan documents, kept in sync with their content."""
+
+    def __init__(
+        self,
+        policy_dir: Path,
+        data_dir: Path,
+        index_file: Optional[Path] = None,
+        check_interval_seconds: float = 1.0,
+    ) -> None:
+        """Load the persisted index, policies are indexed on first search.
+
+        Args:
+            policy_dir: Directory of the policy markdown files
+            data_dir: Directory the source names are relative to
+            index_file: JSON file the index is persisted to
+            check_interval_seconds: Minimum delay between two checks of the
+                policy files for changes
+        """
+        self.policy_dir = policy_dir
+        self.data_dir = data_dir
+        self.check_interval_seconds = check_interval_seconds
+        self.index = BM25Index(index_file)
+        self._checked_at = float("-inf")
+        self._stats: Dict[str, Tuple[int, int]] = {}
+
+    def refresh_policies(self, force: bool = False) -> bool:
+        """Re-index the policy documents whose content changed.
+
+        The files are checked at most every `check_interval_seconds`, with
+        their size and mtime first and their SHA-1 only when those changed.
+
+        Args:
+            force: Check the files even if the interval has not elapsed
+
+        Returns:
+            bool: True if the index changed
+        """
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval_seconds:
+            return False
+        self._checked_at = now
+
+        files = {
+            _source_name(path, self.data_dir): path
+            for path in sorted(self.policy_dir.glob("*.md"))
+        }
+        stats = {
+            source: (path.stat().st_mtime_ns, path.stat().st_size)
+            for source, path in files.items()
+        }
+        if stats == self._stats:
+            return False
+
+        changed = False
+        prefix = _source_name(self.policy_dir, self.data_dir) + "/"
+        for source in self.index.sources():
+            if source.startswith(prefix) and source not in files:
+                self.index.remove_document(source)
+                changed = True
+        for source, path in files.items():
+            if self._stats.get(source) == stats[source]:
+                continue
+            changed |= self.index.update_document(
+                source,
+                file_sha1(path),
+                split_markdown_passages(path.read_text(encoding="utf-8")),
+                {"type": "policy"},
+            )
+        self._stats = stats
+        if changed:
+            self.index.save()
+        return changed
+
+    def index_uploaded_documents(
+        self,
+        client: BoxClient,
+        folder_cache: Dict[str, Dict[str, str]],
+        sync_manifest: Optional[SyncManifest] = None,
+        max_workers: int = 4,
+    ) -> int:
+        """Index the text of the uploaded application documents.
+
+        Only the files whose SHA-1 differs from the indexed version are
+        fetched from Box. Documents deleted locally are removed.
+
+        Args:
+            client: Authenticated Box client
+            folder_cache: Uploaded items by name, with their Box ID
+            sync_manifest: Manifest of local digests, avoids re-hashing
+            max_workers: Number of concurrent text extractions
+
+        Returns:
+            int: Number of documents (re)indexed
+        """
+        pending: List[Tuple[str, str, str]] = []
+        found = set()
+        for path in sorted((self.data_dir / APPLICATIONS_FOLDER).rglob("*")):
+            if (
+                not path.is_file()
+                or path.name.startswith(".")
+                or path.suffix.lower() in SKIPPED_SUFFIXES
+            ):
+                continue
+            source = _source_name(path, self.data_dir)
+            found.add(source)
+            uploaded = folder_cache.get(path.name)
+            if uploaded is None:
+                continue
+            sha1 = sync_manifest.local_sha1(path) if sync_manifest else file_sha1(path)
+            if self.index.version(source) != sha1:
+                pending.append((source, sha1, uploaded["id"]))
+
+        for source in self.index.sources():
+            if source.startswith(f"{APPLICATIONS_FOLDER}/") and source not in found:
+                self.index.remove_document(source)
+
+        def extract(item: Tuple[str, str, str]) -> bool:
+            source, sha1, file_id = item
+            response = box_file_text_extract(client, file_id)
+            if "content" not in response:
+                logger.warning(
+                    "No text for %s: %s",
+                    source,
+                    response.get("error") or response.get("message"),
+                )
+                return False
+            return self.index.update_document(
+                source,
+                sha1,
+                split_text_passages(response["content"], title=Path(source).stem),
+                {"type": "application", "file_id": file_id},
+            )
+
+        indexed = 0
+        if pending:
+            logger.info("Indexing the text of %d uploaded document(s)", len(pending))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                indexed = sum(executor.map(extract, pending))
+        self.index.save()
+        return indexed
+
+    def search(
+        self, query: str, max_results: int = 5, applicant_name: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Search every indexed document, or only one applicant's documents.
+
+        Args:
+            query: Free-text query
+            max_results: Maximum number of passages returned
+            applicant_name: Only search this applicant's documents
+
+        Returns:
+            Ranked passages, see `BM25Index.search`
+        """
+        self.refresh_policies()
+        prefix = f"{APPLICATIONS_FOLDER}/{applicant_name}/" if applicant_name else ""
+        return self.index.search(query, max_results, source_prefix=prefix)
+
+
+# Process-wide index shared by every tool
+policy_search_index = PolicySearchIndex(
+    policy_dir=_policy_dir(),
+    data_dir=DATA_DIR,
+    index_file=conf.local_agents_memory / "search_index.json"
+    if conf.local_agents_memory
+    else None,
+)
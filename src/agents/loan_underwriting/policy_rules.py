@@ -0,0 +1,605 @@
+"""Compiled rule table of the underwriting policy documents.
+
+The markdown files of `data/Policies` (underwriting standards, vehicle
+valuation guidelines, exception approval authority) are parsed into rule
+records. Each record holds its source document, section, version, metric,
+numeric bounds and conditions. The records are indexed by metric, so
+threshold and approval authority questions are answered locally, without a
+Box AI call.
+
+Each document is versioned by the SHA-1 of its content. The compiled table
+is persisted next to the agent memories and a document is only re-parsed
+when its SHA-1 changes.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app_config import conf
+from utils.box_sync import file_sha1
+
+logger = logging.getLogger(__name__)
+
+# Bump when the parser changes, so compiled tables are rebuilt
+PARSER_VERSION = 1
+
+# Metric keywords, checked in order against the rule text
+METRIC_KEYWORDS: Tuple[Tuple[str, str], ...] = (
+    ("ltv", "ltv"),
+    ("debt-to-income", "dti"),
+    ("dti", "dti"),
+    ("credit score", "credit_score"),
+    ("collections", "collections"),
+    ("bankruptc", "bankruptcy"),
+    ("repossession", "repossession"),
+    ("employment", "employment"),
+    ("loan amount", "loan_amount"),
+    ("term", "term"),
+    ("down payment", "down_payment"),
+    ("collateral value", "collateral_coverage"),
+    ("violations", "violations"),
+)
+# Metrics whose percentages are ratios (43% -> 0.43)
+RATIO_METRICS = {"dti", "ltv", "down_payment", "collateral_coverage", "depreciation"}
+
+SEVERITY_ORDER = {"minor": 1, "moderate": 2, "major": 3}
+
+_PERCENT = r"(\d+(?:\.\d+)?)\s*%"
+_NUMBER = r"(\d[\d,]*(?:\.\d+)?)"
+
+
+def _number(text: str) -> float:
+    return float(text.replace(",", ""))
+
+
+def _detect_metric(text: str, section: str) -> Optional[str]:
+    """Return the metric a rule is about, or None for informational rules."""
+    lowered = text.lower()
+    if section.lower().startswith("depreciation") and re.match(r"year \d", lowered):
+        return "depreciation"
+    if section.lower().startswith("risk-based pricing"):
+        return "credit_score"
+    for keyword, metric in METRIC_KEYWORDS:
+        if keyword in lowered:
+            return metric
+    return None
+
+
+def _vehicle_conditions(label: str) -> Dict[str, Any]:
+    """Parse a vehicle label such as "Used vehicles (0-3 years)" or "Vehicles 8+ years"."""
+    conditions: Dict[str, Any] = {}
+    lowered = label.lower()
+    if lowered.startswith("new"):
+        conditions.update(vehicle_type="new", age_min=0, age_max=0)
+    elif lowered.startswith("used"):
+        conditions["vehicle_type"] = "used"
+    if match := re.search(r"(\d+)\s*-\s*(\d+)\s*years", lowered):
+        conditions.update(age_min=int(match.group(1)), age_max=int(match.group(2)))
+    elif match := re.search(r"(\d+)\+\s*years", lowered):
+        conditions["age_min"] = int(match.group(1))
+    return conditions
+
+
+def _parse_rule(
+    text: str, section: str, subsection: str, previous_high: Dict[str, float]
+) -> Dict[str, Any]:
+    """Turn one policy line into a rule record.
+
+    Args:
+        text: Line text without list marker and emphasis
+        section: Enclosing "##" heading
+        subsection: Enclosing "###" heading, if any
+        previous_high: Upper bound of the previous violation level per metric,
+            used as lower bound of levels stated as "N points below minimum"
+
+    Returns:
+        Rule record (without id, document and version)
+    """
+    label, _, body = text.partition(":") if ":" in text else ("", "", text)
+    body = body.strip() or text
+    metric = _detect_metric(text, section)
+    rule: Dict[str, Any] = {
+        "section": section,
+        "subsection": subsection,
+        "text": text,
+        "metric": metric,
+        "kind": "info",
+        "low": None,
+        "high": None,
+        "unit": None,
+        "conditions": {},
+        "severity": None,
+        "authority": None,
+    }
+    lowered = text.lower()
+    scale = 0.01 if metric in RATIO_METRICS else 1.0
+
+    # Violation levels of the exception approval authority document
+    if match := re.match(
+        r"(minor|moderate|major) violations \((.+)\)", subsection.lower()
+    ):
+        rule["kind"] = "violation"
+        rule["severity"] = match.group(1)
+        rule["authority"] = re.match(r".+\((.+)\)", subsection).group(1)  # type: ignore[union-attr]
+        if metric == "violations":
+            count = re.search(r"(two|three|\d+)", lowered)
+            words = {"two": 2, "three": 3}
+            value = count.group(1) if count else "1"
+            rule["low"] = float(words.get(value, value))  # type: ignore[arg-type]
+            rule["unit"] = "count"
+            rule["conditions"] = {
+                "level": "minor" if "minor" in lowered else "any",
+                "or_more": "or more" in lowered,
+            }
+        elif metric == "ltv":
+            rule["unit"] = "excess"
+            bounds = [float(value) / 100 for value in re.findall(r"\+(\d+)%", text)]
+            if "more than" in lowered:
+                rule["low"] = bounds[0]
+            else:
+                rule["low"] = 0.0 if "between maximum" in lowered else bounds[0]
+                rule["high"] = bounds[-1]
+        elif metric == "credit_score":
+            rule["unit"] = "points below minimum"
+            points = float(re.search(_NUMBER, text).group(1))  # type: ignore[union-attr]
+            if "more than" in lowered:
+                rule["low"] = points
+            else:
+                rule["low"], rule["high"] = previous_high.get(metric, 0.0), points
+        elif match := re.search(
+            r"(\d+(?:\.\d+)?)\s*-\s*(\d+(?:\.\d+)?)\s*(%|months)", text
+        ):
+            rule["low"] = float(match.group(1)) * (
+                scale if match.group(3) == "%" else 1
+            )
+            rule["high"] = float(match.group(2)) * (
+                scale if match.group(3) == "%" else 1
+            )
+            rule["unit"] = "ratio" if match.group(3) == "%" else "months"
+        elif match := re.search(r"above " + _PERCENT, lowered):
+            rule["low"] = float(match.group(1)) * scale
+            rule["unit"] = "ratio"
+        if rule["high"] is not None and metric:
+            previous_high[metric] = rule["high"]
+        return rule
+
+    if metric == "depreciation":
+        rule["kind"] = "rate"
+        rule["unit"] = "ratio"
+        rule["conditions"] = {"vehicle_class": subsection}
+        if match := re.match(r"year (\d+)(\+)?", label.lower()):
+            year = int(match.group(1))
+            rule["conditions"].update(
+                year_min=year, year_max=None if match.group(2) else year
+            )
+        rule["low"] = rule["high"] = float(re.search(_PERCENT, body).group(1)) / 100  # type: ignore[union-attr]
+        return rule
+
+    if section.lower().startswith("risk-based pricing"):
+        rule["kind"] = "pricing"
+        rule["unit"] = "points"
+        if match := re.search(r"(\d+)\+", label):
+            rule["low"] = float(match.group(1))
+        elif match := re.search(r"(\d+)\s*-\s*(\d+)", label):
+            rule["low"], rule["high"] = float(match.group(1)), float(match.group(2))
+        rule["conditions"] = {"tier": label.split("(")[0].strip(), "rate": body}
+        return rule
+
+    if metric == "ltv" and "maximum ltv" in lowered:
+        rule["kind"] = "maximum"
+        rule["unit"] = "ratio"
+        rule["high"] = float(re.search(_PERCENT, body).group(1)) / 100  # type: ignore[union-attr]
+        rule["conditions"] = _vehicle_conditions(label)
+        return rule
+
+    if metric in ("bankruptcy", "repossession") and lowered.startswith("no "):
+        rule["kind"] = "lookback"
+        rule["unit"] = "months"
+        rule["low"] = float(re.search(r"(\d+)\s*months", lowered).group(1))  # type: ignore[union-attr]
+        return rule
+
+    kind = (
+        "minimum"
+        if "minimum" in lowered or "must equal or exceed" in lowered
+        else "maximum"
+        if "maximum" in lowered
+        else "info"
+    )
+    if kind == "info" or metric is None:
+        return rule
+    if match := re.search(_PERCENT, body):
+        value, unit = float(match.group(1)) * scale, "ratio" if scale < 1 else "%"
+    elif match := re.search(r"\$" + _NUMBER, body):
+        value, unit = _number(match.group(1)), "USD"
+    elif match := re.search(_NUMBER + r"\s*(months|years)", body):
+        value, unit = _number(match.group(1)), match.group(2)
+        if unit == "years":
+            value, unit = value * 12, "months"
+    elif match := re.search(_NUMBER, body):
+        value, unit = _number(match.group(1)), "points"
+    else:
+        return rule
+    rule["kind"] = kind
+    rule["unit"] = unit
+    rule["low" if kind == "minimum" else "high"] = value
+    if match := re.search(r"\((\d+)\+ credit\)", text):
+        rule["conditions"] = {"credit_score_min": int(match.group(1))}
+    return rule
+
+
+def parse_policy_document(name: str, text: str) -> Dict[str, Any]:
+    """Parse a policy markdown document into rule records.
+
+    List items and paragraphs become rules; "##" and "###" headings become
+    their section and subsection.
+
+    Args:
+        name: File name of the document
+        text: Markdown content
+
+    Returns:
+        Dict with "document", "title", "version", "updated" and "rules"
+    """
+    title = ""
+    version = None
+    updated = None
+    section = ""
+    subsection = ""
+    previous_high: Dict[str, float] = {}
+    rules: List[Dict[str, Any]] = []
+
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        if not line:
+            continue
+        if line.startswith("# "):
+            title = line[2:].strip()
+            continue
+        if line.startswith("## "):
+            section, subsection = line[3:].strip(), ""
+            continue
+        if line.startswith("### "):
+            subsection = line[4:].strip()
+            continue
+        if match := re.search(r"Version\s+([\d.]+)", line):
+            version = match.group(1)
+        if match := re.search(r"(?:Effective Date|Updated):\s*(.+)", line):
+            updated = match.group(1).strip()
+        if not section:
+            # Version and date lines before the first section
+            continue
+
+        rule_text = re.sub(r"^[-*]\s+", "", line).replace("**", "").strip()
+        rule = _parse_rule(rule_text, section, subsection, previous_high)
+        rule["id"] = f"{Path(name).stem.lower().replace(' ', '-')}:{len(rules) + 1}"
+        rule["document"] = name
+        rules.append(rule)
+
+    return {
+        "document": name,
+        "title": title,
+        "version": version or updated,
+        "updated": updated,
+        "rules": rules,
+    }
+
+
+class PolicyRuleTable:
+    """Rule table of the policy documents, recompiled when a document changes."""
+
+    def __init__(
+        self,
+        policy_dir: Path,
+        cache_file: Optional[Path] = None,
+        check_interval_seconds: float = 1.0,
+    ) -> None:
+        """Create the table, documents are compiled on first use.
+
+        Args:
+            policy_dir: Directory of the policy markdown files
+            cache_file: JSON file the compiled documents are persisted to
+            check_interval_seconds: Minimum delay between two checks of the
+                policy files for changes
+        """
+        self.policy_dir = policy_dir
+        self.cache_file = cache_file
+        self.check_interval_seconds = check_interval_seconds
+        self.compilations = 0
+        self._checked_at = float("-inf")
+        self._documents: Dict[str, Dict[str, Any]] = {}
+        self._stats: Dict[str, Tuple[int, int]] = {}
+        self._by_metric: Dict[str, List[Dict[str, Any]]] = {}
+        self._version = ""
+        self._lock = threading.Lock()
+        if cache_file is not None and cache_file.exists():
+            try:
+                with open(cache_file, "r", encoding="utf-8") as f:
+                    cached = json.load(f)
+                if cached.get("parser_version") == PARSER_VERSION:
+                    self._documents = cached["documents"]
+            except (ValueError, KeyError) as e:
+                logger.warning(f"Ignoring unreadable policy rule cache: {e}")
+
+    def _policy_files(self) -> Dict[str, Path]:
+        return {path.name: path for path in sorted(self.policy_dir.glob("*.md"))}
+
+    def refresh(self, force: bool = False) -> bool:
+        """Recompile the documents whose content changed since the last check.
+
+        The files are checked at most every `check_interval_seconds`.
+        Unchanged files are detected with their size and mtime, then with
+        their SHA-1, so a check without changes costs a few `stat` calls.
+
+        Args:
+            force: Check the files even if the interval has not elapsed
+
+        Returns:
+            bool: True if the table changed
+        """
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval_seconds:
+            return False
+        self._checked_at = now
+        files = self._policy_files()
+        stats = {
+            name: (path.stat().st_mtime_ns, path.stat().st_size)
+            for name, path in files.items()
+        }
+        if stats == self._stats and self._by_metric:
+            return False
+
+        with self._lock:
+            changed = set(self._documents) - set(files)
+            for name in changed:
+                del self._documents[name]
+            for name, path in files.items():
+                if self._stats.get(name) == stats[name] and name in self._documents:
+                    continue
+                sha1 = file_sha1(path)
+                document = self._documents.get(name)
+                if document is not None and document["sha1"] == sha1:
+                    continue
+                document = parse_policy_document(name, path.read_text(encoding="utf-8"))
+                document["sha1"] = sha1
+                for rule in document["rules"]:
+                    rule["version"] = document["version"]
+                self._documents[name] = document
+                self.compilations += 1
+                changed.add(name)
+                logger.info(
+                    f"Compiled {len(document['rules'])} policy rules from {name} "
+                    f"(version {document['version']}, sha1 {sha1[:8]})"
+                )
+
+            self._stats = stats
+            if not changed and self._by_metric:
+                return False
+            self._index()
+            if changed:
+                self._save()
+            return True
+
+    def _index(self) -> None:
+        by_metric: Dict[str, List[Dict[str, Any]]] = {}
+        for document in self._documents.values():
+            for rule in document["rules"]:
+                by_metric.setdefault(rule["metric"] or "info", []).append(rule)
+        self._by_metric = by_metric
+        digest = hashlib.sha1()
+        for name in sorted(self._documents):
+            digest.update(self._documents[name]["sha1"].encode())
+        self._version = digest.hexdigest()[:12]
+
+    def _save(self) -> None:
+        if self.cache_file is None:
+            return
+        tmp_file = self.cache_file.with_suffix(".tmp")
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(
+                {"parser_version": PARSER_VERSION, "documents": self._documents},
+                f,
+                indent=2,
+                ensure_ascii=False,
+            )
+        os.replace(tmp_file, self.cache_file)
+
+    @property
+    def version(self) -> str:
+        """Version of the whole table, derived from the document SHA-1s."""
+        self.refresh()
+        return self._version
+
+    def documents(self) -> List[Dict[str, str]]:
+        """Return the name, title, version and SHA-1 of each compiled document."""
+        self.refresh()
+        return [
+            {key: document[key] for key in ("document", "title", "version", "sha1")}
+            for document in self._documents.values()
+        ]
+
+    def metrics(self) -> List[str]:
+        """Return the metrics that have rules."""
+        self.refresh()
+        return sorted(self._by_metric)
+
+    def rules(
+        self, metric: Optional[str] = None, kind: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Return the rules of a metric and/or kind.
+
+        Args:
+            metric: Metric such as "dti", "ltv" or "credit_score" (None for all)
+            kind: "minimum", "maximum", "violation", "rate", "pricing",
+                "lookback" or "info" (None for all)
+        """
+        self.refresh()
+        rules = (
+            self._by_metric.get(metric, [])
+            if metric
+            else [rule for rules in self._by_metric.values() for rule in rules]
+        )
+        return [rule for rule in rules if kind is None or rule["kind"] == kind]
+
+    def thresholds(
+        self,
+        metric: str,
+        vehicle_type: Optional[str] = None,
+        vehicle_age: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """Return the minimum/maximum rules of a metric that apply to a vehicle.
+
+        The age bands are contiguous: a band ends where the next one starts,
+        so a used vehicle of 3.5 years falls in the "0-3 years" band. A new
+        vehicle matches the new vehicle limit whatever its age.
+
+        Args:
+            metric: Metric such as "dti", "ltv" or "credit_score"
+            vehicle_type: "new" or "used", for LTV limits
+            vehicle_age: Vehicle age in years, for LTV limits
+        """
+        rules = [
+            rule
+            for rule in self.rules(metric)
+            if rule["kind"] in ("minimum", "maximum")
+        ]
+        if vehicle_type and vehicle_type.lower() == "new":
+            vehicle_age = 0
+        band_starts = sorted(
+            {
+                rule["conditions"]["age_min"]
+                for rule in rules
+                if rule["conditions"].get("age_min") is not None
+            }
+        )
+        matches = []
+        for rule in rules:
+            conditions = rule["conditions"]
+            if vehicle_type and conditions.get("vehicle_type") not in (
+                None,
+                vehicle_type.lower(),
+            ):
+                continue
+            if vehicle_age is not None:
+                age_min = conditions.get("age_min", 0)
+                next_band_min = next(
+                    (start for start in band_starts if start > age_min), None
+                )
+                if vehicle_age < age_min:
+                    continue
+                if conditions.get("age_max") is not None and (
+                    vehicle_age >= next_band_min
+                    if next_band_min is not None
+                    else vehicle_age > conditions["age_max"]
+                ):
+                    continue
+            matches.append(rule)
+        return matches
+
+    def violation(
+        self,
+        metric: str,
+        value: float,
+        vehicle_type: Optional[str] = None,
+        vehicle_age: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Classify a value against the threshold and violation levels of a metric.
+
+        Args:
+            metric: "dti", "ltv", "credit_score" or "employment"
+            value: Ratio for DTI/LTV (0.44), points for credit, months for employment
+            vehicle_type: "new" or "used", for LTV
+            vehicle_age: Vehicle age in years, for LTV
+
+        Returns:
+            Dict with "measure" (value compared with the violation levels),
+            "threshold" (rule), "compliant", "severity", "authority", "rule"
+            and "note". The severity is "none" for a compliant value and
+            "unknown" when the policy does not classify the value: no limit
+            applies to the vehicle, or a violation below every level
+        """
+        thresholds = self.thresholds(metric, vehicle_type, vehicle_age)
+        threshold = thresholds[0] if thresholds else None
+        measure = value
+        if metric == "ltv" and threshold is not None:
+            measure = value - threshold["high"]
+        elif metric == "credit_score" and threshold is not None:
+            measure = threshold["low"] - value
+
+        result: Dict[str, Any] = {
+            "metric": metric,
+            "value": value,
+            "measure": round(measure, 6),
+            "threshold": threshold,
+            "compliant": None,
+            "severity": "none",
+            "authority": None,
+            "rule": None,
+            "note": None,
+        }
+        if threshold is None and metric in ("ltv", "credit_score"):
+            # The violation levels are relative to the threshold
+            result.update(
+                severity="unknown",
+                note=f"No {metric} limit of the policy applies to this application",
+            )
+            return result
+        if threshold is not None:
+            result["compliant"] = (
+                value <= threshold["high"]
+                if threshold["kind"] == "maximum"
+                else value >= threshold["low"]
+            )
+        levels = sorted(
+            (
+                rule
+                for rule in self.rules(metric, kind="violation")
+                if rule["low"] is not None
+            ),
+            key=lambda rule: SEVERITY_ORDER[rule["severity"]],
+        )
+        for rule in levels:
+            above_low = (
+                measure >= rule["low"]
+                if rule["unit"] == "months"
+                else measure > rule["low"]
+            )
+            below_high = rule["high"] is None or (
+                measure < rule["high"]
+                if rule["unit"] == "months"
+                else measure <= rule["high"]
+            )
+            if above_low and below_high:
+                result.update(
+                    severity=rule["severity"], authority=rule["authority"], rule=rule
+                )
+                break
+        if result["compliant"] is False and result["rule"] is None:
+            result.update(
+                severity="unknown",
+                note="Not compliant, but no violation level of the policy covers "
+                "this value",
+            )
+        return result
+
+
+def _default_policy_dir() -> Path:
+    policy_dir = Path(conf.POLICY_DIR)
+    if not policy_dir.is_absolute():
+        policy_dir = Path(__file__).parent.parent.parent.parent / policy_dir
+    return policy_dir
+
+
+# Process-wide rule table shared by every tool
+policy_rule_table = PolicyRuleTable(
+    policy_dir=_default_policy_dir(),
+    cache_file=conf.local_agents_memory / "policy_rules.json"
+    if conf.local_agents_memory
+    else None,
+)
@@ -0,0 +1,641 @@
+"""Deterministic risk metrics for auto loan underwriting.
+
+Encodes the formulas and thresholds of `RISK_CALCULATION_AGENT_INSTRUCTIONS`
+(DTI, LTV by vehicle age, depreciation schedule, violation severity) and
+the decision framework of `LOAN_ORCHESTRATOR_INSTRUCTIONS` with NumPy, so
+one call scores any number of applications at once. The
+risk-calculation-agent gets the complete assessment from a single
+`compute_risk_metrics` call instead of evaluating each formula through
+`calculate`, and `score_portfolio.py` scores loan portfolios without an LLM.
+"""
+
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# DTI thresholds
+DTI_NORMAL_MAX = 0.40
+DTI_VIOLATION = 0.43
+DTI_MINOR_MAX = 0.45
+DTI_MODERATE_MAX = 0.48
+
+# Credit score thresholds
+CREDIT_EXCELLENT = 700
+CREDIT_GOOD = 660
+CREDIT_MINIMUM = 620
+CREDIT_MINOR_MIN = 610
+CREDIT_MODERATE_MIN = 600
+
+# LTV maximum by vehicle age: (maximum age in years, maximum LTV)
+LTV_MAX_BY_AGE = ((0, 1.20), (3, 1.10), (6, 1.00))
+LTV_MAX_OLDER = 0.90
+LTV_MINOR_EXCESS = 0.05
+LTV_MODERATE_EXCESS = 0.10
+
+# Annual depreciation: year 1 depends on new/used, then year 2, then years 3+
+DEPRECIATION_YEAR1_NEW = 0.20
+DEPRECIATION_YEAR1_USED = 0.15
+DEPRECIATION_YEAR2 = 0.15
+DEPRECIATION_LATER = 0.10
+
+# Severity codes of the vectorized engine
+NONE, MINOR, MODERATE, MAJOR = 0, 1, 2, 3
+SEVERITY_NAMES = np.array(["none", "minor", "moderate", "major"])
+RISK_LEVELS = np.array(["low", "moderate", "high", "unacceptable"])
+
+# Outcomes of the decision framework, best to worst
+# INCOMPLETE marks rows missing a required feature, which cannot be scored
+APPROVE, REVIEW, ESCALATE, DENY, INCOMPLETE = 0, 1, 2, 3, 4
+DECISIONS = np.array(
+    ["AUTO-APPROVE", "HUMAN REVIEW", "ESCALATION REQUIRED", "AUTO-DENY", "INCOMPLETE"]
+)
+EMPLOYMENT_STABLE_YEARS = 2.0
+
+# Numeric features of an application, flat field name -> nested schema path
+FEATURE_PATHS: Dict[str, tuple] = {
+    "monthly_income": ("income", "monthly_gross"),
+    "annual_income": ("income", "annual_gross"),
+    "monthly_debt": ("credit", "monthly_debts"),
+    "credit_score": ("credit", "score"),
+    "recent_repo": ("credit", "recent_repo"),
+    "bankruptcy": ("credit", "bankruptcy"),
+    "years_employed": ("income", "years_employed"),
+    "vehicle_year": ("vehicle", "year"),
+    "vehicle_value": ("vehicle", "vehicle_value"),
+    "purchase_price": ("vehicle", "purchase_price"),
+    "negative_equity": ("vehicle", "negative_equity"),
+    "loan_amount": ("loan_request", "amount"),
+    "term_months": ("loan_request", "term_months"),
+    "proposed_payment": ("loan_request", "monthly_payment"),
+    "apr": ("loan_request", "apr"),
+}
+REQUIRED_FEATURES = ("monthly_debt", "credit_score", "loan_amount")
+
+
+def _lookup(application: Dict[str, Any], name: str) -> Any:
+    """Read a field given flat (`monthly_income`) or nested (`income.monthly_gross`)."""
+    if application.get(name) is not None:
+        return application[name]
+    value: Any = application
+    for key in FEATURE_PATHS[name]:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def _as_float(value: Any) -> float:
+    """Convert a JSON value to float: booleans to 0/1, missing to NaN."""
+    if value is None or value == "":
+        return np.nan
+    if isinstance(value, str):
+        value = value.replace("$", "").replace(",", "").replace("%", "").strip()
+        if value.lower() in ("true", "yes"):
+            return 1.0
+        if value.lower() in ("false", "no"):
+            return 0.0
+    return float(value)
+
+
+def applications_to_features(
+    applications: List[Dict[str, Any]], as_of: Optional[date] = None
+) -> Dict[str, np.ndarray]:
+    """Convert applications to one NumPy column per feature.
+
+    Each application may use the flat field names of `FEATURE_PATHS` or
+    the nested extraction schema of the box-extract-agent. Missing values
+    become NaN.
+
+    Args:
+        applications: Application dictionaries
+        as_of: Date used to compute the vehicle age (default: today)
+
+    Returns:
+        Dictionary of float arrays, plus a boolean "is_new" array
+
+    Raises:
+        ValueError: If a required field is missing or not numeric
+    """
+    features = {
+        name: np.array(
+            [_as_float(_lookup(application, name)) for application in applications],
+            dtype=float,
+        )
+        for name in FEATURE_PATHS
+    }
+    features["vehicle_type"] = np.array(
+        [
+            str(
+                application.get("vehicle_type")
+                or (application.get("vehicle") or {}).get("vehicle_type")
+                or ""
+            ).lower()
+            for application in applications
+        ]
+    )
+    features["vehicle_age"] = np.array(
+        [_as_float(application.get("vehicle_age")) for application in applications]
+    )
+    features = complete_features(features, as_of)
+
+    missing = missing_features(features)
+    if missing.any():
+        raise ValueError(
+            "Missing required fields: "
+            + ", ".join(
+                f"application {index}: {name}"
+                for name, rows in missing_feature_rows(features).items()
+                for index in rows
+            )
+        )
+    return features
+
+
+def complete_features(
+    features: Dict[str, np.ndarray], as_of: Optional[date] = None
+) -> Dict[str, np.ndarray]:
+    """Fill the derived columns: monthly income, vehicle age, value and "is_new".
+
+    Columns of `FEATURE_PATHS` that are absent are added as NaN, so
+    tabular input only needs the columns it has. A monthly income or a
+    vehicle value of zero or less is treated as missing (NaN), as no DTI
+    or LTV can be computed from it.
+
+    Args:
+        features: Float column per feature, and optionally string
+            "vehicle_type" and float "vehicle_age" columns
+        as_of: Date used to compute the vehicle age (default: today)
+
+    Returns:
+        The same dictionary, completed
+    """
+    rows = len(next(iter(features.values())))
+    for name in FEATURE_PATHS:
+        if name not in features:
+            features[name] = np.full(rows, np.nan)
+    if "vehicle_type" not in features:
+        features["vehicle_type"] = np.full(rows, "")
+    if "vehicle_age" not in features:
+        features["vehicle_age"] = np.full(rows, np.nan)
+
+    # Monthly income falls back to annual income / 12
+    features["monthly_income"] = np.where(
+        np.isnan(features["monthly_income"]),
+        features["annual_income"] / 12,
+        features["monthly_income"],
+    )
+    features["monthly_income"] = np.where(
+        features["monthly_income"] > 0, features["monthly_income"], np.nan
+    )
+    # Vehicle age from the model year when not given
+    current_year = (as_of or date.today()).year
+    features["vehicle_age"] = np.where(
+        np.isnan(features["vehicle_age"]),
+        np.maximum(current_year - features["vehicle_year"], 0),
+        features["vehicle_age"],
+    )
+    features["is_new"] = (features["vehicle_type"] == "new") | (
+        (features["vehicle_type"] == "") & (features["vehicle_age"] == 0)
+    )
+    features["vehicle_value"] = np.where(
+        np.isnan(features["vehicle_value"]),
+        features["purchase_price"],
+        features["vehicle_value"],
+    )
+    features["vehicle_value"] = np.where(
+        features["vehicle_value"] > 0, features["vehicle_value"], np.nan
+    )
+
+    return features
+
+
+def missing_feature_rows(features: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Return the indexes of the rows missing each required feature."""
+    missing = {
+        name: np.flatnonzero(np.isnan(features[name])) for name in REQUIRED_FEATURES
+    }
+    missing["positive monthly_income"] = np.flatnonzero(
+        np.isnan(features["monthly_income"])
+    )
+    missing["proposed_payment or apr"] = np.flatnonzero(
+        np.isnan(features["proposed_payment"])
+        & (np.isnan(features["apr"]) | np.isnan(features["term_months"]))
+    )
+    return {name: rows for name, rows in missing.items() if len(rows)}
+
+
+def missing_features(features: Dict[str, np.ndarray]) -> np.ndarray:
+    """Boolean mask of the rows that cannot be scored (required feature missing)."""
+    missing = np.isnan(features["proposed_payment"]) & (
+        np.isnan(features["apr"]) | np.isnan(features["term_months"])
+    )
+    for name in REQUIRED_FEATURES + ("monthly_income",):
+        missing |= np.isnan(features[name])
+    return missing
+
+
+def monthly_payment(
+    loan_amount: np.ndarray, apr: np.ndarray, term_months: np.ndarray
+) -> np.ndarray:
+    """Amortized monthly payment.
+
+    Args:
+        loan_amount: Principal
+        apr: Annual rate, as a fraction (0.0749) or a percentage (7.49)
+        term_months: Number of monthly payments
+
+    Returns:
+        Monthly payment of each loan
+    """
+    rate = np.where(apr > 1, apr / 100, apr) / 12
+    with np.errstate(divide="ignore", invalid="ignore"):
+        payment = loan_amount * rate / (1 - (1 + rate) ** -term_months)
+    return np.where(rate == 0, loan_amount / term_months, payment)
+
+
+def ltv_maximum(vehicle_age: np.ndarray, is_new: np.ndarray) -> np.ndarray:
+    """Maximum LTV allowed for each vehicle age.
+
+    NaN for a used vehicle of unknown age: no cap is assumed for it.
+    """
+    conditions = [is_new] + [vehicle_age <= age for age, _ in LTV_MAX_BY_AGE]
+    choices = [LTV_MAX_BY_AGE[0][1]] + [maximum for _, maximum in LTV_MAX_BY_AGE]
+    maximum = np.select(conditions, choices, default=LTV_MAX_OLDER)
+    return np.where(np.isnan(vehicle_age) & ~is_new, np.nan, maximum)
+
+
+def projected_value(
+    vehicle_value: np.ndarray, is_new: np.ndarray, term_months: np.ndarray
+) -> np.ndarray:
+    """Vehicle value at loan maturity, following the depreciation schedule.
+
+    A partial last year depreciates pro rata (compounded).
+
+    Args:
+        vehicle_value: Current value
+        is_new: Whether each vehicle is new (year 1 rate)
+        term_months: Loan terms
+
+    Returns:
+        Projected value at maturity
+    """
+    term_years = np.nan_to_num(term_months, nan=0.0) / 12
+    years = max(int(np.ceil(term_years.max(initial=0.0))), 1)
+    rates = np.full((len(vehicle_value), years), DEPRECIATION_LATER)
+    rates[:, 0] = np.where(is_new, DEPRECIATION_YEAR1_NEW, DEPRECIATION_YEAR1_USED)
+    if years > 1:
+        rates[:, 1] = DEPRECIATION_YEAR2
+    # Share of each year covered by the loan (1, ..., 1, fraction, 0, ...)
+    exposure = np.clip(term_years[:, None] - np.arange(years)[None, :], 0.0, 1.0)
+    return vehicle_value * np.prod((1 - rates) ** exposure, axis=1)
+
+
+def assess_risk(features: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Compute metrics, violation severities and risk levels for all applications.
+
+    Args:
+        features: Columns returned by `applications_to_features`
+
+    Returns:
+        Dictionary of arrays: metrics, a severity code per rule
+        (`NONE`..`MAJOR`), violation counts and the risk level code
+    """
+    payment = np.where(
+        np.isnan(features["proposed_payment"]),
+        monthly_payment(
+            features["loan_amount"], features["apr"], features["term_months"]
+        ),
+        features["proposed_payment"],
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dti = (features["monthly_debt"] + payment) / features["monthly_income"]
+        ltv = features["loan_amount"] / features["vehicle_value"]
+    credit = features["credit_score"]
+    ltv_max = ltv_maximum(features["vehicle_age"], features["is_new"])
+    ltv_excess = ltv - ltv_max
+
+    dti_severity = np.select(
+        [dti > DTI_MODERATE_MAX, dti > DTI_MINOR_MAX, dti > DTI_VIOLATION],
+        [MAJOR, MODERATE, MINOR],
+        default=NONE,
+    )
+    credit_severity = np.select(
+        [
+            credit < CREDIT_MODERATE_MIN,
+            credit < CREDIT_MINOR_MIN,
+            credit < CREDIT_MINIMUM,
+        ],
+        [MAJOR, MODERATE, MINOR],
+        default=NONE,
+    )
+    ltv_severity = np.select(
+        [
+            ltv_excess > LTV_MODERATE_EXCESS,
+            ltv_excess > LTV_MINOR_EXCESS,
+            ltv_excess > 0,
+        ],
+        [MAJOR, MODERATE, MINOR],
+        default=NONE,
+    )
+    repo_severity = np.where(features["recent_repo"] > 0, MAJOR, NONE)
+    bankruptcy_severity = np.where(features["bankruptcy"] > 0, MAJOR, NONE)
+
+    severities = np.stack(
+        [
+            dti_severity,
+            credit_severity,
+            ltv_severity,
+            repo_severity,
+            bankruptcy_severity,
+        ]
+    )
+    minor = (severities == MINOR).sum(axis=0)
+    moderate = (severities == MODERATE).sum(axis=0)
+    major = (severities == MAJOR).sum(axis=0)
+    total = minor + moderate + major
+    warnings = (dti > DTI_NORMAL_MAX) | (credit < CREDIT_EXCELLENT)
+
+    risk_level = np.select(
+        [
+            (major > 0) | (total >= 3),
+            (moderate > 0) | (minor >= 2),
+            (minor > 0) | warnings,
+        ],
+        [3, 2, 1],
+        default=0,
+    )
+
+    vehicle_value = features["vehicle_value"]
+    value_at_maturity = projected_value(
+        vehicle_value, features["is_new"], features["term_months"]
+    )
+    term_years = features["term_months"] / 12
+    with np.errstate(divide="ignore", invalid="ignore"):
+        annual_rate = 1 - (value_at_maturity / vehicle_value) ** (1 / term_years)
+
+    return {
+        "dti": dti,
+        "ltv": ltv,
+        "ltv_max": ltv_max,
+        "proposed_payment": payment,
+        "dti_severity": dti_severity,
+        "credit_severity": credit_severity,
+        "ltv_severity": ltv_severity,
+        "repo_severity": repo_severity,
+        "bankruptcy_severity": bankruptcy_severity,
+        "minor": minor,
+        "moderate": moderate,
+        "major": major,
+        "total_violations": total,
+        "risk_level": risk_level,
+        "projected_value": value_at_maturity,
+        "annual_depreciation": annual_rate,
+    }
+
+
+# Rules reported in the violation codes: (severity array, code prefix)
+VIOLATION_RULES = (
+    ("dti_severity", "DTI"),
+    ("credit_severity", "CREDIT"),
+    ("ltv_severity", "LTV"),
+    ("repo_severity", "REPO"),
+    ("bankruptcy_severity", "BANKRUPTCY"),
+)
+# Decision flags that are not policy violations: (flag array, code)
+DECISION_FLAGS = (
+    ("negative_equity", "NEGATIVE_EQUITY"),
+    ("unstable_employment", "EMPLOYMENT"),
+    ("unknown_ltv", "LTV_UNKNOWN"),
+    ("unknown_employment", "EMPLOYMENT_UNKNOWN"),
+)
+
+
+def _violation_code(key: int) -> str:
+    """Decode a packed violation key (2 bits per rule, then 1 bit per flag)."""
+    codes = []
+    for _, prefix in VIOLATION_RULES:
+        severity = key & 3
+        if severity:
+            codes.append(f"{prefix}_{SEVERITY_NAMES[severity].upper()}")
+        key >>= 2
+    for _, code in DECISION_FLAGS:
+        if key & 1:
+            codes.append(code)
+        key >>= 1
+    return ";".join(codes)
+
+
+def underwriting_decisions(
+    features: Dict[str, np.ndarray], result: Dict[str, np.ndarray]
+) -> Dict[str, np.ndarray]:
+    """Apply the four-way decision framework to every application.
+
+    Each application gets the worst outcome whose criteria it meets:
+    AUTO-DENY (a major violation, 3+ violations, credit < 620, DTI > 48%),
+    ESCALATION REQUIRED (a moderate violation, 2+ minor violations, credit
+    < 660, DTI > 43%, LTV over its limit, negative equity, employment under
+    2 years), HUMAN REVIEW (a minor violation, credit < 700, DTI > 40%, LTV
+    that cannot be checked, unknown employment), otherwise AUTO-APPROVE.
+    Auto-approval needs a checked LTV and stable employment, so missing
+    inputs are HUMAN REVIEW at best. Unknown negative equity does not
+    prevent approval. Rows missing a required feature are INCOMPLETE.
+
+    Args:
+        features: Columns returned by `complete_features`
+        result: Arrays returned by `assess_risk`
+
+    Returns:
+        Dictionary with the "decision" code (index in `DECISIONS`) and the
+        "violation_codes" of each application, e.g. "DTI_MINOR;LTV_MAJOR"
+    """
+    dti = result["dti"]
+    credit = features["credit_score"]
+    flags = {
+        "negative_equity": features["negative_equity"] > 0,
+        "unstable_employment": features["years_employed"] < EMPLOYMENT_STABLE_YEARS,
+        # No vehicle value, or a used vehicle of unknown age
+        "unknown_ltv": np.isnan(result["ltv"]) | np.isnan(result["ltv_max"]),
+        "unknown_employment": np.isnan(features["years_employed"]),
+    }
+    minor, moderate, major = result["minor"], result["moderate"], result["major"]
+
+    decision = np.select(
+        [
+            missing_features(features),
+            (major > 0)
+            | (result["total_violations"] >= 3)
+            | (credit < CREDIT_MINIMUM)
+            | (dti > DTI_MODERATE_MAX),
+            (moderate > 0)
+            | (minor >= 2)
+            | (credit < CREDIT_GOOD)
+            | (dti > DTI_VIOLATION)
+            | (result["ltv"] > result["ltv_max"])
+            | flags["negative_equity"]
+            | flags["unstable_employment"],
+            (minor > 0)
+            | (credit < CREDIT_EXCELLENT)
+            | (dti > DTI_NORMAL_MAX)
+            | flags["unknown_ltv"]
+            | flags["unknown_employment"],
+        ],
+        [INCOMPLETE, DENY, ESCALATE, REVIEW],
+        default=APPROVE,
+    )
+
+    # Pack the violations of each row into one integer, then decode each
+    # distinct combination once instead of building a string per row
+    key = np.zeros(len(decision), dtype=np.int64)
+    shift = 0
+    for name, _ in VIOLATION_RULES:
+        key |= result[name].astype(np.int64) << shift
+        shift += 2
+    for name, _ in DECISION_FLAGS:
+        key |= flags[name].astype(np.int64) << shift
+        shift += 1
+    keys, inverse = np.unique(key, return_inverse=True)
+    codes = np.array([_violation_code(int(k)) for k in keys], dtype=object)
+
+    return {"decision": decision, "violation_codes": codes[inverse]}
+
+
+def _round(value: float, digits: int) -> Optional[float]:
+    return None if np.isnan(value) else round(float(value), digits)
+
+
+def _credit_tier(score: float) -> str:
+    if score >= CREDIT_EXCELLENT:
+        return "excellent"
+    if score >= CREDIT_GOOD:
+        return "good"
+    if score >= CREDIT_MINIMUM:
+        return "fair"
+    return "below minimum"
+
+
+def compute_risk_assessments(
+    applications: List[Dict[str, Any]], as_of: Optional[date] = None
+) -> List[Dict[str, Any]]:
+    """Score applications and build the risk assessment JSON of each one.
+
+    The output follows the format of `RISK_CALCULATION_AGENT_INSTRUCTIONS`.
+
+    Args:
+        applications: Application dictionaries (flat or extraction schema)
+        as_of: Date used to compute the vehicle age (default: today)
+
+    Returns:
+        One risk assessment per application, in input order
+
+    Raises:
+        ValueError: If a required field is missing or not numeric
+    """
+    if not applications:
+        return []
+    features = applications_to_features(applications, as_of)
+    result = assess_risk(features)
+
+    assessments = []
+    for i in range(len(applications)):
+        dti = result["dti"][i]
+        ltv = result["ltv"][i]
+        ltv_max = result["ltv_max"][i]
+        vehicle_age = features["vehicle_age"][i]
+        credit = features["credit_score"][i]
+        dti_status = (
+            "DTI within acceptable range"
+            if dti <= DTI_NORMAL_MAX
+            else "DTI in warning range (40-43%)"
+            if dti <= DTI_VIOLATION
+            else "DTI exceeds 43% maximum"
+        )
+        violations = [
+            {
+                "rule": "DTI Maximum",
+                "threshold": DTI_VIOLATION,
+                "actual": _round(dti, 3),
+                "severity": str(SEVERITY_NAMES[result["dti_severity"][i]]),
+                "description": f"{dti_status} ({dti:.1%})",
+            },
+            {
+                "rule": "Credit Score Minimum",
+                "threshold": CREDIT_MINIMUM,
+                "actual": int(credit),
+                "severity": str(SEVERITY_NAMES[result["credit_severity"][i]]),
+                "description": f"Credit score {int(credit)} is {_credit_tier(credit)}",
+            },
+            {
+                "rule": "LTV Maximum",
+                "threshold": _round(ltv_max, 2),
+                "actual": _round(ltv, 3),
+                # The LTV rule cannot be checked without the value and the cap
+                "severity": "unknown"
+                if np.isnan(ltv) or np.isnan(ltv_max)
+                else str(SEVERITY_NAMES[result["ltv_severity"][i]]),
+                "description": (
+                    "LTV unknown (no vehicle value)"
+                    if np.isnan(ltv)
+                    else f"LTV {ltv:.1%}, maximum unknown (vehicle of unknown age, "
+                    "provide the model year or age)"
+                    if np.isnan(ltv_max)
+                    else f"LTV {ltv:.1%} against a {ltv_max:.0%} maximum for a new vehicle"
+                    if np.isnan(vehicle_age)
+                    else f"LTV {ltv:.1%} against a {ltv_max:.0%} "
+                    f"maximum for a {int(vehicle_age)}-year-old vehicle"
+                ),
+            },
+        ]
+        if result["repo_severity"][i]:
+            violations.append(
+                {
+                    "rule": "Recent Repossession",
+                    "threshold": None,
+                    "actual": True,
+                    "severity": "major",
+                    "description": "Recent auto repossession",
+                }
+            )
+        if result["bankruptcy_severity"][i]:
+            violations.append(
+                {
+                    "rule": "Bankruptcy",
+                    "threshold": None,
+                    "actual": True,
+                    "severity": "major",
+                    "description": "Bankruptcy on record",
+                }
+            )
+
+        assessments.append(
+            {
+                "metrics": {
+                    "dti": _round(dti, 3),
+                    "ltv": _round(ltv, 3),
+                    "credit_score": int(credit),
+                    "monthly_income": _round(features["monthly_income"][i], 2),
+                    "monthly_debt": _round(features["monthly_debt"][i], 2),
+                    "proposed_payment": _round(result["proposed_payment"][i], 2),
+                },
+                "violations": violations,
+                "risk_level": str(RISK_LEVELS[result["risk_level"][i]]),
+                "total_violations": int(result["total_violations"][i]),
+                "violation_breakdown": {
+                    "minor": int(result["minor"][i]),
+                    "moderate": int(result["moderate"][i]),
+                    "major": int(result["major"][i]),
+                },
+                "vehicle_depreciation": {
+                    "current_value": _round(features["vehicle_value"][i], 2),
+                    "projected_value_at_maturity": _round(
+                        result["projected_value"][i], 2
+                    ),
+                    "depreciation_rate": (
+                        "unknown"
+                        if np.isnan(result["annual_depreciation"][i])
+                        else f"{result['annual_depreciation'][i]:.1%} per year"
+                    ),
+                },
+            }
+        )
+    return assessments
@@ -20,6 +20,7 @@ from agents.research_agent.research_prompts import (
 )
 from agents.research_agent.research_tools import tavily_search, think_tool
 from app_config import conf
+from utils.agent_metrics import AgentMetrics, AgentMetricsCallbackHandler
 
 
 def orchestrator_create() -> CompiledStateGraph:
@@ -87,4 +88,25 @@ def orchestrator_create() -> CompiledStateGraph:
         backend=backend,  # type: ignore
     )
 
+    if conf.AGENT_METRICS_ENABLED:
+        # Inherited by the research sub-agents, models and tools of each run
+        agent = agent.with_config(
+            callbacks=[
+                AgentMetricsCallbackHandler(
+                    "research", on_run_end=_write_research_metrics
+                )
+            ]
+        )  # type: ignore
+
     return agent
+
+
+def _write_research_metrics(metrics: AgentMetrics) -> None:
+    """Write the metrics summary of a research run to the memories folder."""
+    memories_folder = Path(conf.local_agents_memory)  # type: ignore
+    (memories_folder / "research_metrics.md").write_text(
+        metrics.summary_markdown("Research Run Metrics"), encoding="utf-8"
+    )
+    (memories_folder / "research_metrics.json").write_text(
+        metrics.to_json(), encoding="utf-8"
+    )
@@ -2,6 +2,7 @@ from pathlib import Path
 from typing import Optional
 
 from box_sdk_gen import BoxClient
+from pydantic import Field
 from pydantic_settings import BaseSettings
 
 
@@ -24,6 +25,69 @@ class _APP_Config(BaseSettings):
     TAVILY_API_KEY: str
     ANTHROPIC_API_KEY: str
     AGENTS_MEMORY_FOLDER: str = "agents_memories"
+    POLICY_DIR: str = "data/Policies"  # Policy markdown compiled into rules
+    # Share of the query terms the best local search passage must contain,
+    # below it agents fall back to Box AI
+    SEARCH_INDEX_MIN_COVERAGE: float = 0.6
+
+    # Box Caching Configuration
+    BOX_FOLDER_CACHE_TTL_SECONDS: float = 300.0
+    BOX_FOLDER_CACHE_MAX_ENTRIES: int = 256
+    BOX_AI_CACHE_ENABLED: bool = True
+    BOX_AI_CACHE_FILE: str = ".box_ai_cache.sqlite"
+    BOX_AI_CACHE_MAX_ENTRIES: int = 2000
+
+    # Concurrency Configuration
+    BOX_IO_MAX_WORKERS: int = 8  # Threads running blocking Box calls for async tools
+    BOX_BATCH_MAX_CONCURRENCY: int = 4  # Parallel Box AI extracts per tool call
+    BOX_UPLOAD_MAX_WORKERS: int = 8  # Concurrent requests of the folder upload engine
+    LOAN_BATCH_MAX_CONCURRENCY: int = 4  # Applicants underwritten at once by demo_loan
+
+    # Box Client Configuration
+    BOX_VERIFY_ON_STARTUP: bool = False  # Call users/me when creating the client
+    BOX_TOKEN_FILE: str = ".auth.ccg.json"  # Shared by processes, relative to project
+    BOX_TOKEN_REFRESH_MARGIN_SECONDS: float = 300.0
+
+    # HTTP Connection Pool Configuration (shared by every Box client)
+    BOX_HTTP_POOL_CONNECTIONS: int = 4  # Hosts pooled (api, upload, ...)
+    BOX_HTTP_POOL_MAXSIZE: int = 32  # Keep-alive connections per host
+    BOX_HTTP_POOL_BLOCK: bool = False  # Wait for a free connection when full
+    BOX_HTTP_KEEP_ALIVE: bool = True
+    BOX_HTTP_CONNECT_TIMEOUT: float = 5.0
+    BOX_HTTP_READ_TIMEOUT: float = 60.0
+    BOX_HTTP_MAX_ATTEMPTS: int = 5  # Box retry strategy, honors Retry-After
+    BOX_HTTP_RETRY_BASE_INTERVAL: float = 1.0
+    BOX_HTTP_MAX_RETRIES_ON_EXCEPTION: int = 2
+
+    # Rate Limit Configuration (calls per second per endpoint class, 0 = no limit)
+    BOX_RATE_LIMIT_ENABLED: bool = True
+    BOX_RATE_CONTENT_PER_SECOND: float = 12.0
+    BOX_RATE_AI_ASK_PER_SECOND: float = 2.0
+    BOX_RATE_AI_EXTRACT_PER_SECOND: float = 2.0
+    BOX_RATE_UPLOAD_PER_SECOND: float = 4.0
+    BOX_RATE_RETRY_AFTER_JITTER: float = 0.25  # Extra random share of Retry-After
+
+    # Loan Job Queue Configuration (src/loan_worker.py)
+    LOAN_JOB_QUEUE_FILE: str = ".loan_jobs.sqlite"  # Relative to the project
+    LOAN_JOB_LEASE_SECONDS: float = 600.0  # Re-leased if no heartbeat for this long
+    LOAN_JOB_HEARTBEAT_SECONDS: float = 30.0
+    LOAN_JOB_MAX_ATTEMPTS: int = 3
+    LOAN_JOB_RETRY_BASE_SECONDS: float = 30.0  # Doubled on each failed attempt
+    LOAN_WORKER_PROCESSES: int = 0  # 0 = one process per CPU core
+    LOAN_WORKER_POLL_SECONDS: float = 2.0  # Wait when no job is ready
+
+    # Agent Instrumentation (latency, tokens and payload bytes per call)
+    AGENT_METRICS_ENABLED: bool = True
+
+    # Box Call Tracing (nested spans of the Box SDK calls, written on exit)
+    BOX_TRACE_ENABLED: bool = False
+    BOX_TRACE_FILE: str = "box_trace.json"  # Relative to the agents memories folder
+    BOX_TRACE_FORMAT: str = "chrome"  # "chrome" (trace event format) or "otlp"
+    BOX_TRACE_MAX_SPANS: int = 100_000  # The oldest spans are dropped first
+
+    # Chunked Upload Configuration (Box requires files of at least 20 MB)
+    BOX_CHUNKED_UPLOAD_THRESHOLD_MB: int = Field(default=50, ge=20)
+    BOX_CHUNKED_UPLOAD_WORKERS: int = 4  # Parts uploaded in parallel per file
 
     model_config = {
         "env_file": ".env",
@@ -33,19 +97,20 @@ class _APP_Config(BaseSettings):
         "validate_assignment": True,  # Validate on assignment
     }
 
-    box_client: Optional[BoxClient] = None
     local_agents_memory: Optional[Path] = None
 
+    @property
+    def box_client(self) -> BoxClient:
+        """Shared Box client, authenticated on first use."""
+        from utils.box_api_auth import get_shared_box_client
+
+        return get_shared_box_client()
+
 
 # Global config instance - import this from other modules
 # Usage: from src.config import config
 conf = _APP_Config()  # type: ignore
 
-# Initialize box_client after conf is created (breaks circular import)
-from utils.box_api_auth import get_box_client  # noqa: E402
-
-conf.box_client = get_box_client()
-
 # Memories folder is on the project folder
 memories_folder = Path(__file__).parent.parent / conf.AGENTS_MEMORY_FOLDER
 memories_folder.mkdir(parents=True, exist_ok=True)
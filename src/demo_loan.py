@@ -1,14 +1,26 @@
 """Test script for the loan underwriting orchestrator.
 
 This script demonstrates how to use the loan orchestrator to process
-loan applications from Box.
+loan applications from Box, one at a time with streamed output or as a
+concurrent batch on a single event loop.
 """
 
 import asyncio
 import logging
+import time
+from typing import Any, Dict, List, Optional
 
-from agents.loan_orchestrator import loan_orchestrator_create
-from utils.display_messages import stream_agent
+from rich.table import Table
+
+from agents.loan_orchestrator import (
+    extract_loan_decision,
+    get_loan_orchestrator,
+    loan_run_config,
+)
+from app_config import conf
+from utils.agent_metrics import agent_metrics, write_metrics_files
+from utils.box_rate_limit import PRIORITY_BATCH, box_priority
+from utils.display_messages import console, stream_agent
 
 # Configure logging
 logging.basicConfig(
@@ -23,10 +35,10 @@ async def test_loan_application(applicant_name: str):
     Args:
         applicant_name: Name of the loan applicant to process
     """
-    logger.info(f"Creating loan orchestrator for applicant: {applicant_name}")
+    logger.info(f"Running loan orchestrator for applicant: {applicant_name}")
 
-    # Create the orchestrator
-    agent = loan_orchestrator_create(applicant_name=applicant_name)
+    # Shared orchestrator, compiled once per process
+    agent = get_loan_orchestrator()
 
     # Process the loan application
     request = f"Please process the auto loan application for {applicant_name} and provide a complete underwriting decision."
@@ -48,11 +60,130 @@ async def test_loan_application(applicant_name: str):
                 }
             ]
         },
+        config=loan_run_config(applicant_name),
     )
 
     print("\n\n" + "=" * 80)
     print("PROCESSING COMPLETE")
     print("=" * 80 + "\n")
+    export_agent_metrics()
+
+
+def export_agent_metrics() -> None:
+    """Write the metrics of every run of this process, as JSON and Prometheus text.
+
+    The files are `agent_metrics.json` and `agent_metrics.prom` in the
+    memories folder. Each run's summary is in the applicant's folder.
+    """
+    if conf.AGENT_METRICS_ENABLED and conf.local_agents_memory:
+        write_metrics_files(agent_metrics, conf.local_agents_memory, "agent_metrics")
+
+
+async def underwrite_applicant(
+    applicant_name: str, semaphore: asyncio.Semaphore
+) -> Dict[str, Any]:
+    """Underwrite one applicant of a batch, without streaming its messages.
+
+    Each run gets its own thread ID and applicant-specific memories folder
+    through the run config, so concurrent runs do not share state.
+
+    Args:
+        applicant_name: Name of the loan applicant to process
+        semaphore: Bounds the number of applicants processed at once
+
+    Returns:
+        Dict with "applicant", "decision", "seconds" and "error"
+    """
+    request = f"Please process the auto loan application for {applicant_name} and provide a complete underwriting decision."
+    async with semaphore:
+        logger.info(f"Starting underwriting for: {applicant_name}")
+        started = time.perf_counter()
+        try:
+            # Batch runs yield to interactive runs on the Box rate limits
+            with box_priority(PRIORITY_BATCH):
+                state = await get_loan_orchestrator().ainvoke(
+                    {"messages": [{"role": "user", "content": request}]},
+                    config=loan_run_config(applicant_name),
+                )
+            decision, error = extract_loan_decision(state), None
+        except Exception as e:
+            logger.error(f"Error processing {applicant_name}: {str(e)}", exc_info=True)
+            decision, error = "ERROR", str(e)
+        seconds = time.perf_counter() - started
+        logger.info(f"Finished {applicant_name} in {seconds:.1f}s: {decision}")
+    return {
+        "applicant": applicant_name,
+        "decision": decision,
+        "seconds": seconds,
+        "error": error,
+    }
+
+
+async def underwrite_batch(
+    applicants: List[str], max_concurrency: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Underwrite several applicants concurrently on the current event loop.
+
+    Args:
+        applicants: Names of the loan applicants to process
+        max_concurrency: Maximum number of applicants processed at once
+            (default: LOAN_BATCH_MAX_CONCURRENCY)
+
+    Returns:
+        One result per applicant, in input order
+    """
+    semaphore = asyncio.Semaphore(max_concurrency or conf.LOAN_BATCH_MAX_CONCURRENCY)
+    # Compile the shared graph before the runs start
+    get_loan_orchestrator()
+    return await asyncio.gather(
+        *(underwrite_applicant(applicant, semaphore) for applicant in applicants)
+    )
+
+
+def print_batch_summary(results: List[Dict[str, Any]], wall_seconds: float) -> None:
+    """Print the decisions and latencies of a batch.
+
+    Args:
+        results: Results returned by underwrite_batch
+        wall_seconds: Wall clock time of the whole batch
+    """
+    table = Table(title="Underwriting Batch Summary")
+    table.add_column("Applicant")
+    table.add_column("Decision")
+    table.add_column("Latency (s)", justify="right")
+    table.add_column("Error")
+    for result in results:
+        table.add_row(
+            result["applicant"],
+            result["decision"],
+            f"{result['seconds']:.1f}",
+            result["error"] or "",
+        )
+    console.print(table)
+
+    sequential_seconds = sum(result["seconds"] for result in results)
+    console.print(
+        f"Wall clock: {wall_seconds:.1f}s for {len(results)} applicants "
+        f"(sum of latencies {sequential_seconds:.1f}s, "
+        f"{sequential_seconds / max(wall_seconds, 1e-9):.1f}x speed-up)"
+    )
+
+
+async def main_batch(applicants: List[str], max_concurrency: Optional[int] = None):
+    """Run loan processing for several applicants concurrently and summarize.
+
+    Args:
+        applicants: Names of the loan applicants to process
+        max_concurrency: Maximum number of applicants processed at once
+    """
+    print("\n" + "🎯 " * 20)
+    print("LOAN UNDERWRITING ORCHESTRATOR - CONCURRENT BATCH")
+    print("🎯 " * 20 + "\n")
+
+    started = time.perf_counter()
+    results = await underwrite_batch(applicants, max_concurrency)
+    print_batch_summary(results, time.perf_counter() - started)
+    export_agent_metrics()
 
 
 async def main():
@@ -98,3 +229,10 @@ if __name__ == "__main__":
 
     # Or run all tests:
     # asyncio.run(main())
+
+    # Or underwrite all applicants concurrently and print a summary table:
+    # asyncio.run(
+    #     main_batch(
+    #         ["Sarah Chen", "Marcus Johnson", "David Martinez", "Jennifer Lopez"]
+    #     )
+    # )
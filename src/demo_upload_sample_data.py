@@ -2,25 +2,38 @@ import logging
 from pathlib import Path
 from typing import Dict
 
+from agents.loan_underwriting.policy_index import policy_search_index
 from app_config import conf
-from utils.box_api_auth import get_box_client
+from utils.box_api_auth import get_shared_box_client
 from utils.box_api_generic import (
     box_folder_create,
-    local_folder_upload,
-    save_upload_cache_to_json,
+    local_folder_upload_concurrent,
 )
+from utils.box_sync import SyncManifest
+from utils.upload_journal import UploadJournal
 
 logger = logging.getLogger(__name__)
 
 
-def main() -> None:
-    """Upload sample data to Box."""
+def main(
+    incremental: bool = True, resume: bool = True, index_documents: bool = True
+) -> None:
+    """Upload sample data to Box.
+
+    Args:
+        incremental: Skip files whose content already matches Box (SHA-1),
+            tracking local digests in `box_sync_manifest.json`
+        resume: Skip the items completed by an interrupted previous run,
+            as recorded in `box_upload_journal.jsonl`
+        index_documents: Add the text of new or changed application
+            documents to the local search index (`search_index.json`)
+    """
 
     logger.info("Starting sample data upload process")
 
     try:
         # Get authenticated Box client
-        client = get_box_client()
+        client = get_shared_box_client()
         logger.debug("Box client ready for upload operations")
 
         # Get the base folder ID from config
@@ -40,17 +53,57 @@ def main() -> None:
 
         logger.info("Uploading data from: %s", data_dir)
 
-        # Cache for tracking uploaded files and folders
-        folder_cache: Dict[str, Dict[str, str]] = {}
-        local_folder_upload(client, data_dir, base_folder_id, folder_cache)
-
         # Memories folder is on the project folder
         memories_folder = conf.local_agents_memory
-        # Save the upload cache to a JSON file
         if memories_folder is None:
             raise ValueError("Local agents memory folder is not configured.")
+
+        # Manifest of local digests, kept next to the upload cache
+        sync_manifest = None
+        if incremental:
+            sync_manifest = SyncManifest(
+                memories_folder / "box_sync_manifest.json", data_dir
+            )
+
+        # Journal of completed items, compacted into the upload cache on success
+        journal = UploadJournal(
+            memories_folder / "box_upload_journal.jsonl", data_dir, resume=resume
+        )
+
+        # Cache for tracking uploaded files and folders
+        folder_cache: Dict[str, Dict[str, str]] = {}
+        try:
+            local_folder_upload_concurrent(
+                client,
+                data_dir,
+                base_folder_id,
+                folder_cache,
+                max_workers=conf.BOX_UPLOAD_MAX_WORKERS,
+                sync_manifest=sync_manifest,
+                journal=journal,
+            )
+        finally:
+            journal.close()
+            if sync_manifest is not None:
+                sync_manifest.save()
+
+        # Save the upload cache to a JSON file
         cache_file = memories_folder / "box_upload_cache.json"
-        save_upload_cache_to_json(folder_cache, cache_file)
+        journal.compact(folder_cache, cache_file)
+
+        # Index the text Box extracted from the documents, for local search.
+        # The upload succeeded, so a failure here only degrades search.
+        if index_documents:
+            try:
+                indexed = policy_search_index.index_uploaded_documents(
+                    client,
+                    folder_cache,
+                    sync_manifest=sync_manifest,
+                    max_workers=conf.BOX_UPLOAD_MAX_WORKERS,
+                )
+                logger.info("Indexed the text of %d document(s)", indexed)
+            except Exception as e:
+                logger.warning("Failed to index the uploaded documents: %s", e)
 
         logger.info("Sample data upload completed successfully")
         logger.info("Uploaded %d items (files and folders)", len(folder_cache))
@@ -0,0 +1,274 @@
+"""Queue-driven loan underwriting workers.
+
+Applications are enqueued in a durable SQLite job queue and processed by K
+worker processes, each running the loan orchestrator on the jobs it leases.
+While a job runs, its worker renews the lease with heartbeats. A job whose
+worker died is re-leased by another worker once its lease expires.
+
+Usage:
+    uv run src/loan_worker.py enqueue "Sarah Chen" "Marcus Johnson"
+    uv run src/loan_worker.py work --processes 4
+    uv run src/loan_worker.py work --drain   # exit when the queue is empty
+    uv run src/loan_worker.py status
+"""
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from rich.table import Table
+
+from agents.loan_orchestrator import (
+    extract_loan_decision,
+    get_loan_orchestrator,
+    loan_run_config,
+)
+from app_config import conf
+from utils.box_rate_limit import PRIORITY_BATCH, box_priority
+from utils.box_trace import box_tracer, write_box_trace
+from utils.display_messages import console
+from utils.job_queue import JobQueue
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def get_loan_job_queue() -> JobQueue:
+    """Open the loan job queue configured in `_APP_Config`."""
+    queue_file = Path(conf.LOAN_JOB_QUEUE_FILE)
+    if not queue_file.is_absolute():
+        queue_file = Path(__file__).parent.parent / queue_file
+    return JobQueue(
+        queue_file,
+        lease_seconds=conf.LOAN_JOB_LEASE_SECONDS,
+        max_attempts=conf.LOAN_JOB_MAX_ATTEMPTS,
+        retry_base_seconds=conf.LOAN_JOB_RETRY_BASE_SECONDS,
+    )
+
+
+async def _heartbeat(queue: JobQueue, job_id: int, worker_id: str) -> None:
+    """Renew the lease of a job until cancelled or until the lease is lost."""
+    while True:
+        await asyncio.sleep(conf.LOAN_JOB_HEARTBEAT_SECONDS)
+        try:
+            renewed = await asyncio.to_thread(queue.heartbeat, job_id, worker_id)
+        except sqlite3.Error as e:
+            # The lease is still valid for a while, try again next beat
+            logger.warning(f"Heartbeat of job {job_id} failed: {str(e)}")
+            continue
+        if not renewed:
+            logger.warning(f"Worker {worker_id} lost the lease of job {job_id}")
+            return
+
+
+async def process_job(
+    queue: JobQueue, job: Dict[str, Any], worker_id: str
+) -> Optional[Dict[str, Any]]:
+    """Run the loan orchestrator on a leased job and record its outcome.
+
+    The run is cancelled if the lease is lost, since another worker then
+    owns the job.
+
+    Args:
+        queue: Queue the job was leased from
+        job: Leased job
+        worker_id: Worker holding the lease
+
+    Returns:
+        The job result, or None if the run failed or the lease was lost
+    """
+    applicant_name = job["applicant_name"]
+    request = f"Please process the auto loan application for {applicant_name} and provide a complete underwriting decision."
+    logger.info(
+        f"Worker {worker_id} processing job {job['id']} for {applicant_name} "
+        f"(attempt {job['attempts']}/{queue.max_attempts})"
+    )
+
+    async def run() -> Dict[str, Any]:
+        # Queued runs yield to interactive runs on the Box rate limits
+        with box_priority(PRIORITY_BATCH):
+            return await get_loan_orchestrator().ainvoke(
+                {"messages": [{"role": "user", "content": request}]},
+                config=loan_run_config(
+                    applicant_name, thread_id=f"job-{job['id']}-{job['attempts']}"
+                ),
+            )
+
+    started = time.perf_counter()
+    run_task = asyncio.create_task(run())
+    heartbeat_task = asyncio.create_task(_heartbeat(queue, job["id"], worker_id))
+    try:
+        await asyncio.wait(
+            {run_task, heartbeat_task}, return_when=asyncio.FIRST_COMPLETED
+        )
+    finally:
+        heartbeat_task.cancel()
+
+    if not run_task.done():
+        run_task.cancel()
+        return None
+
+    try:
+        state = run_task.result()
+    except Exception as e:
+        logger.error(f"Error processing job {job['id']}: {str(e)}", exc_info=True)
+        await asyncio.to_thread(queue.fail, job["id"], worker_id, str(e))
+        return None
+
+    result = {
+        "decision": extract_loan_decision(state),
+        "seconds": round(time.perf_counter() - started, 3),
+        "worker": worker_id,
+    }
+    if not await asyncio.to_thread(queue.complete, job["id"], worker_id, result):
+        logger.warning(f"Job {job['id']} finished after its lease was lost")
+        return None
+    logger.info(
+        f"Job {job['id']} for {applicant_name}: {result['decision']} "
+        f"in {result['seconds']:.1f}s"
+    )
+    return result
+
+
+async def worker_loop(worker_id: str, stop_event: Any, drain: bool = False) -> int:
+    """Lease and process jobs until asked to stop.
+
+    Args:
+        worker_id: Unique identifier of this worker
+        stop_event: Event set to stop after the current job
+        drain: Exit once no job is pending or leased
+
+    Returns:
+        int: Number of jobs completed
+    """
+    queue = get_loan_job_queue()
+    # Compile the shared graph before leasing the first job
+    get_loan_orchestrator()
+    completed = 0
+    while not stop_event.is_set():
+        job = await asyncio.to_thread(queue.lease, worker_id)
+        if job is None:
+            stats = await asyncio.to_thread(queue.stats)
+            if drain and stats["pending"] == 0 and stats["leased"] == 0:
+                break
+            await asyncio.sleep(conf.LOAN_WORKER_POLL_SECONDS)
+            continue
+        if await process_job(queue, job, worker_id) is not None:
+            completed += 1
+    logger.info(f"Worker {worker_id} stopping after {completed} job(s)")
+    return completed
+
+
+def run_worker(worker_index: int, stop_event: Any, drain: bool = False) -> None:
+    """Entry point of a worker process.
+
+    Ctrl+C is handled by the parent, which sets `stop_event`, so each worker
+    finishes its current job instead of abandoning it.
+
+    Args:
+        worker_index: Index of the process, used in its worker ID
+        stop_event: Event shared by every worker process
+        drain: Exit once no job is pending or leased
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    worker_id = f"{socket.gethostname()}-{os.getpid()}-{worker_index}"
+    asyncio.run(worker_loop(worker_id, stop_event, drain))
+    # One trace file per worker, the processes would overwrite each other's
+    write_box_trace(name_suffix=f"_worker{worker_index}")
+    box_tracer.clear()
+
+
+def start_workers(processes: Optional[int] = None, drain: bool = False) -> None:
+    """Start worker processes and wait for them.
+
+    Args:
+        processes: Number of worker processes
+            (default: LOAN_WORKER_PROCESSES, or one per CPU core)
+        drain: Exit once no job is pending or leased
+    """
+    processes = processes or conf.LOAN_WORKER_PROCESSES or os.cpu_count() or 1
+    # Each process builds its own Box client, HTTP pool and event loop
+    context = multiprocessing.get_context("spawn")
+    stop_event = context.Event()
+    workers = [
+        context.Process(
+            target=run_worker,
+            args=(index, stop_event, drain),
+            name=f"loan-worker-{index}",
+        )
+        for index in range(processes)
+    ]
+    logger.info(f"Starting {processes} loan worker process(es)")
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        logger.info("Stopping workers after their current job...")
+        stop_event.set()
+        for worker in workers:
+            worker.join()
+    logger.info(f"Workers stopped after {time.perf_counter() - started:.1f}s")
+    print_queue_status(get_loan_job_queue())
+
+
+def print_queue_status(queue: JobQueue) -> None:
+    """Print the number of jobs per status."""
+    table = Table(title="Loan Job Queue")
+    for status in ("pending", "leased", "done", "failed"):
+        table.add_column(status.capitalize(), justify="right")
+    stats = queue.stats()
+    table.add_row(
+        *(str(stats[status]) for status in ("pending", "leased", "done", "failed"))
+    )
+    console.print(table)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Parse the command line and run the requested command."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enqueue_parser = commands.add_parser("enqueue", help="Queue loan applications")
+    enqueue_parser.add_argument("applicants", nargs="+", help="Applicant names")
+    enqueue_parser.add_argument(
+        "--priority", type=int, default=0, help="Lower values are processed first"
+    )
+
+    work_parser = commands.add_parser("work", help="Start worker processes")
+    work_parser.add_argument(
+        "--processes", type=int, default=None, help="Number of worker processes"
+    )
+    work_parser.add_argument(
+        "--drain", action="store_true", help="Exit once the queue is empty"
+    )
+
+    commands.add_parser("status", help="Show the number of jobs per status")
+
+    args = parser.parse_args(argv)
+    if args.command == "enqueue":
+        queue = get_loan_job_queue()
+        for applicant in args.applicants:
+            queue.enqueue(applicant, priority=args.priority)
+        print_queue_status(queue)
+    elif args.command == "work":
+        start_workers(args.processes, args.drain)
+    else:
+        print_queue_status(get_loan_job_queue())
+
+
+if __name__ == "__main__":
+    main()
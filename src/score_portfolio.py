@@ -0,0 +1,370 @@
+"""Score a loan portfolio against the underwriting standards, without an LLM.
+
+Reads applicant metrics from a CSV or Parquet file, one loan per row, and
+applies the DTI, LTV and credit score thresholds and the four-way decision
+framework of the loan orchestrator as NumPy array operations. Writes the
+decision, risk level and violation codes of each loan.
+
+Columns (missing columns are treated as unknown):
+    monthly_income or annual_income, monthly_debt, credit_score,
+    loan_amount, proposed_payment or apr + term_months, vehicle_value or
+    purchase_price, vehicle_age or vehicle_year, vehicle_type (new/used),
+    years_employed, negative_equity, recent_repo, bankruptcy
+
+Usage:
+    uv run src/score_portfolio.py loans.csv -o decisions.csv
+    uv run src/score_portfolio.py loans.parquet -o decisions.parquet
+    uv run src/score_portfolio.py --benchmark 1000000
+"""
+
+import argparse
+import csv
+import logging
+import time
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from rich.table import Table
+
+from agents.loan_underwriting.risk_engine import (
+    DECISIONS,
+    FEATURE_PATHS,
+    RISK_LEVELS,
+    assess_risk,
+    complete_features,
+    underwriting_decisions,
+)
+from utils.display_messages import console
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+NUMERIC_COLUMNS = (*FEATURE_PATHS, "vehicle_age")
+TEXT_COLUMNS = ("vehicle_type",)
+# Numeric columns that may also hold yes/no or true/false
+FLAG_COLUMNS = ("recent_repo", "bankruptcy", "negative_equity")
+DEFAULT_ID_COLUMN = "loan_id"
+
+# Metric columns written next to the decision, with their rounding
+OUTPUT_METRICS = (
+    ("dti", 4),
+    ("ltv", 4),
+    ("ltv_max", 2),
+    ("proposed_payment", 2),
+)
+
+
+def _text_to_float(values: np.ndarray, name: str) -> np.ndarray:
+    """Convert a text column to float, empty cells to NaN.
+
+    In the flag columns only, yes/true is read as 1 and no/false as 0.
+
+    Raises:
+        ValueError: If a cell is not a number
+    """
+    values = np.strings.lower(np.strings.strip(values))
+    if name in FLAG_COLUMNS:
+        values = np.where(np.isin(values, ("true", "yes")), "1", values)
+        values = np.where(np.isin(values, ("false", "no")), "0", values)
+    values = np.where(values == "", "nan", values)
+    try:
+        return values.astype(float)
+    except ValueError:
+        for row, value in enumerate(values.tolist(), start=1):
+            try:
+                float(value)
+            except ValueError:
+                raise ValueError(
+                    f"Column {name}, row {row}: {value!r} is not a number"
+                ) from None
+        raise
+
+
+def _read_csv(
+    input_file: Path, id_column: str
+) -> Tuple[Dict[str, np.ndarray], Optional[np.ndarray]]:
+    with open(input_file, newline="", encoding="utf-8") as f:
+        header = [name.strip() for name in next(csv.reader(f))]
+    options = dict(delimiter=",", skiprows=1, ndmin=2, quotechar='"', encoding="utf-8")
+
+    numeric = [index for index, name in enumerate(header) if name in NUMERIC_COLUMNS]
+    columns: Dict[str, np.ndarray] = {}
+    if numeric:
+        try:
+            values = np.loadtxt(input_file, usecols=numeric, **options)
+            for position, index in enumerate(numeric):
+                columns[header[index]] = values[:, position]
+        except ValueError:
+            # Empty cells or yes/no flags: parse as text, then convert
+            values = np.loadtxt(input_file, usecols=numeric, dtype=str, **options)
+            for position, index in enumerate(numeric):
+                columns[header[index]] = _text_to_float(
+                    values[:, position], header[index]
+                )
+
+    text = [
+        index
+        for index, name in enumerate(header)
+        if name in TEXT_COLUMNS or name == id_column
+    ]
+    ids = None
+    if text:
+        values = np.loadtxt(input_file, usecols=text, dtype=str, **options)
+        for position, index in enumerate(text):
+            if header[index] == id_column:
+                ids = values[:, position]
+            else:
+                columns[header[index]] = np.strings.lower(
+                    np.strings.strip(values[:, position])
+                )
+    return columns, ids
+
+
+def _read_parquet(
+    input_file: Path, id_column: str
+) -> Tuple[Dict[str, np.ndarray], Optional[np.ndarray]]:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError(
+            "Reading Parquet files requires pyarrow: uv pip install pyarrow"
+        ) from e
+
+    names = pq.read_schema(input_file).names
+    table = pq.read_table(
+        input_file,
+        columns=[
+            name
+            for name in names
+            if name in NUMERIC_COLUMNS or name in TEXT_COLUMNS or name == id_column
+        ],
+    )
+    columns: Dict[str, np.ndarray] = {}
+    ids = None
+    for name in table.column_names:
+        column = table.column(name)
+        if name == id_column:
+            ids = np.array(column.cast(pa.string()).to_pylist(), dtype=object)
+        elif name in TEXT_COLUMNS:
+            columns[name] = np.array(
+                [(value or "").strip().lower() for value in column.to_pylist()]
+            )
+        else:
+            # Nulls become NaN
+            columns[name] = column.cast(pa.float64()).to_numpy(zero_copy_only=False)
+    return columns, ids
+
+
+def read_portfolio(
+    input_file: Path, id_column: str = DEFAULT_ID_COLUMN
+) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """Read the applicant metrics of a portfolio.
+
+    Args:
+        input_file: CSV or Parquet file, one loan per row
+        id_column: Column identifying each loan, row numbers are used
+            when the file does not have it
+
+    Returns:
+        The feature columns and the loan identifiers
+
+    Raises:
+        ValueError: If the file has no rows or an unsupported extension
+    """
+    suffix = input_file.suffix.lower()
+    if suffix == ".csv":
+        columns, ids = _read_csv(input_file, id_column)
+    elif suffix in (".parquet", ".pq"):
+        columns, ids = _read_parquet(input_file, id_column)
+    else:
+        raise ValueError(f"Unsupported portfolio file type: {input_file.suffix}")
+
+    rows = len(next(iter(columns.values()))) if columns else 0
+    if rows == 0:
+        raise ValueError(f"No loans to score in {input_file}")
+    if ids is None:
+        ids = np.arange(1, rows + 1)
+    return columns, ids
+
+
+def score_columns(
+    columns: Dict[str, np.ndarray], as_of: Optional[date] = None
+) -> Dict[str, np.ndarray]:
+    """Score every loan of a portfolio.
+
+    Args:
+        columns: Feature columns, see `read_portfolio`
+        as_of: Date used to compute the vehicle age (default: today)
+
+    Returns:
+        Dictionary of arrays: "decision", "risk_level", "violation_codes",
+        "total_violations" and the metrics of `OUTPUT_METRICS`
+    """
+    features = complete_features(dict(columns), as_of)
+    result = assess_risk(features)
+    decisions = underwriting_decisions(features, result)
+    scored = {
+        "decision": DECISIONS[decisions["decision"]],
+        "risk_level": RISK_LEVELS[result["risk_level"]],
+        "violation_codes": decisions["violation_codes"],
+        "total_violations": result["total_violations"],
+    }
+    for name, digits in OUTPUT_METRICS:
+        scored[name] = np.round(result[name], digits)
+    # Rows that could not be scored have no meaningful risk level
+    scored["risk_level"] = np.where(
+        scored["decision"] == "INCOMPLETE", "", scored["risk_level"]
+    )
+    return scored
+
+
+def write_results(
+    output_file: Path, ids: np.ndarray, scored: Dict[str, np.ndarray]
+) -> None:
+    """Write the scored portfolio to a CSV or Parquet file.
+
+    Args:
+        output_file: Output path, its extension selects the format
+        ids: Loan identifiers
+        scored: Arrays returned by `score_columns`
+    """
+    names: List[str] = ["loan_id", *scored]
+    if output_file.suffix.lower() in (".parquet", ".pq"):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError(
+                "Writing Parquet files requires pyarrow: uv pip install pyarrow"
+            ) from e
+        table = pa.table({"loan_id": ids.astype(str), **scored})
+        pq.write_table(table, output_file)
+        return
+
+    with open(output_file, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(names)
+        writer.writerows(
+            zip(ids.tolist(), *(_csv_column(values) for values in scored.values()))
+        )
+
+
+def _csv_column(values: np.ndarray) -> list:
+    """Convert a column to a list for the CSV writer, NaN as an empty cell."""
+    if values.dtype.kind == "f":
+        missing = np.isnan(values)
+        if missing.any():
+            return np.where(missing, None, values).tolist()
+    return values.tolist()
+
+
+def synthetic_portfolio(rows: int, seed: int = 0) -> Dict[str, np.ndarray]:
+    """Generate random applicant metrics spanning every decision outcome."""
+    rng = np.random.default_rng(seed)
+    vehicle_age = rng.integers(0, 12, rows).astype(float)
+    return {
+        "monthly_income": rng.uniform(2_500, 15_000, rows),
+        "monthly_debt": rng.uniform(0, 3_500, rows),
+        "credit_score": rng.integers(560, 830, rows).astype(float),
+        "loan_amount": rng.uniform(8_000, 65_000, rows),
+        "apr": rng.uniform(3.0, 16.0, rows),
+        "term_months": rng.choice([36.0, 48.0, 60.0, 72.0], rows),
+        "vehicle_value": rng.uniform(7_000, 70_000, rows),
+        "vehicle_age": vehicle_age,
+        "vehicle_type": np.where(vehicle_age == 0, "new", "used"),
+        "years_employed": rng.uniform(0, 15, rows),
+        "recent_repo": (rng.random(rows) < 0.01).astype(float),
+        "bankruptcy": (rng.random(rows) < 0.01).astype(float),
+    }
+
+
+def benchmark(rows: int) -> None:
+    """Time the scoring of a synthetic portfolio and print the throughput."""
+    columns = synthetic_portfolio(rows)
+    # Warm up NumPy on a small slice
+    score_columns({name: values[:1_000] for name, values in columns.items()})
+
+    started = time.perf_counter()
+    scored = score_columns(columns)
+    seconds = time.perf_counter() - started
+    console.print(
+        f"Scored {rows:,} loans in {seconds:.2f}s "
+        f"({rows / seconds:,.0f} loans/s, {seconds / rows * 1e6:.2f} µs/loan)"
+    )
+    print_summary(scored)
+
+
+def print_summary(scored: Dict[str, np.ndarray]) -> None:
+    """Print the number and share of loans per decision."""
+    table = Table(title="Portfolio Decisions")
+    table.add_column("Decision")
+    table.add_column("Loans", justify="right")
+    table.add_column("Share", justify="right")
+    total = len(scored["decision"])
+    for decision in DECISIONS:
+        count = int((scored["decision"] == decision).sum())
+        if count:
+            table.add_row(str(decision), f"{count:,}", f"{count / total:.1%}")
+    console.print(table)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Parse the command line and score the portfolio."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", nargs="?", type=Path, help="CSV or Parquet file")
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        help="Output CSV or Parquet file (default: <input>_decisions.csv)",
+    )
+    parser.add_argument(
+        "--id-column",
+        default=DEFAULT_ID_COLUMN,
+        help="Column identifying each loan (default: loan_id, else row numbers)",
+    )
+    parser.add_argument(
+        "--as-of",
+        type=date.fromisoformat,
+        default=None,
+        help="Date used to compute vehicle ages from model years (YYYY-MM-DD)",
+    )
+    parser.add_argument(
+        "--benchmark",
+        type=int,
+        metavar="ROWS",
+        help="Score a synthetic portfolio of ROWS loans and report the throughput",
+    )
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        benchmark(args.benchmark)
+        return
+    if args.input is None:
+        parser.error("an input file is required unless --benchmark is given")
+
+    started = time.perf_counter()
+    columns, ids = read_portfolio(args.input, args.id_column)
+    loaded = time.perf_counter()
+    scored = score_columns(columns, args.as_of)
+    output_file = args.output or args.input.with_name(
+        f"{args.input.stem}_decisions.csv"
+    )
+    scoring_seconds = time.perf_counter() - loaded
+    write_results(output_file, ids, scored)
+    logger.info(
+        f"Scored {len(ids):,} loans in {time.perf_counter() - started:.2f}s "
+        f"(read {loaded - started:.2f}s, scoring {scoring_seconds:.2f}s), "
+        f"results written to {output_file}"
+    )
+    print_summary(scored)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,548 @@
+"""Latency, token and payload instrumentation of agent runs.
+
+`AgentMetricsCallbackHandler` is a LangChain callback handler. Attached to
+a run's config, it is inherited by every sub-agent, model and tool call.
+It records wall time, input/output tokens and payload bytes per tool
+call, per LLM call, per sub-agent (`task` tool call) and per run. Calls are
+attributed to the sub-agent that made them, by following `parent_run_id`
+up to the `task` call that started the sub-agent.
+
+Measurements accumulate in `AgentMetrics` registries: one per run, merged
+into the process-wide `agent_metrics` when the run ends. A registry exports
+latency histograms as JSON or in the Prometheus text format, and renders
+a markdown summary.
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, math.inf)
+
+# Kinds of measured calls
+KIND_RUN = "run"
+KIND_SUBAGENT = "subagent"
+KIND_LLM = "llm"
+KIND_TOOL = "tool"
+
+# Agent name of calls made by the orchestrator itself
+ORCHESTRATOR = "orchestrator"
+
+# Tool the deep agents framework uses to start a sub-agent
+SUBAGENT_TOOL = "task"
+
+SeriesKey = Tuple[str, str, str]
+
+
+def _new_series() -> Dict[str, Any]:
+    return {
+        "count": 0,
+        "errors": 0,
+        "seconds_sum": 0.0,
+        "seconds_max": 0.0,
+        "buckets": [0] * len(LATENCY_BUCKETS),
+        "input_tokens": 0,
+        "output_tokens": 0,
+        "payload_bytes": 0,
+    }
+
+
+def _label(value: str) -> str:
+    """Escape a Prometheus label value."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class AgentMetrics:
+    """Thread-safe registry of call measurements, keyed by (kind, name, agent)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._series: Dict[SeriesKey, Dict[str, Any]] = {}
+
+    def record(
+        self,
+        kind: str,
+        name: str,
+        agent: str,
+        seconds: float,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        payload_bytes: int = 0,
+        error: bool = False,
+    ) -> None:
+        """Record one call.
+
+        Args:
+            kind: Kind of call - run, subagent, llm or tool
+            name: Name of the tool, sub-agent, model or run
+            agent: Agent that made the call
+            seconds: Wall time of the call
+            input_tokens: Tokens sent to the model
+            output_tokens: Tokens generated by the model
+            payload_bytes: Size of the tool input and output
+            error: Whether the call raised an error
+        """
+        bucket = next(
+            index for index, bound in enumerate(LATENCY_BUCKETS) if seconds <= bound
+        )
+        with self._lock:
+            series = self._series.setdefault((kind, name, agent), _new_series())
+            series["count"] += 1
+            series["errors"] += int(error)
+            series["seconds_sum"] += seconds
+            series["seconds_max"] = max(series["seconds_max"], seconds)
+            series["buckets"][bucket] += 1
+            series["input_tokens"] += input_tokens
+            series["output_tokens"] += output_tokens
+            series["payload_bytes"] += payload_bytes
+
+    def merge(self, other: "AgentMetrics") -> None:
+        """Add the measurements of another registry to this one."""
+        for key, theirs in other.snapshot().items():
+            with self._lock:
+                series = self._series.setdefault(key, _new_series())
+                for field in (
+                    "count",
+                    "errors",
+                    "seconds_sum",
+                    "input_tokens",
+                    "output_tokens",
+                    "payload_bytes",
+                ):
+                    series[field] += theirs[field]
+                series["seconds_max"] = max(
+                    series["seconds_max"], theirs["seconds_max"]
+                )
+                series["buckets"] = [
+                    mine + added
+                    for mine, added in zip(series["buckets"], theirs["buckets"])
+                ]
+
+    def snapshot(self) -> Dict[SeriesKey, Dict[str, Any]]:
+        """Return a copy of every series."""
+        with self._lock:
+            return {
+                key: {**series, "buckets": list(series["buckets"])}
+                for key, series in self._series.items()
+            }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Export the series as JSON-serializable data, with cumulative buckets."""
+        series_list = []
+        for (kind, name, agent), series in sorted(self.snapshot().items()):
+            cumulative, buckets = 0, {}
+            for bound, count in zip(LATENCY_BUCKETS, series["buckets"]):
+                cumulative += count
+                buckets["+Inf" if math.isinf(bound) else str(bound)] = cumulative
+            series_list.append(
+                {
+                    "kind": kind,
+                    "name": name,
+                    "agent": agent,
+                    "count": series["count"],
+                    "errors": series["errors"],
+                    "seconds_sum": round(series["seconds_sum"], 6),
+                    "seconds_max": round(series["seconds_max"], 6),
+                    "latency_buckets": buckets,
+                    "input_tokens": series["input_tokens"],
+                    "output_tokens": series["output_tokens"],
+                    "payload_bytes": series["payload_bytes"],
+                }
+            )
+        return {"series": series_list}
+
+    def to_json(self) -> str:
+        """Export the series as a JSON document."""
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self, prefix: str = "agent") -> str:
+        """Export the series in the Prometheus text exposition format.
+
+        Args:
+            prefix: Prefix of the metric names
+
+        Returns:
+            str: Latency histogram and token, payload and error counters
+        """
+        snapshot = sorted(self.snapshot().items())
+        lines = [
+            f"# HELP {prefix}_call_duration_seconds Wall time of runs, sub-agents, LLM calls and tool calls",
+            f"# TYPE {prefix}_call_duration_seconds histogram",
+        ]
+        for (kind, name, agent), series in snapshot:
+            labels = (
+                f'kind="{_label(kind)}",name="{_label(name)}",agent="{_label(agent)}"'
+            )
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, series["buckets"]):
+                cumulative += count
+                le = "+Inf" if math.isinf(bound) else str(bound)
+                lines.append(
+                    f'{prefix}_call_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}'
+                )
+            lines.append(
+                f"{prefix}_call_duration_seconds_sum{{{labels}}} {series['seconds_sum']:.6f}"
+            )
+            lines.append(
+                f"{prefix}_call_duration_seconds_count{{{labels}}} {series['count']}"
+            )
+
+        counters = (
+            # LLM calls only: the sub-agent token totals would count them twice
+            (
+                "tokens_total",
+                "Model tokens of LLM calls",
+                ("input_tokens", "output_tokens"),
+            ),
+            ("payload_bytes_total", "Bytes of tool inputs and outputs", None),
+            ("call_errors_total", "Calls that raised an error", None),
+        )
+        for metric, description, directions in counters:
+            lines.append(f"# HELP {prefix}_{metric} {description}")
+            lines.append(f"# TYPE {prefix}_{metric} counter")
+            for (kind, name, agent), series in snapshot:
+                labels = f'kind="{_label(kind)}",name="{_label(name)}",agent="{_label(agent)}"'
+                if directions:
+                    if kind != KIND_LLM:
+                        continue
+                    for field in directions:
+                        if series[field]:
+                            direction = field.split("_")[0]
+                            lines.append(
+                                f'{prefix}_{metric}{{{labels},direction="{direction}"}} {series[field]}'
+                            )
+                elif metric == "payload_bytes_total" and series["payload_bytes"]:
+                    lines.append(
+                        f"{prefix}_{metric}{{{labels}}} {series['payload_bytes']}"
+                    )
+                elif metric == "call_errors_total" and series["errors"]:
+                    lines.append(f"{prefix}_{metric}{{{labels}}} {series['errors']}")
+        return "\n".join(lines) + "\n"
+
+    def summary_markdown(self, title: str) -> str:
+        """Render the series as markdown tables, slowest first.
+
+        Args:
+            title: Heading of the summary
+
+        Returns:
+            str: Markdown summary
+        """
+        snapshot = self.snapshot()
+        lines = [f"# {title}", ""]
+        runs = [series for (kind, _, _), series in snapshot.items() if kind == KIND_RUN]
+        if runs:
+            total_seconds = sum(series["seconds_sum"] for series in runs)
+            input_tokens = sum(
+                series["input_tokens"]
+                for (kind, _, _), series in snapshot.items()
+                if kind == KIND_LLM
+            )
+            output_tokens = sum(
+                series["output_tokens"]
+                for (kind, _, _), series in snapshot.items()
+                if kind == KIND_LLM
+            )
+            lines += [
+                f"- **Wall time:** {total_seconds:.1f}s",
+                f"- **Tokens:** {input_tokens:,} input, {output_tokens:,} output",
+                "",
+            ]
+
+        sections = (
+            (KIND_SUBAGENT, "Sub-agents"),
+            (KIND_LLM, "LLM Calls"),
+            (KIND_TOOL, "Tool Calls"),
+        )
+        for section_kind, heading in sections:
+            rows = sorted(
+                (
+                    (name, agent, series)
+                    for (kind, name, agent), series in snapshot.items()
+                    if kind == section_kind
+                ),
+                key=lambda row: row[2]["seconds_sum"],
+                reverse=True,
+            )
+            if not rows:
+                continue
+            lines += [
+                f"## {heading}",
+                "",
+                "| Name | Agent | Calls | Errors | Total (s) | Mean (s) | Max (s) | Input Tokens | Output Tokens | Payload (KB) |",
+                "|------|-------|------:|-------:|----------:|---------:|--------:|-------------:|--------------:|-------------:|",
+            ]
+            for name, agent, series in rows:
+                lines.append(
+                    f"| {name} | {agent} | {series['count']} | {series['errors']} "
+                    f"| {series['seconds_sum']:.2f} "
+                    f"| {series['seconds_sum'] / series['count']:.2f} "
+                    f"| {series['seconds_max']:.2f} "
+                    f"| {series['input_tokens']:,} | {series['output_tokens']:,} "
+                    f"| {series['payload_bytes'] / 1024:.1f} |"
+                )
+            lines.append("")
+        return "\n".join(lines)
+
+
+def write_metrics_files(metrics: AgentMetrics, folder: Path, stem: str) -> None:
+    """Write the JSON and Prometheus exports of a registry atomically.
+
+    Args:
+        metrics: Registry to export
+        folder: Destination folder, created if needed
+        stem: File name without extension
+    """
+    folder.mkdir(parents=True, exist_ok=True)
+    for suffix, content in (
+        (".json", metrics.to_json()),
+        (".prom", metrics.to_prometheus()),
+    ):
+        path = folder / f"{stem}{suffix}"
+        tmp_path = path.with_suffix(f"{suffix}.tmp")
+        tmp_path.write_text(content, encoding="utf-8")
+        os.replace(tmp_path, path)
+
+
+def _payload_bytes(value: Any) -> int:
+    """Size of a tool input or output, as UTF-8 text."""
+    if value is None:
+        return 0
+    content = getattr(value, "content", value)
+    if not isinstance(content, str):
+        try:
+            content = json.dumps(content, default=str)
+        except (TypeError, ValueError):
+            content = str(content)
+    return len(content.encode("utf-8"))
+
+
+def _token_usage(response: Any) -> Tuple[int, int]:
+    """Input and output tokens of an LLM result."""
+    input_tokens = output_tokens = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(
+                getattr(generation, "message", None), "usage_metadata", None
+            )
+            if usage:
+                input_tokens += usage.get("input_tokens", 0)
+                output_tokens += usage.get("output_tokens", 0)
+    return input_tokens, output_tokens
+
+
+class AgentMetricsCallbackHandler(BaseCallbackHandler):
+    """Measure the runs, sub-agents, LLM calls and tool calls of an agent."""
+
+    # Called in the thread of the event, bookkeeping is cheap and locked
+    run_inline = True
+
+    def __init__(
+        self,
+        run_name: str,
+        on_run_end: Optional[Callable[[AgentMetrics], None]] = None,
+        registry: Optional[AgentMetrics] = None,
+    ) -> None:
+        """Create the handler.
+
+        Args:
+            run_name: Name of the runs in the metrics, e.g. "loan_underwriting"
+            on_run_end: Called with the metrics of each run when it ends
+            registry: Registry each run is merged into (default: `agent_metrics`)
+        """
+        super().__init__()
+        self.run_name = run_name
+        self.on_run_end = on_run_end
+        self.registry = registry if registry is not None else agent_metrics
+        self._lock = threading.Lock()
+        # run_id -> {"parent", "root", "agent", "subagent", "kind", "name",
+        #            "started", "bytes", "tokens"}
+        self._calls: Dict[UUID, Dict[str, Any]] = {}
+        self._run_metrics: Dict[UUID, AgentMetrics] = {}
+
+    def _start(
+        self,
+        run_id: UUID,
+        parent_run_id: Optional[UUID],
+        kind: Optional[str] = None,
+        name: str = "",
+        agent: Optional[str] = None,
+        payload_bytes: int = 0,
+    ) -> None:
+        with self._lock:
+            parent = self._calls.get(parent_run_id) if parent_run_id else None
+            if parent is None:
+                # First call of a run seen by this handler
+                self._run_metrics[run_id] = AgentMetrics()
+                kind, name, root = KIND_RUN, self.run_name, run_id
+                agent, subagent = ORCHESTRATOR, None
+            else:
+                root = parent["root"]
+                # Calls inherit the agent of their parent, a sub-agent starts a new one
+                agent = agent or parent["agent"]
+                subagent = run_id if kind == KIND_SUBAGENT else parent["subagent"]
+            self._calls[run_id] = {
+                "parent": parent_run_id,
+                "root": root,
+                "agent": agent,
+                "subagent": subagent,
+                "kind": kind,
+                "name": name,
+                "started": time.perf_counter(),
+                "bytes": payload_bytes,
+                "tokens": [0, 0],
+            }
+
+    def _end(
+        self,
+        run_id: UUID,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        payload_bytes: int = 0,
+        error: bool = False,
+    ) -> None:
+        with self._lock:
+            call = self._calls.pop(run_id, None)
+            if call is None:
+                return
+            metrics = self._run_metrics.get(call["root"])
+            # The tokens of a sub-agent are the sum of its LLM calls
+            subagent = self._calls.get(call["subagent"])
+            if subagent is not None and call["kind"] == KIND_LLM:
+                subagent["tokens"][0] += input_tokens
+                subagent["tokens"][1] += output_tokens
+        if call["kind"] is None or metrics is None:
+            return
+        if call["kind"] == KIND_SUBAGENT:
+            input_tokens, output_tokens = call["tokens"]
+
+        seconds = time.perf_counter() - call["started"]
+        # A sub-agent is measured under its own name, made by the orchestrator
+        parent_agent = ORCHESTRATOR if call["kind"] == KIND_SUBAGENT else call["agent"]
+        metrics.record(
+            call["kind"],
+            call["name"],
+            parent_agent,
+            seconds,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            payload_bytes=call["bytes"] + payload_bytes,
+            error=error,
+        )
+
+        if call["kind"] == KIND_RUN:
+            with self._lock:
+                self._run_metrics.pop(run_id, None)
+                # Drop calls left open by a cancelled run
+                for child in [
+                    key for key, value in self._calls.items() if value["root"] == run_id
+                ]:
+                    del self._calls[child]
+            self.registry.merge(metrics)
+            if self.on_run_end is not None:
+                try:
+                    self.on_run_end(metrics)
+                except Exception as e:
+                    logger.warning(f"Failed to write the run metrics: {str(e)}")
+
+    def on_chain_start(
+        self,
+        serialized: Dict[str, Any],
+        inputs: Dict[str, Any],
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        **kwargs: Any,
+    ) -> None:
+        # Chains (graph nodes) are only tracked to attribute their children
+        self._start(run_id, parent_run_id)
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id)
+
+    def on_chain_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        self._end(run_id, error=True)
+
+    def on_chat_model_start(
+        self,
+        serialized: Dict[str, Any],
+        messages: List[List[Any]],
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        name = (metadata or {}).get("ls_model_name") or (serialized or {}).get(
+            "name", "model"
+        )
+        self._start(run_id, parent_run_id, KIND_LLM, name)
+
+    def on_llm_start(
+        self,
+        serialized: Dict[str, Any],
+        prompts: List[str],
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        name = (metadata or {}).get("ls_model_name") or (serialized or {}).get(
+            "name", "model"
+        )
+        self._start(run_id, parent_run_id, KIND_LLM, name)
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        input_tokens, output_tokens = _token_usage(response)
+        self._end(run_id, input_tokens=input_tokens, output_tokens=output_tokens)
+
+    def on_llm_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        self._end(run_id, error=True)
+
+    def on_tool_start(
+        self,
+        serialized: Dict[str, Any],
+        input_str: str,
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        inputs: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        name = (serialized or {}).get("name") or kwargs.get("name") or "tool"
+        payload_bytes = len(input_str.encode("utf-8")) if input_str else 0
+        if name == SUBAGENT_TOOL:
+            subagent = str((inputs or {}).get("subagent_type") or "subagent")
+            self._start(
+                run_id, parent_run_id, KIND_SUBAGENT, subagent, subagent, payload_bytes
+            )
+        else:
+            self._start(run_id, parent_run_id, KIND_TOOL, name, None, payload_bytes)
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, payload_bytes=_payload_bytes(output))
+
+    def on_tool_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        self._end(run_id, error=True)
+
+
+# Process-wide registry, every run is merged into it when it ends
+agent_metrics = AgentMetrics()
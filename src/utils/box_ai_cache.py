@@ -0,0 +1,328 @@
+"""Persistent, content-addressed cache for Box AI responses.
+
+Box AI answers only depend on the documents being asked about and on the
+prompt, so responses are stored in a local SQLite database keyed by the
+sorted file IDs, their current file version (or sha1) and the normalized
+prompt. Uploading a new version of any document changes the key, so stale
+answers are never served.
+
+Structured extraction results are cached per field: each row is keyed by
+the file versions of the extracted document set plus the field key and its
+definition, so a schema overlapping a previous one only needs the missing
+fields from Box AI. Rows for an older version of the same document set are
+purged as soon as a new version is seen.
+
+The database is bounded in size with least-recently-used eviction and can
+be disabled with `BOX_AI_CACHE_ENABLED=false`.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app_config import conf
+
+logger = logging.getLogger(__name__)
+
+
+def folder_file_versions(folder_response: Dict[str, Any]) -> Dict[str, str]:
+    """Map file IDs to their current version from a folder listing.
+
+    Args:
+        folder_response: Response returned by `box_folder_items_list`
+
+    Returns:
+        Dictionary of {file_id: version} where version is the file version ID,
+        falling back to the sha1 or etag when the version is not reported
+    """
+    versions: Dict[str, str] = {}
+    for item in folder_response.get("folder_items", []):
+        if item.get("type") != "file":
+            continue
+        file_version = item.get("file_version") or {}
+        versions[item["id"]] = str(
+            file_version.get("id") or item.get("sha1") or item.get("etag") or ""
+        )
+    return versions
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Normalize a prompt so trivially different spellings share a cache entry."""
+    return " ".join(prompt.split()).casefold()
+
+
+def ask_cache_key(file_versions: Dict[str, str], prompt: str) -> str:
+    """Build the content-addressed cache key for a Box AI ask request.
+
+    Args:
+        file_versions: Dictionary of {file_id: version} for the files asked about
+        prompt: Question sent to Box AI
+
+    Returns:
+        Hex SHA-256 digest identifying the request
+    """
+    payload = {
+        "files": sorted(file_versions.items()),
+        "prompt": normalize_prompt(prompt),
+    }
+    return hashlib.sha256(
+        json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    ).hexdigest()
+
+
+def _files_key(file_versions: Dict[str, str]) -> str:
+    """Identify a document set independently of the file versions."""
+    return ",".join(sorted(file_versions))
+
+
+def _versions_key(file_versions: Dict[str, str]) -> str:
+    """Identify a document set at specific file versions."""
+    return hashlib.sha256(
+        json.dumps(sorted(file_versions.items()), separators=(",", ":")).encode("utf-8")
+    ).hexdigest()
+
+
+def _field_hash(field: Dict[str, Any]) -> str:
+    """Hash a field definition so edited descriptions/prompts miss the cache."""
+    return hashlib.sha256(
+        json.dumps(field, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    ).hexdigest()
+
+
+class BoxAICache:
+    """SQLite-backed LRU cache for Box AI responses."""
+
+    def __init__(self, db_path: Path, max_entries: int = 2000) -> None:
+        """Create the cache, the database file is created on first use.
+
+        Args:
+            db_path: Path to the SQLite database file
+            max_entries: Maximum number of cached ask responses and of
+                cached extraction fields
+        """
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._initialized = False
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection, creating the schema on first use."""
+        db = sqlite3.connect(self.db_path, timeout=30)
+        if not self._initialized:
+            with self._lock:
+                db.execute("PRAGMA journal_mode=WAL")
+                db.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS ask_responses (
+                        cache_key TEXT PRIMARY KEY,
+                        prompt TEXT NOT NULL,
+                        response TEXT NOT NULL,
+                        created_at REAL NOT NULL,
+                        last_used_at REAL NOT NULL
+                    )
+                    """
+                )
+                db.execute(
+                    "CREATE INDEX IF NOT EXISTS ask_responses_lru "
+                    "ON ask_responses (last_used_at)"
+                )
+                db.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS extract_fields (
+                        files_key TEXT NOT NULL,
+                        versions_key TEXT NOT NULL,
+                        field_key TEXT NOT NULL,
+                        field_hash TEXT NOT NULL,
+                        value TEXT NOT NULL,
+                        created_at REAL NOT NULL,
+                        last_used_at REAL NOT NULL,
+                        PRIMARY KEY (versions_key, field_key, field_hash)
+                    )
+                    """
+                )
+                db.execute(
+                    "CREATE INDEX IF NOT EXISTS extract_fields_files "
+                    "ON extract_fields (files_key)"
+                )
+                db.execute(
+                    "CREATE INDEX IF NOT EXISTS extract_fields_lru "
+                    "ON extract_fields (last_used_at)"
+                )
+                db.commit()
+                self._initialized = True
+        return db
+
+    def get_ask(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """Return a cached ask response, or None on a miss.
+
+        Args:
+            cache_key: Key built with `ask_cache_key`
+
+        Returns:
+            The cached `box_ai_ask_file_multi` response, or None
+        """
+        with closing(self._connect()) as db, db:
+            row = db.execute(
+                "SELECT response FROM ask_responses WHERE cache_key = ?",
+                (cache_key,),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            db.execute(
+                "UPDATE ask_responses SET last_used_at = ? WHERE cache_key = ?",
+                (time.time(), cache_key),
+            )
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put_ask(self, cache_key: str, prompt: str, response: Dict[str, Any]) -> None:
+        """Store an ask response and evict the least recently used entries.
+
+        Args:
+            cache_key: Key built with `ask_cache_key`
+            prompt: Original prompt, stored for inspection only
+            response: Response returned by `box_ai_ask_file_multi`
+        """
+        now = time.time()
+        with closing(self._connect()) as db, db:
+            db.execute(
+                "INSERT OR REPLACE INTO ask_responses "
+                "(cache_key, prompt, response, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (cache_key, prompt, json.dumps(response, default=str), now, now),
+            )
+            db.execute(
+                "DELETE FROM ask_responses WHERE cache_key IN ("
+                "SELECT cache_key FROM ask_responses ORDER BY last_used_at DESC "
+                "LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def get_extract_fields(
+        self, file_versions: Dict[str, str], fields: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Return the cached values for the fields of an extraction request.
+
+        Rows cached for another version of the same document set are
+        deleted, so a new document version always triggers a fresh extraction.
+
+        Args:
+            file_versions: Dictionary of {file_id: version} of the extracted files
+            fields: Field definitions of the extraction schema
+
+        Returns:
+            Dictionary of {field_key: value} for the fields found in the cache
+        """
+        files_key = _files_key(file_versions)
+        versions_key = _versions_key(file_versions)
+        found: Dict[str, Any] = {}
+        with closing(self._connect()) as db, db:
+            purged = db.execute(
+                "DELETE FROM extract_fields WHERE files_key = ? AND versions_key != ?",
+                (files_key, versions_key),
+            ).rowcount
+            if purged:
+                logger.debug(
+                    "Invalidated %d cached extraction fields for files %s",
+                    purged,
+                    files_key,
+                )
+            now = time.time()
+            for field in fields:
+                field_key = field.get("key")
+                if not field_key:
+                    continue
+                params = (versions_key, field_key, _field_hash(field))
+                row = db.execute(
+                    "SELECT value FROM extract_fields "
+                    "WHERE versions_key = ? AND field_key = ? AND field_hash = ?",
+                    params,
+                ).fetchone()
+                if row is None:
+                    self.misses += 1
+                    continue
+                self.hits += 1
+                found[field_key] = json.loads(row[0])
+                db.execute(
+                    "UPDATE extract_fields SET last_used_at = ? "
+                    "WHERE versions_key = ? AND field_key = ? AND field_hash = ?",
+                    (now, *params),
+                )
+        return found
+
+    def put_extract_fields(
+        self,
+        file_versions: Dict[str, str],
+        fields: List[Dict[str, Any]],
+        answer: Dict[str, Any],
+    ) -> None:
+        """Store the extracted value of every field present in the answer.
+
+        Args:
+            file_versions: Dictionary of {file_id: version} of the extracted files
+            fields: Field definitions sent to Box AI
+            answer: Extracted values keyed by field key
+        """
+        files_key = _files_key(file_versions)
+        versions_key = _versions_key(file_versions)
+        now = time.time()
+        rows = [
+            (
+                files_key,
+                versions_key,
+                field["key"],
+                _field_hash(field),
+                json.dumps(answer[field["key"]], default=str),
+                now,
+                now,
+            )
+            for field in fields
+            if field.get("key") in answer
+        ]
+        with closing(self._connect()) as db, db:
+            db.executemany(
+                "INSERT OR REPLACE INTO extract_fields (files_key, versions_key, "
+                "field_key, field_hash, value, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            db.execute(
+                "DELETE FROM extract_fields WHERE rowid IN ("
+                "SELECT rowid FROM extract_fields ORDER BY last_used_at DESC "
+                "LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self) -> None:
+        """Delete every cached response."""
+        with closing(self._connect()) as db, db:
+            db.execute("DELETE FROM ask_responses")
+            db.execute("DELETE FROM extract_fields")
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the number of stored entries."""
+        with closing(self._connect()) as db:
+            (size,) = db.execute("SELECT COUNT(*) FROM ask_responses").fetchone()
+            (fields,) = db.execute("SELECT COUNT(*) FROM extract_fields").fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": size,
+            "extract_fields": fields,
+        }
+
+
+# Process-wide cache shared by every tool
+box_ai_cache = BoxAICache(
+    db_path=Path(conf.BOX_AI_CACHE_FILE),
+    max_entries=conf.BOX_AI_CACHE_MAX_ENTRIES,
+)
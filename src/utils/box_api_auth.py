@@ -1,15 +1,29 @@
 import logging
+import threading
+import time
+from pathlib import Path
+from typing import Optional
 
-from box_sdk_gen import BoxAPIError, BoxCCGAuth, BoxClient, CCGConfig, FileTokenStorage
+from box_sdk_gen import BoxAPIError, BoxClient, CCGConfig
 
 from app_config import conf
+from utils.box_executor import run_in_box_executor
+from utils.box_http import get_box_network_session
+from utils.box_token_store import SharedBoxCCGAuth, SharedFileTokenStorage
 
 logger = logging.getLogger(__name__)
 
+_shared_client: Optional[BoxClient] = None
+_shared_client_lock = threading.Lock()
 
-def get_box_client() -> BoxClient:
+
+def get_box_client(verify: bool = True) -> BoxClient:
     """Authenticate and return a BoxClient instance.
 
+    Args:
+        verify: Call `users.get_user_me()` to check the credentials now.
+            Otherwise the access token is requested on the first API call.
+
     Returns:
         Authenticated BoxClient instance
 
@@ -41,9 +55,14 @@ def get_box_client() -> BoxClient:
         enterprise_id = conf.BOX_SUBJECT_ID
         logger.info("Authenticating as Box enterprise: %s", enterprise_id)
 
-    # Configure token storage
-    file_token_storage = FileTokenStorage(filename=".auth.ccg")
-    logger.debug("Using file token storage: .auth.ccg")
+    # Configure token storage, shared by every process of the project
+    token_file = Path(conf.BOX_TOKEN_FILE)
+    if not token_file.is_absolute():
+        token_file = Path(__file__).parent.parent.parent / token_file
+    file_token_storage = SharedFileTokenStorage(
+        token_file, refresh_margin_seconds=conf.BOX_TOKEN_REFRESH_MARGIN_SECONDS
+    )
+    logger.debug("Using shared token storage: %s", token_file)
 
     # Create CCG configuration
     ccg_config = CCGConfig(
@@ -55,8 +74,12 @@ def get_box_client() -> BoxClient:
     )
 
     # Authenticate and create client
-    auth = BoxCCGAuth(ccg_config)
-    box_client = BoxClient(auth)
+    auth = SharedBoxCCGAuth(ccg_config)
+    box_client = BoxClient(auth, network_session=get_box_network_session())
+
+    if not verify:
+        logger.debug("Box client created, authentication deferred to first call")
+        return box_client
 
     # Try to get the information about the authenticated user or enterprise
     try:
@@ -67,3 +90,49 @@ def get_box_client() -> BoxClient:
 
     logger.info("Box client authenticated successfully")
     return box_client
+
+
+def get_shared_box_client() -> BoxClient:
+    """Return the process-wide Box client, creating it on first use.
+
+    Safe to call from any thread: the client is created exactly once.
+    Credentials are only verified at creation when `BOX_VERIFY_ON_STARTUP`
+    is enabled.
+
+    Returns:
+        Shared BoxClient instance
+    """
+    global _shared_client
+    client = _shared_client
+    if client is None:
+        with _shared_client_lock:
+            if _shared_client is None:
+                started = time.perf_counter()
+                _shared_client = get_box_client(verify=conf.BOX_VERIFY_ON_STARTUP)
+                logger.debug(
+                    "Shared Box client ready in %.3fs",
+                    time.perf_counter() - started,
+                )
+            client = _shared_client
+    return client
+
+
+async def aget_shared_box_client() -> BoxClient:
+    """Async variant of `get_shared_box_client`.
+
+    The first creation runs on the Box I/O executor, so a startup
+    verification call never blocks the event loop.
+
+    Returns:
+        Shared BoxClient instance
+    """
+    if _shared_client is not None:
+        return _shared_client
+    return await run_in_box_executor(get_shared_box_client)
+
+
+def reset_shared_box_client() -> None:
+    """Drop the shared client, e.g. after rotating the Box credentials."""
+    global _shared_client
+    with _shared_client_lock:
+        _shared_client = None
@@ -1,8 +1,16 @@
+import base64
+import hashlib
+import io
 import json
 import logging
+import mmap
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
+from box_ai_agents_toolkit import box_folder_items_list
 from box_sdk_gen import (
     BoxAPIError,
     BoxClient,
@@ -11,32 +19,40 @@ from box_sdk_gen import (
     UploadFileAttributes,
     UploadFileAttributesParentField,
     UploadFileVersionAttributes,
+    UploadPart,
     UploadUrl,
 )
 
+from app_config import conf
+from utils.box_cache import folder_listing_cache
+from utils.box_sync import SyncManifest
+from utils.box_trace import add_span_attributes, traced, with_trace_context
+from utils.upload_journal import UploadJournal
+
 logger = logging.getLogger(__name__)
 
 
-def box_file_pre_flight_check(
+@traced()
+def box_file_pre_flight_conflict(
     client: BoxClient, local_file_name: Path, parent_folder_id: str
-) -> tuple[bool, Optional[str], Optional[UploadUrl]]:
+) -> tuple[bool, Optional[Dict[str, Any]], Optional[UploadUrl]]:
     """
-    Checks if a file can be uploaded to Box.
-    Possible errors include conflicts with existing files, lack of storage space, or insufficient permissions.
-    If there is a conflict, the existing file ID is returned.
+    Checks if a file can be uploaded to Box, returning the full conflict details.
+    Same as `box_file_pre_flight_check`, but on a name conflict the conflicting
+    file as reported by Box is returned (including its "id" and "sha1").
     Args:
         client (BoxClient): The Box client instance.
-        local_file_name (str): The name of the local file to be uploaded.
-        local_file_size (int): The size of the local file in bytes.
+        local_file_name (Path): The local file to be uploaded.
         parent_folder_id (str): The ID of the parent folder in Box.
 
     Returns:
-        tuple[bool, Optional[str], Optional[UploadUrl]]: A tuple containing a boolean indicating if the file can be uploaded,
-        the existing file ID if there is a conflict, and the upload URL if the file can be uploaded.
+        tuple[bool, Optional[Dict[str, Any]], Optional[UploadUrl]]: A tuple containing a boolean indicating if the file can be uploaded,
+        the conflicting file details if there is a conflict, and the upload URL if the file can be uploaded.
 
     """
     parent = PreflightFileUploadCheckParent(id=parent_folder_id)
     local_file_size = local_file_name.stat().st_size
+    add_span_attributes(file=local_file_name.name, size=local_file_size)
     try:
         upload_url = client.uploads.preflight_file_upload_check(
             name=local_file_name.name, size=local_file_size, parent=parent
@@ -52,13 +68,12 @@ def box_file_pre_flight_check(
                 "File '%s' already exists, uploading new version", local_file_name
             )
 
-            # Get the existing file ID from the error details
+            # Get the existing file from the error details
             if (
                 e.response_info.context_info
                 and "conflicts" in e.response_info.context_info
             ):
-                file_id = e.response_info.context_info["conflicts"]["id"]
-                return False, file_id, None
+                return False, e.response_info.context_info["conflicts"], None
             else:
                 raise ValueError("Conflict error without conflict details")
         else:
@@ -66,12 +81,337 @@ def box_file_pre_flight_check(
             raise e
 
 
+def box_file_pre_flight_check(
+    client: BoxClient, local_file_name: Path, parent_folder_id: str
+) -> tuple[bool, Optional[str], Optional[UploadUrl]]:
+    """
+    Checks if a file can be uploaded to Box.
+    Possible errors include conflicts with existing files, lack of storage space, or insufficient permissions.
+    If there is a conflict, the existing file ID is returned.
+    Args:
+        client (BoxClient): The Box client instance.
+        local_file_name (str): The name of the local file to be uploaded.
+        local_file_size (int): The size of the local file in bytes.
+        parent_folder_id (str): The ID of the parent folder in Box.
+
+    Returns:
+        tuple[bool, Optional[str], Optional[UploadUrl]]: A tuple containing a boolean indicating if the file can be uploaded,
+        the existing file ID if there is a conflict, and the upload URL if the file can be uploaded.
+
+    """
+    can_upload, conflict, upload_url = box_file_pre_flight_conflict(
+        client, local_file_name, parent_folder_id
+    )
+    return can_upload, conflict["id"] if conflict else None, upload_url
+
+
+@traced()
+def box_folder_name_index(
+    client: BoxClient, folder_id: str
+) -> Dict[str, Dict[str, Any]]:
+    """
+    List a Box folder once and index its direct children by name.
+    Lets uploads decide between a new upload and a new version locally,
+    instead of calling the preflight check once per file.
+    Box names are case-insensitive, so the index keys are casefolded.
+    Args:
+        client (BoxClient): The Box client instance.
+        folder_id (str): The ID of the folder in Box.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Dictionary of {casefolded name: {"id", "type", "name", "sha1"}}.
+
+    """
+    listing = box_folder_items_list(
+        client=client, folder_id=folder_id, is_recursive=False
+    )
+    if "error" in listing:
+        raise ValueError(f"Unable to list folder {folder_id}: {listing['error']}")
+
+    name_index: Dict[str, Dict[str, Any]] = {}
+    for item in listing.get("folder_items", []):
+        name_index[item["name"].casefold()] = {
+            "id": item["id"],
+            "type": item["type"],
+            "name": item["name"],
+            "sha1": item.get("sha1"),
+        }
+    logger.debug("Indexed %d items of folder %s", len(name_index), folder_id)
+    return name_index
+
+
+def _find_file_conflict(
+    client: BoxClient,
+    local_file_path: Path,
+    parent_folder_id: str,
+    name_index: Optional[Dict[str, Dict[str, Any]]],
+    check_quota: bool,
+) -> Optional[Dict[str, Any]]:
+    """Return the Box file a local file would conflict with, if any.
+
+    The preflight check is only called when no name index is available or
+    when quota and permissions must be verified before uploading.
+    """
+    if name_index is None or check_quota:
+        (can_upload, conflict, _) = box_file_pre_flight_conflict(
+            client, local_file_path, parent_folder_id
+        )
+        if can_upload:
+            return None
+        if not conflict:
+            raise ValueError("Unable to determine upload status for file.")
+        return conflict
+
+    entry = name_index.get(local_file_path.name.casefold())
+    if entry and entry["type"] == "file":
+        return entry
+    return None
+
+
+def _box_file_upload_or_update(
+    client: BoxClient,
+    local_file_path: Path,
+    parent_folder_id: str,
+    conflict: Optional[Dict[str, Any]],
+) -> tuple[str, str]:
+    """Upload a file, or a new version of the conflicting file.
+
+    A name index can be outdated if the folder changed after it was listed,
+    so a name conflict on upload falls back to a new version of the file Box
+    reports.
+
+    Returns:
+        tuple[str, str]: The Box file ID and the action taken: "uploaded" or "updated"
+    """
+    if conflict is None:
+        try:
+            file_id = box_file_upload(client, local_file_path, parent_folder_id)
+            logger.info("Uploaded file: %s", local_file_path.name)
+            return file_id, "uploaded"
+        except BoxAPIError as e:
+            if not (
+                e.response_info.status_code == 409
+                and e.response_info.code == "item_name_in_use"
+                and e.response_info.context_info
+                and "conflicts" in e.response_info.context_info
+            ):
+                raise e
+            conflict = e.response_info.context_info["conflicts"]
+            if isinstance(conflict, list):
+                conflict = conflict[0]
+            logger.debug(
+                "File '%s' appeared since the folder was listed", local_file_path
+            )
+
+    file_id = box_file_update(client, conflict["id"], local_file_path)
+    logger.info("Updated file: %s", local_file_path.name)
+    return file_id, "updated"
+
+
+def _box_folder_resolve(
+    client: BoxClient,
+    folder_name: str,
+    parent_folder_id: str,
+    name_index: Optional[Dict[str, Dict[str, Any]]],
+) -> tuple[str, Optional[Dict[str, Dict[str, Any]]]]:
+    """Find or create a sub-folder using the parent's name index.
+
+    Returns:
+        tuple[str, Optional[Dict[str, Dict[str, Any]]]]: The folder ID and its
+        name index when already known: empty for a new folder, None when the
+        folder exists (or no parent index is available) and must be listed
+    """
+    entry = name_index.get(folder_name.casefold()) if name_index is not None else None
+    if entry and entry["type"] == "folder":
+        return entry["id"], None
+    folder_id = box_folder_create(client, folder_name, parent_folder_id)
+    return folder_id, {} if name_index is not None else None
+
+
+class _MemoryViewReader(io.RawIOBase):
+    """Seekable, read-only stream over a memoryview, so parts are sent without copies."""
+
+    def __init__(self, view: memoryview) -> None:
+        self._view = view
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {
+            io.SEEK_SET: 0,
+            io.SEEK_CUR: self._position,
+            io.SEEK_END: len(self._view),
+        }
+        self._position = max(0, min(base[whence] + offset, len(self._view)))
+        return self._position
+
+    def readinto(self, buffer) -> int:  # type: ignore[override]
+        size = min(len(buffer), len(self._view) - self._position)
+        buffer[:size] = self._view[self._position : self._position + size]
+        self._position += size
+        return size
+
+
+@traced()
+def _box_upload_part(
+    client: BoxClient,
+    upload_session_id: str,
+    part_view: memoryview,
+    offset: int,
+    file_size: int,
+) -> UploadPart:
+    """Upload one part of a chunked upload session and verify Box's digest."""
+    part_sha1 = hashlib.sha1(part_view)
+    content_range = f"bytes {offset}-{offset + len(part_view) - 1}/{file_size}"
+    uploaded = client.chunked_uploads.upload_file_part(
+        upload_session_id=upload_session_id,
+        request_body=_MemoryViewReader(part_view),
+        digest="sha=" + base64.b64encode(part_sha1.digest()).decode("ascii"),
+        content_range=content_range,
+    )
+    part = uploaded.part
+    if (
+        part is None
+        or part.sha_1 != part_sha1.hexdigest()
+        or part.offset != offset
+        or part.size != len(part_view)
+    ):
+        raise ValueError(f"Box digest mismatch for part {content_range}")
+    return part
+
+
+@traced()
+def box_file_upload_chunked(
+    client: BoxClient,
+    local_file_path: Path,
+    box_folder_parent_id: Optional[str] = None,
+    file_id: Optional[str] = None,
+    max_workers: int = 4,
+) -> str:
+    """
+    Upload a large file to Box through a chunked upload session.
+
+    Parts are read from a memory-mapped view of the file and uploaded in
+    parallel, each one with its own SHA-1 digest verified against the one
+    Box reports. The whole-file SHA-1 is computed incrementally and sent
+    with the commit. The session is aborted if any part fails.
+
+    Args:
+        client: Authenticated Box client
+        local_file_path: Path to the local file to upload
+        box_folder_parent_id: ID of the parent folder in Box, for a new file
+        file_id: ID of the existing file, to upload a new version instead
+        max_workers: Maximum number of parts uploaded at the same time
+
+    Returns:
+        str: ID of the uploaded file
+    """
+    file_size = local_file_path.stat().st_size
+    add_span_attributes(file=local_file_path.name, size=file_size)
+    if file_id is not None:
+        session = client.chunked_uploads.create_file_upload_session_for_existing_file(
+            file_id=file_id, file_size=file_size, file_name=local_file_path.name
+        )
+    elif box_folder_parent_id is not None:
+        session = client.chunked_uploads.create_file_upload_session(
+            folder_id=box_folder_parent_id,
+            file_size=file_size,
+            file_name=local_file_path.name,
+        )
+    else:
+        raise ValueError("Either box_folder_parent_id or file_id must be provided")
+
+    if session.id is None or not session.part_size:
+        raise ValueError("Invalid upload session returned from Box API")
+    part_size = session.part_size
+    add_span_attributes(parts=session.total_parts)
+    logger.debug(
+        "Chunked upload of '%s': %d parts of %d bytes",
+        local_file_path.name,
+        session.total_parts,
+        part_size,
+    )
+
+    try:
+        with (
+            open(local_file_path, "rb") as file_stream,
+            mmap.mmap(file_stream.fileno(), 0, access=mmap.ACCESS_READ) as mapped,
+        ):
+            file_view = memoryview(mapped)
+            part_views: List[memoryview] = []
+            try:
+                file_sha1 = hashlib.sha1()
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    futures = []
+                    for offset in range(0, file_size, part_size):
+                        part_view = file_view[offset : offset + part_size]
+                        part_views.append(part_view)
+                        file_sha1.update(part_view)
+                        futures.append(
+                            executor.submit(
+                                with_trace_context(_box_upload_part),
+                                client,
+                                session.id,
+                                part_view,
+                                offset,
+                                file_size,
+                            )
+                        )
+                    parts = [future.result() for future in futures]
+            finally:
+                # Views must be released before the mapping can be closed
+                for part_view in part_views:
+                    part_view.release()
+                file_view.release()
+
+        digest = "sha=" + base64.b64encode(file_sha1.digest()).decode("ascii")
+        files = None
+        for _ in range(10):
+            files = client.chunked_uploads.create_file_upload_session_commit(
+                upload_session_id=session.id, parts=parts, digest=digest
+            )
+            if files is not None:
+                break
+            # 202: Box is still processing the parts
+            time.sleep(1)
+        # Checked before leaving the try, so the session is aborted
+        if not files or not files.entries:
+            raise ValueError("No file entries returned from Box API")
+    except Exception:
+        client.chunked_uploads.delete_file_upload_session_by_id(session.id)
+        raise
+
+    entry = files.entries[0]
+    parent_id = box_folder_parent_id or (entry.parent.id if entry.parent else None)
+    if parent_id:
+        folder_listing_cache.invalidate(parent_id)
+    return entry.id
+
+
+def _use_chunked_upload(local_file_path: Path) -> bool:
+    """Whether a file is large enough for a chunked upload session."""
+    threshold = conf.BOX_CHUNKED_UPLOAD_THRESHOLD_MB * 1024 * 1024
+    return local_file_path.stat().st_size >= threshold
+
+
+@traced()
 def box_file_upload(
     client: BoxClient, local_file_path: Path, box_folder_parent_id: str
 ) -> str:
     """
     Upload a file to Box.
 
+    Files of at least `BOX_CHUNKED_UPLOAD_THRESHOLD_MB` are uploaded with
+    `box_file_upload_chunked`.
+
     Args:
         client: Authenticated Box client
         local_file_path: Path to the local file to upload
@@ -80,6 +420,15 @@ def box_file_upload(
     Returns:
         str: ID of the uploaded file
     """
+    if _use_chunked_upload(local_file_path):
+        return box_file_upload_chunked(
+            client,
+            local_file_path,
+            box_folder_parent_id=box_folder_parent_id,
+            max_workers=conf.BOX_CHUNKED_UPLOAD_WORKERS,
+        )
+
+    add_span_attributes(file=local_file_path.name, size=local_file_path.stat().st_size)
     attributes = UploadFileAttributes(
         name=local_file_path.name,
         parent=UploadFileAttributesParentField(id=box_folder_parent_id),
@@ -88,6 +437,7 @@ def box_file_upload(
     try:
         with open(local_file_path, "rb") as file_stream:
             files = client.uploads.upload_file(attributes=attributes, file=file_stream)
+            folder_listing_cache.invalidate(box_folder_parent_id)
             if files.entries:
                 return files.entries[0].id
             else:
@@ -97,10 +447,14 @@ def box_file_upload(
         raise e
 
 
+@traced()
 def box_file_update(client: BoxClient, file_id: str, local_file_path: Path) -> str:
     """
     Update a file in Box.
 
+    Files of at least `BOX_CHUNKED_UPLOAD_THRESHOLD_MB` are uploaded with
+    `box_file_upload_chunked`.
+
     Args:
         client: Authenticated Box client
         file_id: ID of the file to update
@@ -109,6 +463,15 @@ def box_file_update(client: BoxClient, file_id: str, local_file_path: Path) -> s
     Returns:
         str: ID of the updated file
     """
+    if _use_chunked_upload(local_file_path):
+        return box_file_upload_chunked(
+            client,
+            local_file_path,
+            file_id=file_id,
+            max_workers=conf.BOX_CHUNKED_UPLOAD_WORKERS,
+        )
+
+    add_span_attributes(file=local_file_path.name, size=local_file_path.stat().st_size)
     attributes = UploadFileVersionAttributes(name=local_file_path.name)
     try:
         with open(local_file_path, "rb") as file_stream:
@@ -116,6 +479,9 @@ def box_file_update(client: BoxClient, file_id: str, local_file_path: Path) -> s
                 file_id=file_id, attributes=attributes, file=file_stream
             )
             if files.entries:
+                # A new version changes the listing's sha1 / version ID
+                if files.entries[0].parent:
+                    folder_listing_cache.invalidate(files.entries[0].parent.id)
                 return files.entries[0].id
             else:
                 raise ValueError("No file entries returned from Box API")
@@ -124,6 +490,7 @@ def box_file_update(client: BoxClient, file_id: str, local_file_path: Path) -> s
         raise e
 
 
+@traced()
 def box_folder_create(
     client: BoxClient, folder_name: str, parent_folder_id: str
 ) -> str:
@@ -143,6 +510,7 @@ def box_folder_create(
             name=folder_name,
             parent=CreateFolderParent(id=parent_folder_id),
         )
+        folder_listing_cache.invalidate(parent_folder_id)
         return folder.id
     except BoxAPIError as e:
         # Check if folder already exists (conflict error)
@@ -174,20 +542,34 @@ def save_upload_cache_to_json(
     logger.info("Upload cache saved to: %s", output_file)
 
 
+@traced()
 def local_folder_upload(
     client: BoxClient,
     local_dir: Path,
     parent_folder_id: str,
     folder_cache: Dict[str, Dict[str, str]],
+    check_quota: bool = False,
+    name_index: Optional[Dict[str, Dict[str, Any]]] = None,
+    journal: Optional[UploadJournal] = None,
 ) -> None:
     """Recursively upload a directory and its contents to Box.
 
+    Each destination folder is listed once and the resulting name index
+    decides between a new upload and a new version, instead of a preflight
+    check per file.
+
     Args:
         client: Authenticated Box client
         local_dir: Path to the local directory to upload
         parent_folder_id: ID of the parent folder in Box
         folder_cache: Dictionary to track uploaded items with their Box IDs
                      Structure: {path: {"name": str, "type": "file"|"folder", "id": str}}
+        check_quota: Run the preflight check for every file, to verify quota
+                     and permissions before uploading
+        name_index: Index of the parent folder from `box_folder_name_index`,
+                    listed when not given
+        journal: Journal recording each completed item; items it reports as
+                 completed by a previous run are skipped
     """
     # clip local_dir str to start at data/
     local_dir_str = str(local_dir)
@@ -195,35 +577,44 @@ def local_folder_upload(
         local_dir_str = local_dir_str.split("langchain-box-loan-demo/")[-1]
     logger.info("Processing folder: %s", local_dir_str)
 
+    if name_index is None and not check_quota:
+        name_index = box_folder_name_index(client, parent_folder_id)
+
     # Process all items in the directory
     for item in local_dir.iterdir():
         if item.is_file():
             # skip files starting with .
             if item.name.startswith("."):
                 continue
-            (can_upload, conflict_file_id, _) = box_file_pre_flight_check(
-                client, item, parent_folder_id
-            )
-            if can_upload:
-                file_id = box_file_upload(client, item, parent_folder_id)
-                logger.info("Uploaded file: %s", item.name)
-                # Track the uploaded file
-                folder_cache[str(item.name)] = {
-                    "name": item.name,
-                    "type": "file",
-                    "id": file_id,
-                }
-            elif conflict_file_id:
-                file_id = box_file_update(client, conflict_file_id, item)
-                logger.info("Updated file: %s", item.name)
-                # Track the updated file
-                folder_cache[str(item.name)] = {
-                    "name": item.name,
-                    "type": "file",
-                    "id": file_id,
-                }
+            entry = journal.completed(item) if journal else None
+            if entry:
+                file_id = entry["id"]
+                logger.debug("Skipped file completed by a previous run: %s", item)
+            else:
+                conflict = _find_file_conflict(
+                    client, item, parent_folder_id, name_index, check_quota
+                )
+                file_id, _ = _box_file_upload_or_update(
+                    client, item, parent_folder_id, conflict
+                )
+                if journal:
+                    journal.record(item, "file", file_id)
+            # Track the uploaded or updated file
+            folder_cache[str(item.name)] = {
+                "name": item.name,
+                "type": "file",
+                "id": file_id,
+            }
         elif item.is_dir():
-            new_folder_id = box_folder_create(client, item.name, parent_folder_id)
+            entry = journal.completed(item) if journal else None
+            if entry:
+                new_folder_id, sub_index = entry["id"], None
+            else:
+                new_folder_id, sub_index = _box_folder_resolve(
+                    client, item.name, parent_folder_id, name_index
+                )
+                if journal:
+                    journal.record(item, "folder", new_folder_id)
             logger.info("Created folder: %s", item.name)
             # Track the created folder
             folder_cache[str(item.name)] = {
@@ -232,13 +623,211 @@ def local_folder_upload(
                 "id": new_folder_id,
             }
             # Recursively process subdirectory
-            local_folder_upload(client, item, new_folder_id, folder_cache)
+            local_folder_upload(
+                client,
+                item,
+                new_folder_id,
+                folder_cache,
+                check_quota,
+                sub_index,
+                journal,
+            )
+
+
+@traced()
+def local_folder_upload_concurrent(
+    client: BoxClient,
+    local_dir: Path,
+    parent_folder_id: str,
+    folder_cache: Dict[str, Dict[str, str]],
+    max_workers: int = 8,
+    sync_manifest: Optional[SyncManifest] = None,
+    check_quota: bool = False,
+    journal: Optional[UploadJournal] = None,
+) -> Dict[str, float]:
+    """Upload a directory tree to Box using a bounded pool of workers.
+
+    The tree is processed breadth-first: the sub-folders of one level are
+    created before any of their children are scheduled, while the files of
+    every already-created folder are uploaded concurrently. Each existing
+    destination folder is listed once to detect name conflicts, so no
+    preflight check is needed per file.
 
+    Args:
+        client: Authenticated Box client
+        local_dir: Path to the local directory to upload
+        parent_folder_id: ID of the parent folder in Box
+        folder_cache: Dictionary to track uploaded items with their Box IDs
+                     Structure: {path: {"name": str, "type": "file"|"folder", "id": str}}
+        max_workers: Maximum number of concurrent Box requests
+        sync_manifest: When given, files whose content already matches Box
+                       (same SHA-1) are skipped instead of re-uploaded
+        check_quota: Run the preflight check for every file, to verify quota
+                     and permissions before uploading
+        journal: Journal recording each completed item; items it reports as
+                 completed by a previous run are skipped
+
+    Returns:
+        Dict[str, float]: Upload statistics with "files", "skipped", "resumed",
+        "folders", "bytes", "seconds", "files_per_second" and "mb_per_second"
 
+    Raises:
+        Exception: The first error raised by any upload, after all workers finished
+    """
+    started = time.perf_counter()
+    lock = threading.Lock()
+    stats: Dict[str, float] = {
+        "files": 0,
+        "skipped": 0,
+        "resumed": 0,
+        "folders": 0,
+        "bytes": 0,
+    }
+
+    @traced()
+    def upload_file(
+        item: Path, folder_id: str, name_index: Optional[Dict[str, Dict[str, Any]]]
+    ) -> None:
+        add_span_attributes(file=item.name)
+        entry = journal.completed(item) if journal else None
+        if entry:
+            file_id, action = entry["id"], "resumed"
+            logger.debug("Skipped file completed by a previous run: %s", item)
+        elif sync_manifest is None:
+            conflict = _find_file_conflict(
+                client, item, folder_id, name_index, check_quota
+            )
+            file_id, action = _box_file_upload_or_update(
+                client, item, folder_id, conflict
+            )
+        else:
+            file_id, action = local_file_sync(
+                client, item, folder_id, sync_manifest, name_index, check_quota
+            )
+        if journal and action != "resumed":
+            journal.record(item, "file", file_id)
+        with lock:
+            folder_cache[str(item.name)] = {
+                "name": item.name,
+                "type": "file",
+                "id": file_id,
+            }
+            if action in ("skipped", "resumed"):
+                stats[action] += 1
+            else:
+                stats["files"] += 1
+                stats["bytes"] += item.stat().st_size
+
+    @traced()
+    def resolve_folder(
+        item: Path, folder_id: str, name_index: Optional[Dict[str, Dict[str, Any]]]
+    ) -> tuple[str, Optional[Dict[str, Dict[str, Any]]]]:
+        entry = journal.completed(item) if journal else None
+        if entry:
+            return entry["id"], None
+        new_folder_id, sub_index = _box_folder_resolve(
+            client, item.name, folder_id, name_index
+        )
+        if journal:
+            journal.record(item, "folder", new_folder_id)
+        return new_folder_id, sub_index
+
+    file_futures: List[Future] = []
+    # (local directory, Box folder ID, name index or None when not listed yet)
+    level: List[Tuple[Path, str, Optional[Dict[str, Dict[str, Any]]]]] = [
+        (local_dir, parent_folder_id, None)
+    ]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while level:
+            # List the existing folders of this level once, concurrently
+            if not check_quota:
+                listing_futures = [
+                    executor.submit(
+                        with_trace_context(box_folder_name_index), client, folder_id
+                    )
+                    if name_index is None
+                    else None
+                    for _, folder_id, name_index in level
+                ]
+                level = [
+                    (directory, folder_id, future.result() if future else name_index)
+                    for (directory, folder_id, name_index), future in zip(
+                        level, listing_futures
+                    )
+                ]
+
+            folder_futures: List[Tuple[Path, Future]] = []
+            for directory, folder_id, name_index in level:
+                logger.info("Processing folder: %s", directory.name)
+                items = sorted(directory.iterdir())
+                # Folders first, so the next level is not queued behind files
+                for item in items:
+                    if item.is_dir():
+                        future = executor.submit(
+                            with_trace_context(resolve_folder),
+                            item,
+                            folder_id,
+                            name_index,
+                        )
+                        folder_futures.append((item, future))
+                for item in items:
+                    # skip files starting with .
+                    if item.is_file() and not item.name.startswith("."):
+                        file_futures.append(
+                            executor.submit(
+                                with_trace_context(upload_file),
+                                item,
+                                folder_id,
+                                name_index,
+                            )
+                        )
+
+            next_level: List[Tuple[Path, str, Optional[Dict[str, Dict[str, Any]]]]] = []
+            for item, future in folder_futures:
+                new_folder_id, sub_index = future.result()
+                logger.info("Created folder: %s", item.name)
+                with lock:
+                    folder_cache[str(item.name)] = {
+                        "name": item.name,
+                        "type": "folder",
+                        "id": new_folder_id,
+                    }
+                    stats["folders"] += 1
+                next_level.append((item, new_folder_id, sub_index))
+            level = next_level
+
+        errors = [f.exception() for f in file_futures if f.exception() is not None]
+
+    stats["seconds"] = time.perf_counter() - started
+    stats["files_per_second"] = stats["files"] / max(stats["seconds"], 1e-9)
+    stats["mb_per_second"] = stats["bytes"] / 1_000_000 / max(stats["seconds"], 1e-9)
+    logger.info(
+        "Uploaded %d files (%.1f MB), skipped %d unchanged and %d resumed files "
+        "and synced %d folders in %.1fs: %.1f files/s, %.2f MB/s",
+        stats["files"],
+        stats["bytes"] / 1_000_000,
+        stats["skipped"],
+        stats["resumed"],
+        stats["folders"],
+        stats["seconds"],
+        stats["files_per_second"],
+        stats["mb_per_second"],
+    )
+
+    if errors:
+        for error in errors:
+            logger.error("File upload failed: %s", error)
+        raise errors[0]  # type: ignore[misc]
+    return stats
+
+
+@traced()
 def local_file_upload(
     client: BoxClient,
     local_file_path: Path,
     parent_folder_id: str,
+    name_index: Optional[Dict[str, Dict[str, Any]]] = None,
+    check_quota: bool = False,
 ) -> str:
     """Upload a single file to Box.
 
@@ -246,25 +835,71 @@ def local_file_upload(
         client: Authenticated Box client
         local_file_path: Path to the local file to upload
         parent_folder_id: ID of the parent folder in Box
-        folder_cache: Dictionary to track uploaded items with their Box IDs
-                     Structure: {path: {"name": str, "type": "file"|"folder", "id": str}}
+        name_index: Index of the parent folder from `box_folder_name_index`.
+                    When given, name conflicts are resolved locally instead
+                    of with a preflight check
+        check_quota: Always run the preflight check, to verify quota and
+                     permissions before uploading
+
+    Returns:
+        str: ID of the uploaded or updated file
     """
     try:
-        (can_upload, conflict_file_id, _) = box_file_pre_flight_check(
-            client, local_file_path, parent_folder_id
+        conflict = _find_file_conflict(
+            client, local_file_path, parent_folder_id, name_index, check_quota
+        )
+        file_id, _ = _box_file_upload_or_update(
+            client, local_file_path, parent_folder_id, conflict
         )
-
-        if can_upload:
-            file_id = box_file_upload(client, local_file_path, parent_folder_id)
-            logger.info("Uploaded file: %s", local_file_path.name)
-
-        elif conflict_file_id:
-            file_id = box_file_update(client, conflict_file_id, local_file_path)
-            logger.info("Updated file: %s", local_file_path.name)
-        else:
-            raise ValueError("Unable to determine upload status for file.")
-
         return file_id
     except BoxAPIError as e:
         logger.error("Failed to upload/update file '%s': %s", local_file_path, e)
         raise e
+
+
+@traced()
+def local_file_sync(
+    client: BoxClient,
+    local_file_path: Path,
+    parent_folder_id: str,
+    sync_manifest: SyncManifest,
+    name_index: Optional[Dict[str, Dict[str, Any]]] = None,
+    check_quota: bool = False,
+) -> tuple[str, str]:
+    """Upload a single file to Box only if its content differs from Box.
+
+    The local SHA-1 (served from the manifest when size and mtime are
+    unchanged) is compared with the SHA-1 Box reports for the conflicting
+    file; identical files are skipped.
+
+    Args:
+        client: Authenticated Box client
+        local_file_path: Path to the local file to upload
+        parent_folder_id: ID of the parent folder in Box
+        sync_manifest: Manifest of local digests, updated with the Box file ID
+        name_index: Index of the parent folder from `box_folder_name_index`.
+                    When given, name conflicts are resolved locally instead
+                    of with a preflight check
+        check_quota: Always run the preflight check, to verify quota and
+                     permissions before uploading
+
+    Returns:
+        tuple[str, str]: The Box file ID and the action taken:
+        "uploaded", "updated" or "skipped"
+    """
+    local_sha1 = sync_manifest.local_sha1(local_file_path)
+    conflict = _find_file_conflict(
+        client, local_file_path, parent_folder_id, name_index, check_quota
+    )
+
+    if conflict and conflict.get("sha1") == local_sha1:
+        file_id = conflict["id"]
+        action = "skipped"
+        logger.debug("Skipped unchanged file: %s", local_file_path.name)
+    else:
+        file_id, action = _box_file_upload_or_update(
+            client, local_file_path, parent_folder_id, conflict
+        )
+
+    sync_manifest.record(local_file_path, file_id)
+    return file_id, action
@@ -0,0 +1,142 @@
+"""In-process caches for Box API responses.
+
+This module provides a process-wide, thread-safe cache for Box folder
+listings so that every loan tool working on the same folder during a run
+shares a single `box_folder_items_list` round trip.
+
+Entries expire after a configurable TTL and the cache is bounded in size
+with least-recently-used eviction. Call `invalidate()` whenever the content
+of a folder changes (e.g. after an upload).
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from box_ai_agents_toolkit import box_folder_items_list
+from box_sdk_gen import BoxClient
+
+from app_config import conf
+
+logger = logging.getLogger(__name__)
+
+
+class FolderListingCache:
+    """Thread-safe TTL + LRU cache for Box folder listings keyed by folder ID."""
+
+    def __init__(self, ttl_seconds: float = 300.0, max_entries: int = 256) -> None:
+        """Create an empty cache.
+
+        Args:
+            ttl_seconds: Time in seconds a listing stays valid
+            max_entries: Maximum number of folders kept before LRU eviction
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[str, Tuple[float, Dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, folder_id: str) -> Optional[Dict[str, Any]]:
+        """Return the cached listing for a folder, or None if missing or expired.
+
+        Args:
+            folder_id: Box folder ID
+
+        Returns:
+            The cached `box_folder_items_list` response, or None
+        """
+        with self._lock:
+            entry = self._entries.get(folder_id)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, listing = entry
+            if expires_at < time.monotonic():
+                del self._entries[folder_id]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(folder_id)
+            self.hits += 1
+            return listing
+
+    def put(self, folder_id: str, listing: Dict[str, Any]) -> None:
+        """Store a folder listing, evicting the least recently used entries.
+
+        Args:
+            folder_id: Box folder ID
+            listing: Response returned by `box_folder_items_list`
+        """
+        with self._lock:
+            self._entries[folder_id] = (time.monotonic() + self.ttl_seconds, listing)
+            self._entries.move_to_end(folder_id)
+            while len(self._entries) > self.max_entries:
+                evicted_id, _ = self._entries.popitem(last=False)
+                self.evictions += 1
+                logger.debug("Evicted folder listing from cache: %s", evicted_id)
+
+    def invalidate(self, folder_id: str) -> None:
+        """Drop the cached listing for a folder.
+
+        Args:
+            folder_id: Box folder ID whose content changed
+        """
+        with self._lock:
+            if self._entries.pop(folder_id, None) is not None:
+                logger.debug("Invalidated folder listing cache for: %s", folder_id)
+
+    def clear(self) -> None:
+        """Drop all cached listings and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss/eviction counters and the current size."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+            }
+
+
+# Process-wide cache shared by every tool
+folder_listing_cache = FolderListingCache(
+    ttl_seconds=conf.BOX_FOLDER_CACHE_TTL_SECONDS,
+    max_entries=conf.BOX_FOLDER_CACHE_MAX_ENTRIES,
+)
+
+
+def box_folder_items_list_cached(client: BoxClient, folder_id: str) -> Dict[str, Any]:
+    """List the direct children of a Box folder, using the shared cache.
+
+    Error responses are returned as-is and never cached.
+
+    Args:
+        client: Authenticated Box client
+        folder_id: Box folder ID
+
+    Returns:
+        Same structure as `box_folder_items_list`
+    """
+    listing = folder_listing_cache.get(folder_id)
+    if listing is not None:
+        logger.debug("Folder listing cache hit: %s", folder_id)
+        return listing
+
+    listing = box_folder_items_list(
+        client=client, folder_id=folder_id, is_recursive=False
+    )
+    if "error" not in listing:
+        folder_listing_cache.put(folder_id, listing)
+    return listing
@@ -0,0 +1,59 @@
+"""Bounded executor for blocking Box SDK calls made from async code.
+
+The Box SDK is synchronous. Async callers (LangChain tool coroutines,
+batch runners) hand their blocking calls to a dedicated, size-bounded
+thread pool so they neither stall the event loop nor exhaust the loop's
+default executor. Context variables are propagated to the worker thread.
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from app_config import conf
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_box_executor: Optional[ThreadPoolExecutor] = None
+_box_executor_lock = threading.Lock()
+
+
+def get_box_executor() -> ThreadPoolExecutor:
+    """Return the process-wide Box I/O thread pool, creating it on first use."""
+    global _box_executor
+    if _box_executor is None:
+        with _box_executor_lock:
+            if _box_executor is None:
+                logger.debug(
+                    "Starting Box I/O executor with %d workers",
+                    conf.BOX_IO_MAX_WORKERS,
+                )
+                _box_executor = ThreadPoolExecutor(
+                    max_workers=conf.BOX_IO_MAX_WORKERS,
+                    thread_name_prefix="box-io",
+                )
+    return _box_executor
+
+
+async def run_in_box_executor(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking Box call on the Box I/O executor and await its result.
+
+    Args:
+        func: Blocking function to call
+        *args: Positional arguments for func
+        **kwargs: Keyword arguments for func
+
+    Returns:
+        The value returned by func
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        get_box_executor(), functools.partial(context.run, func, *args, **kwargs)
+    )
@@ -0,0 +1,245 @@
+"""Pooled HTTP transport shared by every Box client.
+
+The loan tools issue bursts of small folder-list and Box AI calls. Every
+Box client built by `get_box_client` therefore uses the same
+`NetworkSession`, backed by one `requests.Session` whose connection pool,
+keep-alive, timeouts and retry policy come from `_APP_Config`. Reused
+connections skip the TCP and TLS handshakes; the pool statistics logged by
+`log_box_http_pool_stats` show how many were saved. Every request first
+waits for the shared rate limiter (see `box_rate_limit.py`), and is
+recorded as a span when Box call tracing is enabled (see `box_trace.py`).
+"""
+
+import atexit
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from box_sdk_gen import NetworkSession
+from box_sdk_gen.networking.box_network_client import (
+    APIRequest,
+    APIResponse,
+    BoxNetworkClient,
+)
+from requests import RequestException
+from requests.adapters import HTTPAdapter
+from requests.utils import super_len
+
+from app_config import conf
+from utils.box_rate_limit import RateLimitedRetryStrategy, box_rate_limiter
+from utils.box_trace import SPAN_KIND_CLIENT, box_tracer
+
+logger = logging.getLogger(__name__)
+
+_network_session: Optional[NetworkSession] = None
+_http_adapter: Optional[HTTPAdapter] = None
+_network_session_lock = threading.Lock()
+
+
+class PooledBoxNetworkClient(BoxNetworkClient):
+    """Box network client with configurable timeouts and rate limiting.
+
+    The SDK hard-codes a (5, 60) seconds timeout in `_make_request`; this
+    is the same request with the timeouts from `_APP_Config`, sent once the
+    rate limiter allows it. When Box call tracing is enabled, each attempt
+    is recorded as a client span with its status and body sizes.
+    """
+
+    def __init__(
+        self, requests_session: requests.Session, timeout: tuple[float, float]
+    ) -> None:
+        """Create the client.
+
+        Args:
+            requests_session: Pooled session used for every request
+            timeout: Connect and read timeouts in seconds
+        """
+        super().__init__(requests_session=requests_session)
+        self.timeout = timeout
+
+    def _make_request(self, request: APIRequest) -> APIResponse:
+        if not box_tracer.enabled:
+            return self._send(request)
+
+        url = urlsplit(request.url)
+        with box_tracer.span(
+            f"{request.method.upper()} {url.path}",
+            kind=SPAN_KIND_CLIENT,
+            **{
+                "http.request.method": request.method.upper(),
+                "server.address": url.hostname,
+                "url.path": url.path,
+                "http.request.body.size": _body_size(request.data),
+            },
+        ) as attributes:
+            response = self._send(request, attributes)
+            network_response = response.network_response
+            if network_response is None:
+                attributes["error.type"] = type(response.raised_exception).__name__
+            else:
+                attributes["http.response.status_code"] = network_response.status_code
+                attributes["http.response.body.size"] = _response_size(network_response)
+                if network_response.status_code >= 400:
+                    attributes["error.type"] = str(network_response.status_code)
+            return response
+
+    def _send(
+        self, request: APIRequest, attributes: Optional[Dict[str, Any]] = None
+    ) -> APIResponse:
+        raised_exception = None
+        reauthentication_needed = False
+        waited = time.perf_counter()
+        box_rate_limiter.acquire(request.url)
+        if attributes is not None:
+            attributes["box.rate_limit_wait_ms"] = round(
+                (time.perf_counter() - waited) * 1000, 3
+            )
+        try:
+            network_response = self.requests_session.request(
+                method=request.method,
+                url=request.url,
+                headers=request.headers,
+                data=request.data,
+                params=request.params,
+                allow_redirects=request.allow_redirects,
+                stream=True,
+                timeout=self.timeout,
+            )
+        except RequestException as request_exc:
+            raised_exception = request_exc
+            network_response = None
+
+            if "EOF occurred in violation of protocol" in str(request_exc):
+                reauthentication_needed = True
+
+        return APIResponse(
+            network_response=network_response,
+            reauthentication_needed=reauthentication_needed,
+            raised_exception=raised_exception,
+        )
+
+
+def _body_size(data: Any) -> Optional[int]:
+    """Size of a request body in bytes (JSON text, form or file stream)."""
+    if data is None:
+        return 0
+    try:
+        return super_len(data.encode("utf-8") if isinstance(data, str) else data)
+    except Exception:
+        return None
+
+
+def _response_size(network_response: requests.Response) -> Optional[int]:
+    """Size of a response body in bytes.
+
+    Streamed downloads report their Content-Length. JSON bodies are read
+    here, the SDK reads them right after anyway.
+    """
+    content_length = network_response.headers.get("Content-Length")
+    if content_length is not None and content_length.isdigit():
+        return int(content_length)
+    if "json" in network_response.headers.get("Content-Type", ""):
+        return len(network_response.content)
+    return None
+
+
+def get_box_network_session() -> NetworkSession:
+    """Return the process-wide Box network session, creating it on first use.
+
+    Retries are left to the Box retry strategy (which honors Retry-After,
+    with jitter), so the urllib3 adapter itself never retries.
+    """
+    global _network_session, _http_adapter
+    if _network_session is None:
+        with _network_session_lock:
+            if _network_session is None:
+                adapter = HTTPAdapter(
+                    pool_connections=conf.BOX_HTTP_POOL_CONNECTIONS,
+                    pool_maxsize=conf.BOX_HTTP_POOL_MAXSIZE,
+                    pool_block=conf.BOX_HTTP_POOL_BLOCK,
+                    max_retries=0,
+                )
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                if not conf.BOX_HTTP_KEEP_ALIVE:
+                    session.headers["Connection"] = "close"
+
+                retry_strategy = RateLimitedRetryStrategy(
+                    box_rate_limiter,
+                    retry_after_jitter=conf.BOX_RATE_RETRY_AFTER_JITTER,
+                    max_attempts=conf.BOX_HTTP_MAX_ATTEMPTS,
+                    retry_base_interval=conf.BOX_HTTP_RETRY_BASE_INTERVAL,
+                    max_retries_on_exception=conf.BOX_HTTP_MAX_RETRIES_ON_EXCEPTION,
+                )
+                network_client = PooledBoxNetworkClient(
+                    session,
+                    timeout=(
+                        conf.BOX_HTTP_CONNECT_TIMEOUT,
+                        conf.BOX_HTTP_READ_TIMEOUT,
+                    ),
+                )
+                logger.debug(
+                    "Box HTTP pool: %d hosts x %d connections, keep-alive %s, "
+                    "timeouts %ss/%ss, %d attempts",
+                    conf.BOX_HTTP_POOL_CONNECTIONS,
+                    conf.BOX_HTTP_POOL_MAXSIZE,
+                    conf.BOX_HTTP_KEEP_ALIVE,
+                    conf.BOX_HTTP_CONNECT_TIMEOUT,
+                    conf.BOX_HTTP_READ_TIMEOUT,
+                    conf.BOX_HTTP_MAX_ATTEMPTS,
+                )
+                _http_adapter = adapter
+                _network_session = NetworkSession(
+                    network_client=network_client, retry_strategy=retry_strategy
+                )
+    return _network_session
+
+
+def box_http_pool_stats() -> Dict[str, int]:
+    """Return request and connection counters of the shared pool.
+
+    Returns:
+        Dictionary with "requests", "connections" (new TCP/TLS connections
+        opened), "reused" (requests served on a kept-alive connection) and
+        "pools" (hosts currently pooled)
+    """
+    requests_count = 0
+    connections = 0
+    pools = 0
+    if _http_adapter is not None:
+        pool_manager = _http_adapter.poolmanager
+        for key in list(pool_manager.pools.keys()):
+            pool = pool_manager.pools.get(key)
+            if pool is None:
+                continue
+            pools += 1
+            requests_count += pool.num_requests
+            connections += pool.num_connections
+    return {
+        "requests": requests_count,
+        "connections": connections,
+        "reused": max(requests_count - connections, 0),
+        "pools": pools,
+    }
+
+
+def log_box_http_pool_stats() -> None:
+    """Log the connection reuse of the shared pool."""
+    stats = box_http_pool_stats()
+    if not stats["requests"]:
+        return
+    logger.info(
+        "Box HTTP pool: %d requests over %d connections (%d handshakes saved, "
+        "%.0f%% reuse)",
+        stats["requests"],
+        stats["connections"],
+        stats["reused"],
+        100 * stats["reused"] / stats["requests"],
+    )
+
+
+atexit.register(log_box_http_pool_stats)
@@ -0,0 +1,271 @@
+"""Process-wide rate limiting for Box API and Box AI calls.
+
+Every request sent by the shared Box network session (see `box_http.py`)
+first takes a token from the bucket of its endpoint class: general content
+calls, Box AI ask, Box AI extract and uploads. When a bucket is empty the
+waiting calls are served by priority, interactive before batch, then in
+arrival order.
+
+A 429 from Box pauses the whole endpoint class for the Retry-After delay
+(with jitter), so concurrent callers back off together instead of each
+hitting the limit in turn. The Box retry strategy then retries the call.
+"""
+
+import contextvars
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from box_sdk_gen import BoxRetryStrategy
+from box_sdk_gen.networking.fetch_options import FetchOptions
+from box_sdk_gen.networking.fetch_response import FetchResponse
+
+from app_config import conf
+
+logger = logging.getLogger(__name__)
+
+# Endpoint classes
+CONTENT = "content"
+AI_ASK = "ai_ask"
+AI_EXTRACT = "ai_extract"
+UPLOAD = "upload"
+
+# Priorities, lower is served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+box_call_priority: contextvars.ContextVar[int] = contextvars.ContextVar(
+    "box_call_priority", default=PRIORITY_INTERACTIVE
+)
+
+
+@contextmanager
+def box_priority(priority: int) -> Iterator[None]:
+    """Run the Box calls of a block with the given priority.
+
+    The priority is a context variable, so it follows the calls handed to
+    `run_in_box_executor` and to executors started with a copied context.
+
+    Args:
+        priority: `PRIORITY_INTERACTIVE`, `PRIORITY_BATCH` or any int (lower first)
+    """
+    token = box_call_priority.set(priority)
+    try:
+        yield
+    finally:
+        box_call_priority.reset(token)
+
+
+def classify_box_endpoint(url: str) -> Optional[str]:
+    """Return the endpoint class of a Box API URL.
+
+    Args:
+        url: Request URL
+
+    Returns:
+        The endpoint class, or None for calls that are never limited
+        (authentication)
+    """
+    parsed = urlparse(url)
+    path = parsed.path
+    if "/oauth2/" in path:
+        return None
+    if parsed.hostname and parsed.hostname.startswith("upload."):
+        return UPLOAD
+    if "/files/content" in path or "/upload_sessions" in path:
+        return UPLOAD
+    if "/ai/extract" in path:
+        return AI_EXTRACT
+    if "/ai/" in path:
+        return AI_ASK
+    return CONTENT
+
+
+class TokenBucket:
+    """Thread-safe token bucket serving waiting callers by priority."""
+
+    def __init__(self, name: str, rate: float, capacity: float) -> None:
+        """Create a full bucket.
+
+        Args:
+            name: Endpoint class, used in logs
+            rate: Tokens added per second, 0 or less disables the limit
+            capacity: Maximum burst of calls
+        """
+        self.name = name
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self.tokens = self.capacity
+        self.paused_until = 0.0
+        self.waited_seconds = 0.0
+        self.acquired = 0
+        self.throttled = 0
+        self._updated = time.monotonic()
+        self._waiters: List[Tuple[int, int]] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def acquire(self, priority: int = PRIORITY_INTERACTIVE) -> float:
+        """Block until a call may be sent.
+
+        Args:
+            priority: Lower values are served first
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        if self.rate <= 0:
+            return 0.0
+        started = time.monotonic()
+        ticket = (priority, next(self._sequence))
+        with self._condition:
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if self._waiters[0] != ticket:
+                        self._condition.wait()
+                        continue
+                    if now >= self.paused_until and self.tokens >= 1:
+                        self.tokens -= 1
+                        heapq.heappop(self._waiters)
+                        break
+                    self._condition.wait(
+                        max(self.paused_until - now, (1 - self.tokens) / self.rate)
+                    )
+            except BaseException:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                raise
+            finally:
+                self._condition.notify_all()
+
+            waited = time.monotonic() - started
+            self.acquired += 1
+            self.waited_seconds += waited
+        return waited
+
+    def pause(self, seconds: float) -> None:
+        """Stop serving calls for a while, e.g. after a 429.
+
+        Args:
+            seconds: Delay before the next call of this class
+        """
+        with self._condition:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.throttled += 1
+            self._condition.notify_all()
+
+
+class BoxRateLimiter:
+    """One token bucket per Box endpoint class."""
+
+    def __init__(self, rates: Dict[str, float], enabled: bool = True) -> None:
+        """Create the buckets.
+
+        Args:
+            rates: Calls per second allowed for each endpoint class
+            enabled: When False, `acquire` never waits
+        """
+        self.enabled = enabled
+        self.buckets = {
+            name: TokenBucket(name, rate, capacity=rate) for name, rate in rates.items()
+        }
+
+    def acquire(self, url: str) -> None:
+        """Wait for the bucket of the URL's endpoint class.
+
+        Args:
+            url: Request URL
+        """
+        endpoint = classify_box_endpoint(url)
+        if not self.enabled or endpoint is None:
+            return
+        waited = self.buckets[endpoint].acquire(box_call_priority.get())
+        if waited > 0.05:
+            logger.debug("Waited %.2fs for the Box %s rate limit", waited, endpoint)
+
+    def throttled(self, url: str, retry_after: float) -> None:
+        """Pause the URL's endpoint class after Box answered 429.
+
+        Args:
+            url: Request URL
+            retry_after: Seconds to wait before the next call
+        """
+        endpoint = classify_box_endpoint(url)
+        if endpoint is None:
+            return
+        logger.warning(
+            "Box rate limit hit on %s calls, pausing them for %.1fs",
+            endpoint,
+            retry_after,
+        )
+        self.buckets[endpoint].pause(retry_after)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Return calls, waiting time and 429 count per endpoint class."""
+        return {
+            name: {
+                "calls": bucket.acquired,
+                "waited_seconds": round(bucket.waited_seconds, 3),
+                "throttled": bucket.throttled,
+            }
+            for name, bucket in self.buckets.items()
+        }
+
+
+class RateLimitedRetryStrategy(BoxRetryStrategy):
+    """Box retry strategy adding jitter and pausing the limiter on 429."""
+
+    def __init__(
+        self, limiter: BoxRateLimiter, retry_after_jitter: float = 0.25, **kwargs
+    ) -> None:
+        """Create the strategy.
+
+        Args:
+            limiter: Rate limiter paused when Box answers 429
+            retry_after_jitter: Extra random delay, as a fraction of Retry-After
+            **kwargs: Arguments of `BoxRetryStrategy`
+        """
+        super().__init__(**kwargs)
+        self.limiter = limiter
+        self.retry_after_jitter = retry_after_jitter
+
+    def retry_after(
+        self,
+        fetch_options: FetchOptions,
+        fetch_response: FetchResponse,
+        attempt_number: int,
+    ) -> float:
+        delay = super().retry_after(fetch_options, fetch_response, attempt_number)
+        if fetch_response.headers.get("Retry-After") is not None:
+            # Spread the retries of every caller throttled at the same time
+            delay *= 1 + random.uniform(0, self.retry_after_jitter)
+        if fetch_response.status == 429:
+            self.limiter.throttled(fetch_options.url, delay)
+        return delay
+
+
+# Process-wide limiter shared by every Box client
+box_rate_limiter = BoxRateLimiter(
+    rates={
+        CONTENT: conf.BOX_RATE_CONTENT_PER_SECOND,
+        AI_ASK: conf.BOX_RATE_AI_ASK_PER_SECOND,
+        AI_EXTRACT: conf.BOX_RATE_AI_EXTRACT_PER_SECOND,
+        UPLOAD: conf.BOX_RATE_UPLOAD_PER_SECOND,
+    },
+    enabled=conf.BOX_RATE_LIMIT_ENABLED,
+)
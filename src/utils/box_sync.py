@@ -0,0 +1,122 @@
+"""Local content hashing for incremental Box uploads.
+
+Box reports the SHA-1 of every file it stores. Comparing it with the SHA-1
+of the local file tells whether an upload is needed at all. Hashing is
+streamed in fixed-size chunks, and a persisted manifest remembers the
+digest of every file together with its size and mtime, so unchanged files
+are not re-hashed on the next run.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha1(local_file_path: Path, chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    """Compute the SHA-1 hex digest of a file without loading it in memory.
+
+    Args:
+        local_file_path: Path to the local file
+        chunk_size: Number of bytes read per iteration
+
+    Returns:
+        str: Hex SHA-1 digest, as reported by Box
+    """
+    digest = hashlib.sha1()
+    with open(local_file_path, "rb") as file_stream:
+        while chunk := file_stream.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class SyncManifest:
+    """Persisted record of local file digests and their Box file IDs.
+
+    Entries are keyed by the path relative to `root_dir`:
+    {path: {"size": int, "mtime_ns": int, "sha1": str, "id": str}}
+    """
+
+    def __init__(self, manifest_file: Path, root_dir: Path) -> None:
+        """Load the manifest if it exists.
+
+        Args:
+            manifest_file: JSON file the manifest is persisted to
+            root_dir: Local directory the manifest paths are relative to
+        """
+        self.manifest_file = manifest_file
+        self.root_dir = root_dir
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        if manifest_file.exists():
+            with open(manifest_file, "r", encoding="utf-8") as f:
+                self._entries = json.load(f)
+            logger.debug("Loaded sync manifest with %d entries", len(self._entries))
+
+    def _key(self, local_file_path: Path) -> str:
+        return local_file_path.relative_to(self.root_dir).as_posix()
+
+    def local_sha1(self, local_file_path: Path) -> str:
+        """Return the SHA-1 of a local file, re-hashing only if it changed.
+
+        A file whose size and mtime match the manifest is assumed unchanged.
+
+        Args:
+            local_file_path: Path to the local file
+
+        Returns:
+            str: Hex SHA-1 digest of the file
+        """
+        stat = local_file_path.stat()
+        key = self._key(local_file_path)
+        with self._lock:
+            entry = self._entries.get(key)
+        if (
+            entry
+            and entry.get("size") == stat.st_size
+            and entry.get("mtime_ns") == stat.st_mtime_ns
+        ):
+            return entry["sha1"]
+
+        sha1 = file_sha1(local_file_path)
+        with self._lock:
+            self._entries[key] = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "sha1": sha1,
+                "id": (entry or {}).get("id"),
+            }
+        return sha1
+
+    def record(self, local_file_path: Path, file_id: str) -> None:
+        """Record the Box file ID a local file was synced to.
+
+        Args:
+            local_file_path: Path to the local file, hashed with `local_sha1`
+            file_id: ID of the Box file holding the same content
+        """
+        with self._lock:
+            entry = self._entries.get(self._key(local_file_path))
+            if entry is not None:
+                entry["id"] = file_id
+
+    def get(self, local_file_path: Path) -> Optional[Dict[str, Any]]:
+        """Return the manifest entry for a local file, if any."""
+        with self._lock:
+            return self._entries.get(self._key(local_file_path))
+
+    def save(self) -> None:
+        """Persist the manifest atomically."""
+        tmp_file = self.manifest_file.with_suffix(".tmp")
+        with self._lock:
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_file, self.manifest_file)
+        logger.info("Sync manifest saved to: %s", self.manifest_file)
@@ -0,0 +1,165 @@
+"""Multi-process-safe storage for Box CCG access tokens.
+
+Several worker processes share one CCG application. Without coordination
+each of them requests its own access token and they race on the token
+file. Here the token is cached in memory and shared between processes
+through a JSON file that is written atomically. Token refreshes are
+serialized with an exclusive file lock: the first process refreshes, and
+the others re-read the file under the lock and reuse the new token.
+
+Tokens are refreshed proactively, `refresh_margin_seconds` before they
+expire, instead of waiting for a 401 from Box.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+from box_sdk_gen import AccessToken, BoxCCGAuth, NetworkSession
+from box_sdk_gen.box.token_storage import TokenStorage
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+
+class SharedFileTokenStorage(TokenStorage):
+    """Token storage with an in-memory cache and a file shared by processes."""
+
+    def __init__(self, token_file: Path, refresh_margin_seconds: float = 300.0) -> None:
+        """Create the storage, the token file is created on first store.
+
+        Args:
+            token_file: JSON file shared by every process
+            refresh_margin_seconds: Consider a token expired this many seconds
+                before its actual expiry, so it is refreshed ahead of time
+        """
+        self.token_file = token_file
+        self.lock_file = token_file.with_name(token_file.name + ".lock")
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self._cached: Optional[Tuple[AccessToken, float]] = None
+        self._thread_lock = threading.RLock()
+
+    def _is_fresh(self, expires_at: float) -> bool:
+        return expires_at - self.refresh_margin_seconds > time.time()
+
+    @property
+    def cached_token(self) -> Optional[AccessToken]:
+        """Token held in memory, fresh or not."""
+        return self._cached[0] if self._cached else None
+
+    @contextmanager
+    def refresh_lock(self) -> Iterator[None]:
+        """Hold the exclusive refresh lock, across threads and processes."""
+        with self._thread_lock:
+            if fcntl is None:
+                yield
+                return
+            self.lock_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.lock_file, "a") as lock_stream:
+                fcntl.flock(lock_stream, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_stream, fcntl.LOCK_UN)
+
+    def load(self) -> Optional[AccessToken]:
+        """Read the shared file and cache its token if it is still fresh.
+
+        Returns:
+            The shared token, or None if missing, unreadable or about to expire
+        """
+        try:
+            with open(self.token_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            token = AccessToken.from_dict(data["token"])
+            expires_at = float(data["expires_at"])
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning("Ignoring unreadable token file %s: %s", self.token_file, e)
+            return None
+
+        if not self._is_fresh(expires_at):
+            return None
+        with self._thread_lock:
+            self._cached = (token, expires_at)
+        return token
+
+    def get(self) -> Optional[AccessToken]:
+        """Return a fresh token from memory, then from the shared file."""
+        with self._thread_lock:
+            cached = self._cached
+        if cached and self._is_fresh(cached[1]):
+            return cached[0]
+        return self.load()
+
+    def store(self, token: AccessToken) -> None:
+        """Cache a new token and share it through an atomic file replace."""
+        expires_at = time.time() + (token.expires_in or 0)
+        payload = {"token": token.to_dict(), "expires_at": expires_at}
+        self.token_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.token_file.with_name(
+            f"{self.token_file.name}.{os.getpid()}.tmp"
+        )
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+        os.chmod(tmp_file, 0o600)
+        os.replace(tmp_file, self.token_file)
+        with self._thread_lock:
+            self._cached = (token, expires_at)
+        logger.debug("Stored Box access token expiring in %ss", token.expires_in)
+
+    def clear(self) -> None:
+        """Forget the token, in memory and in the shared file."""
+        with self._thread_lock:
+            self._cached = None
+        self.token_file.unlink(missing_ok=True)
+
+
+class SharedBoxCCGAuth(BoxCCGAuth):
+    """CCG authentication where a single process refreshes the shared token."""
+
+    token_storage: SharedFileTokenStorage
+
+    def retrieve_token(
+        self, *, network_session: Optional[NetworkSession] = None
+    ) -> AccessToken:
+        """Return the shared token, refreshing it when missing or about to expire."""
+        token = self.token_storage.get()
+        if token is not None:
+            return token
+        return self.refresh_token(network_session=network_session)
+
+    def refresh_token(
+        self, *, network_session: Optional[NetworkSession] = None
+    ) -> AccessToken:
+        """Get a new access token, unless another process just did.
+
+        Box calls this after a 401 as well, so the token this process used
+        is compared with the shared one: a different, fresh shared token
+        means someone else already refreshed it.
+        """
+        used_token = self.token_storage.cached_token
+        with self.token_storage.refresh_lock():
+            shared_token = self.token_storage.load()
+            if shared_token is not None and (
+                used_token is None
+                or shared_token.access_token != used_token.access_token
+            ):
+                return shared_token
+
+            started = time.perf_counter()
+            token = super().refresh_token(network_session=network_session)
+            logger.info(
+                "Refreshed Box access token in %.2fs", time.perf_counter() - started
+            )
+            return token
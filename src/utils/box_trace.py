@@ -0,0 +1,331 @@
+"""Local span tracing of Box SDK calls.
+
+Every HTTP request the shared Box client sends (see `box_http.py`) is
+recorded as a span with its method, path, status and request/response
+bytes. The upload helpers of `box_api_generic.py` and the Box calls of the
+loan tools open parent spans, so a trace shows for example how much of
+`local_file_upload` went to the preflight check and how much to the
+upload itself. Spans nest through a context variable, which the Box
+executor and `with_trace_context` carry over to worker threads.
+
+Tracing is off unless `BOX_TRACE_ENABLED` is set. The spans are kept in a
+bounded in-memory buffer and written on exit to a local file, in the
+Chrome trace event format (chrome://tracing, https://ui.perfetto.dev) or as
+OTLP/JSON (Jaeger, or any OpenTelemetry tool). No collector is needed.
+"""
+
+import atexit
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, TypeVar
+
+from app_config import conf
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+TRACE_FORMATS = ("chrome", "otlp")
+
+# OTLP span kinds
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CLIENT = 3
+
+SERVICE_NAME = "langchain-box-loan-demo"
+
+_current_span: contextvars.ContextVar[Optional[Dict[str, Any]]] = (
+    contextvars.ContextVar("box_trace_current_span", default=None)
+)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    """Encode an attribute value as an OTLP/JSON AnyValue."""
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class SpanRecorder:
+    """Thread-safe recorder of nested spans, exported to a local trace file."""
+
+    def __init__(self, enabled: bool = False, max_spans: int = 100_000) -> None:
+        """Create the recorder.
+
+        Args:
+            enabled: Record spans; when False, `span` costs a single check
+            max_spans: Spans kept in memory, the oldest are dropped first
+        """
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._spans: Deque[Dict[str, Any]] = deque(maxlen=max_spans)
+
+    def __len__(self) -> int:
+        return len(self._spans)
+
+    @contextmanager
+    def span(
+        self, name: str, kind: int = SPAN_KIND_INTERNAL, **attributes: Any
+    ) -> Iterator[Dict[str, Any]]:
+        """Record the enclosed block as a child of the current span.
+
+        Args:
+            name: Name of the span, e.g. "box_file_upload"
+            kind: OTLP span kind, `SPAN_KIND_CLIENT` for HTTP requests
+            **attributes: Initial attributes of the span
+
+        Yields:
+            The attributes of the span, to add results such as a status code
+        """
+        if not self.enabled:
+            yield attributes
+            return
+
+        parent = _current_span.get()
+        record: Dict[str, Any] = {
+            "name": name,
+            "kind": kind,
+            "trace_id": parent["trace_id"] if parent else os.urandom(16).hex(),
+            "span_id": os.urandom(8).hex(),
+            "parent_id": parent["span_id"] if parent else None,
+            "start_ns": time.time_ns(),
+            "thread_id": threading.get_native_id(),
+            "thread_name": threading.current_thread().name,
+            "attributes": attributes,
+            "error": None,
+        }
+        token = _current_span.set(record)
+        started = time.perf_counter_ns()
+        try:
+            yield attributes
+        except BaseException as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            record["duration_ns"] = time.perf_counter_ns() - started
+            _current_span.reset(token)
+            with self._lock:
+                self._spans.append(record)
+
+    def spans(self) -> List[Dict[str, Any]]:
+        """Return the finished spans, in the order they ended."""
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self) -> None:
+        """Drop every recorded span."""
+        with self._lock:
+            self._spans.clear()
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """Export the spans as Chrome trace events (one lane per thread)."""
+        pid = os.getpid()
+        events: List[Dict[str, Any]] = []
+        threads: Dict[int, str] = {}
+        for record in self.spans():
+            threads[record["thread_id"]] = record["thread_name"]
+            args = {
+                **record["attributes"],
+                "span_id": record["span_id"],
+                "parent_id": record["parent_id"],
+            }
+            if record["error"]:
+                args["error"] = record["error"]
+            events.append(
+                {
+                    "name": record["name"],
+                    "cat": "http" if record["kind"] == SPAN_KIND_CLIENT else "box",
+                    "ph": "X",
+                    "ts": record["start_ns"] / 1000,
+                    "dur": record["duration_ns"] / 1000,
+                    "pid": pid,
+                    "tid": record["thread_id"],
+                    "args": args,
+                }
+            )
+        events.sort(key=lambda event: event["ts"])
+        metadata = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": thread_id,
+                "args": {"name": thread_name},
+            }
+            for thread_id, thread_name in threads.items()
+        ]
+        return {"traceEvents": metadata + events, "displayTimeUnit": "ms"}
+
+    def to_otlp_json(self) -> Dict[str, Any]:
+        """Export the spans as an OTLP/JSON `ExportTraceServiceRequest`."""
+        otlp_spans = []
+        for record in self.spans():
+            # Exceptions, and HTTP responses with an error status
+            error = record["error"] or record["attributes"].get("error.type")
+            span: Dict[str, Any] = {
+                "traceId": record["trace_id"],
+                "spanId": record["span_id"],
+                "name": record["name"],
+                "kind": record["kind"],
+                "startTimeUnixNano": str(record["start_ns"]),
+                "endTimeUnixNano": str(record["start_ns"] + record["duration_ns"]),
+                "attributes": [
+                    {"key": key, "value": _otlp_value(value)}
+                    for key, value in {
+                        **record["attributes"],
+                        "thread.id": record["thread_id"],
+                        "thread.name": record["thread_name"],
+                    }.items()
+                    if value is not None
+                ],
+                "status": {"code": 2, "message": str(error)} if error else {"code": 1},
+            }
+            if record["parent_id"]:
+                span["parentSpanId"] = record["parent_id"]
+            otlp_spans.append(span)
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {
+                                "key": "service.name",
+                                "value": {"stringValue": SERVICE_NAME},
+                            },
+                            {
+                                "key": "process.pid",
+                                "value": {"intValue": str(os.getpid())},
+                            },
+                        ]
+                    },
+                    "scopeSpans": [{"scope": {"name": __name__}, "spans": otlp_spans}],
+                }
+            ]
+        }
+
+    def write(self, trace_file: Path, trace_format: str = "chrome") -> int:
+        """Write the recorded spans to a trace file atomically.
+
+        Args:
+            trace_file: Destination JSON file
+            trace_format: "chrome" (trace event format) or "otlp" (OTLP/JSON)
+
+        Returns:
+            int: Number of spans written
+
+        Raises:
+            ValueError: If the format is not supported
+        """
+        if trace_format not in TRACE_FORMATS:
+            raise ValueError(
+                f"Unsupported trace format '{trace_format}', use one of {TRACE_FORMATS}"
+            )
+        trace = (
+            self.to_chrome_trace() if trace_format == "chrome" else self.to_otlp_json()
+        )
+        trace_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = trace_file.with_suffix(".tmp")
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(trace, f)
+        os.replace(tmp_file, trace_file)
+        return len(self)
+
+
+def traced(name: Optional[str] = None) -> Callable[[F], F]:
+    """Decorate a function to record each call as a span.
+
+    Args:
+        name: Span name (default: the function name)
+    """
+
+    def decorator(func: F) -> F:
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not box_tracer.enabled:
+                return func(*args, **kwargs)
+            with box_tracer.span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def add_span_attributes(**attributes: Any) -> None:
+    """Add attributes to the current span, if any."""
+    record = _current_span.get()
+    if record is not None:
+        record["attributes"].update(attributes)
+
+
+def with_trace_context(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Bind a function to the current span, to run it in other threads.
+
+    Thread pools do not propagate context variables: pass
+    `with_trace_context(func)` to `executor.submit` or `executor.map` so
+    the spans of the worker threads nest under the current span.
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def run(*args: Any, **kwargs: Any) -> Any:
+        # One copy per call, a context cannot be entered by two threads
+        return context.copy().run(func, *args, **kwargs)
+
+    return run
+
+
+def box_trace_file(name_suffix: str = "") -> Optional[Path]:
+    """Return the configured trace file, relative to the agents memories folder.
+
+    Args:
+        name_suffix: Appended to the file name, e.g. to separate processes
+    """
+    trace_file = Path(conf.BOX_TRACE_FILE)
+    if not trace_file.is_absolute():
+        if not conf.local_agents_memory:
+            return None
+        trace_file = conf.local_agents_memory / trace_file
+    return trace_file.with_stem(trace_file.stem + name_suffix)
+
+
+def write_box_trace(name_suffix: str = "") -> Optional[Path]:
+    """Write the spans of this process to the configured trace file.
+
+    Args:
+        name_suffix: Appended to the file name, e.g. to separate processes
+
+    Returns:
+        The trace file, or None if nothing was recorded
+    """
+    trace_file = box_trace_file(name_suffix)
+    if not box_tracer.enabled or not len(box_tracer) or trace_file is None:
+        return None
+    try:
+        count = box_tracer.write(trace_file, conf.BOX_TRACE_FORMAT)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Failed to write the Box trace: {str(e)}")
+        return None
+    logger.info("Box trace of %d spans written to: %s", count, trace_file)
+    return trace_file
+
+
+# Process-wide recorder of the Box calls
+box_tracer = SpanRecorder(
+    enabled=conf.BOX_TRACE_ENABLED, max_spans=conf.BOX_TRACE_MAX_SPANS
+)
+
+atexit.register(write_box_trace)
@@ -0,0 +1,270 @@
+"""Durable, multi-process job queue backed by SQLite.
+
+Jobs are leased for a limited time. The worker holding a lease renews it
+with heartbeats while it works. If the worker dies, the lease expires and
+the job is handed to another worker. Failed jobs are retried with
+exponential backoff until `max_attempts` is reached.
+
+Job lifecycle: pending -> leased -> done | pending (retry) | failed
+"""
+
+import json
+import logging
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """SQLite job queue with lease, heartbeat and retry semantics."""
+
+    def __init__(
+        self,
+        db_path: Path,
+        lease_seconds: float = 300.0,
+        max_attempts: int = 3,
+        retry_base_seconds: float = 30.0,
+    ) -> None:
+        """Open the queue, creating the database on first use.
+
+        Args:
+            db_path: Path to the SQLite database file
+            lease_seconds: Time a job stays leased without a heartbeat
+            max_attempts: Attempts before a job is marked as failed
+            retry_base_seconds: Delay before the first retry, doubled each attempt
+        """
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        with closing(self._connect()) as db, db:
+            db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    applicant_name TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    priority INTEGER NOT NULL DEFAULT 0,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    available_at REAL NOT NULL,
+                    lease_owner TEXT,
+                    lease_expires_at REAL,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_ready "
+                "ON jobs (status, priority, available_at)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection; transactions are started explicitly."""
+        db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    def enqueue(
+        self,
+        applicant_name: str,
+        payload: Optional[Dict[str, Any]] = None,
+        priority: int = 0,
+    ) -> int:
+        """Add a loan application to the queue.
+
+        Args:
+            applicant_name: Name of the loan applicant
+            payload: Extra JSON-serializable data for the worker
+            priority: Lower values are leased first
+
+        Returns:
+            int: ID of the new job
+        """
+        now = time.time()
+        with closing(self._connect()) as db:
+            cursor = db.execute(
+                "INSERT INTO jobs (applicant_name, payload, priority, available_at, "
+                "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (applicant_name, json.dumps(payload or {}), priority, now, now, now),
+            )
+        logger.info("Enqueued job %d for %s", cursor.lastrowid, applicant_name)
+        return cursor.lastrowid  # type: ignore[return-value]
+
+    def lease(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Lease the next ready job.
+
+        Pending jobs whose retry delay passed and leased jobs whose lease
+        expired (their worker stopped sending heartbeats) are both ready.
+        An expired job that already used all its attempts is marked failed.
+
+        Args:
+            worker_id: Identifier of the worker taking the lease
+
+        Returns:
+            The job as a dictionary, or None if no job is ready
+        """
+        now = time.time()
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                abandoned = db.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? "
+                    "WHERE status = 'leased' AND lease_expires_at < ? "
+                    "AND attempts >= ?",
+                    ("Lease expired on the last attempt", now, now, self.max_attempts),
+                ).rowcount
+                if abandoned:
+                    logger.warning("Marked %d abandoned job(s) as failed", abandoned)
+
+                row = db.execute(
+                    "SELECT * FROM jobs WHERE (status = 'pending' AND available_at <= ?) "
+                    "OR (status = 'leased' AND lease_expires_at < ?) "
+                    "ORDER BY priority, id LIMIT 1",
+                    (now, now),
+                ).fetchone()
+                if row is None:
+                    db.execute("COMMIT")
+                    return None
+                if row["status"] == "leased":
+                    logger.warning(
+                        "Re-leasing job %d abandoned by %s",
+                        row["id"],
+                        row["lease_owner"],
+                    )
+                db.execute(
+                    "UPDATE jobs SET status = 'leased', lease_owner = ?, "
+                    "lease_expires_at = ?, attempts = attempts + 1, updated_at = ? "
+                    "WHERE id = ?",
+                    (worker_id, now + self.lease_seconds, now, row["id"]),
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["attempts"] += 1
+        job["status"] = "leased"
+        job["lease_owner"] = worker_id
+        return job
+
+    def heartbeat(self, job_id: int, worker_id: str) -> bool:
+        """Extend the lease of a job still being worked on.
+
+        Args:
+            job_id: ID of the leased job
+            worker_id: Worker holding the lease
+
+        Returns:
+            bool: False if the lease was lost (expired and taken by another worker)
+        """
+        now = time.time()
+        with closing(self._connect()) as db:
+            updated = db.execute(
+                "UPDATE jobs SET lease_expires_at = ?, updated_at = ? "
+                "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (now + self.lease_seconds, now, job_id, worker_id),
+            ).rowcount
+        return bool(updated)
+
+    def complete(self, job_id: int, worker_id: str, result: Dict[str, Any]) -> bool:
+        """Mark a leased job as done.
+
+        Args:
+            job_id: ID of the leased job
+            worker_id: Worker holding the lease
+            result: JSON-serializable outcome of the job
+
+        Returns:
+            bool: False if the lease was lost in the meantime
+        """
+        with closing(self._connect()) as db:
+            updated = db.execute(
+                "UPDATE jobs SET status = 'done', result = ?, error = NULL, "
+                "lease_owner = NULL, lease_expires_at = NULL, updated_at = ? "
+                "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (json.dumps(result, default=str), time.time(), job_id, worker_id),
+            ).rowcount
+        return bool(updated)
+
+    def fail(self, job_id: int, worker_id: str, error: str) -> bool:
+        """Record a failed attempt, scheduling a retry if attempts remain.
+
+        Args:
+            job_id: ID of the leased job
+            worker_id: Worker holding the lease
+            error: Error message of the attempt
+
+        Returns:
+            bool: False if the lease was lost in the meantime
+        """
+        now = time.time()
+        with closing(self._connect()) as db:
+            # Read the attempts and update in one transaction, so a lease
+            # taken over in between is not reset
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute(
+                    "SELECT attempts FROM jobs WHERE id = ? AND status = 'leased' "
+                    "AND lease_owner = ?",
+                    (job_id, worker_id),
+                ).fetchone()
+                if row is None:
+                    db.execute("COMMIT")
+                    return False
+                attempts = row["attempts"]
+                if attempts >= self.max_attempts:
+                    status, available_at = "failed", now
+                else:
+                    status = "pending"
+                    available_at = now + self.retry_base_seconds * 2 ** (attempts - 1)
+                db.execute(
+                    "UPDATE jobs SET status = ?, error = ?, available_at = ?, "
+                    "lease_owner = NULL, lease_expires_at = NULL, updated_at = ? "
+                    "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                    (status, error, available_at, now, job_id, worker_id),
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        logger.warning(
+            "Job %d attempt %d/%d failed (%s): %s",
+            job_id,
+            attempts,
+            self.max_attempts,
+            status,
+            error,
+        )
+        return True
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """Return a job by ID, or None if it does not exist."""
+        with closing(self._connect()) as db:
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of jobs per status."""
+        with closing(self._connect()) as db:
+            rows = db.execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+            ).fetchall()
+        counts = {"pending": 0, "leased": 0, "done": 0, "failed": 0}
+        counts.update({status: count for status, count in rows})
+        return counts
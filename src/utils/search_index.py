@@ -0,0 +1,308 @@
+"""Local BM25 full-text index over document passages.
+
+Documents are split into passages (a markdown section, or a few paragraphs
+of plain text) and indexed in an in-memory inverted index. Each document
+carries a version (its SHA-1), so updating an unchanged document is a
+no-op and a changed document only re-indexes its own passages. The
+passages and versions are persisted to a JSON file, and the inverted index
+is rebuilt from them on load.
+"""
+
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+INDEX_FORMAT_VERSION = 1
+
+# BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Target size of plain text passages, in characters
+PASSAGE_CHARS = 800
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can do for from has have how i if in is it its "
+    "of on or per should than that the their this to was what when where which "
+    "who will with within".split()
+)
+_TOKEN = re.compile(r"[a-z0-9]+(?:[.,][0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, split and normalize text into index terms.
+
+    Stopwords are dropped, "%", "$" and thousands separators are removed
+    (so "$5,000" matches "5000") and plurals are reduced to their singular ("bankruptcies" -> "bankruptcy").
+    """
+    terms = []
+    for token in _TOKEN.findall(text.lower()):
+        token = token.replace(",", "")
+        if token in STOPWORDS:
+            continue
+        if len(token) > 4 and token.endswith("ies"):
+            token = token[:-3] + "y"
+        elif len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        terms.append(token)
+    return terms
+
+
+def split_markdown_passages(text: str) -> List[Dict[str, str]]:
+    """Split markdown into one passage per section.
+
+    Args:
+        text: Markdown content
+
+    Returns:
+        Passages with "title" (heading path, e.g. "Standards > Credit") and "text"
+    """
+    passages: List[Dict[str, str]] = []
+    headings: List[str] = []
+    lines: List[str] = []
+
+    def flush() -> None:
+        body = "\n".join(lines).strip()
+        if body:
+            passages.append({"title": " > ".join(headings), "text": body})
+        lines.clear()
+
+    for line in text.splitlines():
+        match = re.match(r"(#{1,6})\s+(.+)", line)
+        if match:
+            flush()
+            level = len(match.group(1))
+            headings[level - 1 :] = [match.group(2).strip()]
+            continue
+        lines.append(line)
+    flush()
+    return passages
+
+
+def split_text_passages(
+    text: str, title: str = "", max_chars: int = PASSAGE_CHARS
+) -> List[Dict[str, str]]:
+    """Split plain text into passages of whole paragraphs.
+
+    Args:
+        text: Plain text content
+        title: Title given to every passage
+        max_chars: Target passage size, a longer paragraph stays whole
+
+    Returns:
+        Passages with "title" and "text"
+    """
+    passages: List[Dict[str, str]] = []
+    chunk: List[str] = []
+    size = 0
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if chunk and size + len(paragraph) > max_chars:
+            passages.append({"title": title, "text": "\n\n".join(chunk)})
+            chunk, size = [], 0
+        chunk.append(paragraph)
+        size += len(paragraph)
+    if chunk:
+        passages.append({"title": title, "text": "\n\n".join(chunk)})
+    return passages
+
+
+class BM25Index:
+    """Incrementally updated BM25 index, persisted to a JSON file."""
+
+    def __init__(self, index_file: Optional[Path] = None) -> None:
+        """Load the index if the file exists.
+
+        Args:
+            index_file: JSON file the documents and passages are persisted to
+        """
+        self.index_file = index_file
+        self._lock = threading.RLock()
+        # source -> {"version", "metadata", "passages": [{"title", "text"}]}
+        self._documents: Dict[str, Dict[str, Any]] = {}
+        # passage key -> (source, position, term counts, length)
+        self._passages: Dict[str, Dict[str, Any]] = {}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._total_length = 0
+        self._dirty = False
+        if index_file is not None and index_file.exists():
+            try:
+                with open(index_file, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("format") == INDEX_FORMAT_VERSION:
+                    for source, document in data["documents"].items():
+                        self._add(source, document)
+                    logger.debug(
+                        "Loaded search index with %d documents, %d passages",
+                        len(self._documents),
+                        len(self._passages),
+                    )
+            except (ValueError, KeyError) as e:
+                logger.warning("Ignoring unreadable search index %s: %s", index_file, e)
+
+    def __len__(self) -> int:
+        return len(self._passages)
+
+    def _add(self, source: str, document: Dict[str, Any]) -> None:
+        self._documents[source] = document
+        for position, passage in enumerate(document["passages"]):
+            key = f"{source}#{position}"
+            counts = Counter(tokenize(f"{passage['title']}\n{passage['text']}"))
+            length = sum(counts.values())
+            self._passages[key] = {
+                "source": source,
+                "position": position,
+                "counts": counts,
+                "length": length,
+            }
+            self._total_length += length
+            for term, count in counts.items():
+                self._postings.setdefault(term, {})[key] = count
+
+    def _remove(self, source: str) -> None:
+        document = self._documents.pop(source, None)
+        if document is None:
+            return
+        for position in range(len(document["passages"])):
+            passage = self._passages.pop(f"{source}#{position}")
+            self._total_length -= passage["length"]
+            for term in passage["counts"]:
+                postings = self._postings[term]
+                postings.pop(f"{source}#{position}", None)
+                if not postings:
+                    del self._postings[term]
+
+    def version(self, source: str) -> Optional[str]:
+        """Return the indexed version of a document, or None if not indexed."""
+        with self._lock:
+            document = self._documents.get(source)
+        return document["version"] if document else None
+
+    def sources(self) -> List[str]:
+        """Return the indexed document sources."""
+        with self._lock:
+            return list(self._documents)
+
+    def update_document(
+        self,
+        source: str,
+        version: str,
+        passages: List[Dict[str, str]],
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        """Index a document, replacing its previous version.
+
+        Args:
+            source: Unique document name, returned with search results
+            version: Content version, e.g. the SHA-1 of the file
+            passages: Passages of the document ("title" and "text")
+            metadata: Extra JSON-serializable data returned with results
+
+        Returns:
+            bool: False if this version was already indexed
+        """
+        with self._lock:
+            if self.version(source) == version:
+                return False
+            self._remove(source)
+            self._add(
+                source,
+                {"version": version, "metadata": metadata or {}, "passages": passages},
+            )
+            self._dirty = True
+        logger.info("Indexed %d passages of %s", len(passages), source)
+        return True
+
+    def remove_document(self, source: str) -> None:
+        """Remove a document from the index."""
+        with self._lock:
+            if source in self._documents:
+                self._remove(source)
+                self._dirty = True
+
+    def search(
+        self, query: str, max_results: int = 5, source_prefix: str = ""
+    ) -> List[Dict[str, Any]]:
+        """Rank passages by BM25 score.
+
+        Args:
+            query: Free-text query
+            max_results: Maximum number of passages returned
+            source_prefix: Only return passages of the sources starting with it
+
+        Returns:
+            Passages with "source", "title", "text", "score", "metadata"
+            and "coverage" (share of the query terms found in the passage),
+            best first
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            count = len(self._passages)
+            if not terms or not count:
+                return []
+            average_length = self._total_length / count
+            scores: Dict[str, float] = {}
+            matched: Dict[str, int] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(
+                    1 + (count - len(postings) + 0.5) / (len(postings) + 0.5)
+                )
+                for key, frequency in postings.items():
+                    if source_prefix and not key.startswith(source_prefix):
+                        continue
+                    length = self._passages[key]["length"]
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+                    scores[key] = scores.get(key, 0.0) + idf * frequency * (
+                        BM25_K1 + 1
+                    ) / (frequency + norm)
+                    matched[key] = matched.get(key, 0) + 1
+
+            results = []
+            for key in sorted(scores, key=scores.__getitem__, reverse=True)[
+                :max_results
+            ]:
+                passage = self._passages[key]
+                document = self._documents[passage["source"]]
+                content = document["passages"][passage["position"]]
+                results.append(
+                    {
+                        "source": passage["source"],
+                        "title": content["title"],
+                        "text": content["text"],
+                        "score": round(scores[key], 3),
+                        "coverage": round(matched[key] / len(terms), 3),
+                        "metadata": document["metadata"],
+                    }
+                )
+        return results
+
+    def save(self) -> None:
+        """Persist the index atomically, if it changed since the last save."""
+        if self.index_file is None:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            tmp_file = self.index_file.with_suffix(".tmp")
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"format": INDEX_FORMAT_VERSION, "documents": self._documents},
+                    f,
+                    ensure_ascii=False,
+                )
+            os.replace(tmp_file, self.index_file)
+            self._dirty = False
+        logger.debug("Search index saved to: %s", self.index_file)
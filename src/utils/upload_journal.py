@@ -0,0 +1,157 @@
+"""Crash-resumable journal for folder uploads.
+
+Every file uploaded and every folder created is appended to a JSONL
+journal as soon as it completes. After a crash, replaying the journal
+tells which items are already in Box, so a resumed upload skips them
+instead of starting over. At the end of a successful run the journal is
+compacted into the regular upload cache JSON file and removed.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class UploadJournal:
+    """Append-only JSONL record of completed upload items.
+
+    Each line holds one completed item, keyed by its path relative to
+    `root_dir`:
+    {"path": str, "name": str, "type": "file"|"folder", "id": str,
+     "size": int, "mtime_ns": int, "completed_at": float}
+    """
+
+    def __init__(self, journal_file: Path, root_dir: Path, resume: bool = True) -> None:
+        """Open the journal, replaying it when resuming.
+
+        Args:
+            journal_file: JSONL file the journal is appended to
+            root_dir: Local directory the journal paths are relative to
+            resume: Replay an existing journal; otherwise start a new one
+        """
+        self.journal_file = journal_file
+        self.root_dir = root_dir
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        if resume:
+            self._replay()
+        elif journal_file.exists():
+            journal_file.unlink()
+        self._stream = open(journal_file, "a", encoding="utf-8")
+
+    def _key(self, local_path: Path) -> str:
+        return local_path.relative_to(self.root_dir).as_posix()
+
+    def _replay(self) -> None:
+        """Load the completed items of a previous run.
+
+        A last line without newline, left by a crash mid-write, is cut off
+        the file, so the next record does not get appended to it.
+        """
+        if not self.journal_file.exists():
+            return
+        data = self.journal_file.read_bytes()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            logger.warning(
+                "Dropping incomplete last journal line in %s", self.journal_file
+            )
+            os.truncate(self.journal_file, end)
+        lines = data[:end].decode("utf-8").splitlines()
+        for line_number, line in enumerate(lines, start=1):
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(
+                    "Ignoring unreadable journal line %d in %s",
+                    line_number,
+                    self.journal_file,
+                )
+                continue
+            self._entries[entry["path"]] = entry
+        logger.info(
+            "Resuming upload: %d items already completed according to %s",
+            len(self._entries),
+            self.journal_file,
+        )
+
+    def completed(self, local_path: Path) -> Optional[Dict[str, Any]]:
+        """Return the journal entry of an item finished by a previous run.
+
+        A file modified since it was uploaded is not considered finished.
+
+        Args:
+            local_path: Local file or directory
+
+        Returns:
+            The journal entry, or None if the item must be (re)processed
+        """
+        with self._lock:
+            entry = self._entries.get(self._key(local_path))
+        if entry is None or entry["type"] == "folder":
+            return entry
+        stat = local_path.stat()
+        if (
+            entry.get("size") == stat.st_size
+            and entry.get("mtime_ns") == stat.st_mtime_ns
+        ):
+            return entry
+        return None
+
+    def record(self, local_path: Path, item_type: str, item_id: str) -> None:
+        """Append a completed item to the journal.
+
+        The line is flushed immediately, so it survives a crash of the process.
+
+        Args:
+            local_path: Local file or directory
+            item_type: "file" or "folder"
+            item_id: ID of the Box item
+        """
+        entry: Dict[str, Any] = {
+            "path": self._key(local_path),
+            "name": local_path.name,
+            "type": item_type,
+            "id": item_id,
+            "completed_at": time.time(),
+        }
+        if item_type == "file":
+            stat = local_path.stat()
+            entry["size"] = stat.st_size
+            entry["mtime_ns"] = stat.st_mtime_ns
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._entries[entry["path"]] = entry
+            self._stream.write(line)
+            self._stream.flush()
+
+    def close(self) -> None:
+        """Flush the journal to disk and close it."""
+        with self._lock:
+            if not self._stream.closed:
+                self._stream.flush()
+                os.fsync(self._stream.fileno())
+                self._stream.close()
+
+    def compact(
+        self, folder_cache: Dict[str, Dict[str, str]], output_file: Path
+    ) -> None:
+        """Write the final upload cache and remove the journal.
+
+        Args:
+            folder_cache: Dictionary mapping local paths to Box item metadata
+            output_file: Path to the upload cache JSON file to write
+        """
+        self.close()
+        tmp_file = output_file.with_suffix(".tmp")
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(folder_cache, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_file, output_file)
+        self.journal_file.unlink(missing_ok=True)
+        logger.info("Upload journal compacted into: %s", output_file)
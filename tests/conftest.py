@@ -0,0 +1,20 @@
+"""Test configuration: placeholder settings, so modules import without a `.env`."""
+
+import os
+import tempfile
+
+for name in (
+    "BOX_CLIENT_ID",
+    "BOX_CLIENT_SECRET",
+    "BOX_SUBJECT_ID",
+    "BOX_DEMO_PARENT_FOLDER",
+    "BOX_DEMO_FOLDER_NAME",
+    "TAVILY_API_KEY",
+    "ANTHROPIC_API_KEY",
+):
+    os.environ.setdefault(name, "test")
+os.environ.setdefault("BOX_SUBJECT_TYPE", "enterprise")
+# Keep the agent memories (caches, journals, traces) out of the project folder
+os.environ.setdefault(
+    "AGENTS_MEMORY_FOLDER", tempfile.mkdtemp(prefix="agents_memories_")
+)
@@ -0,0 +1,35 @@
+"""Tests of the SQLite job queue."""
+
+import time
+
+from utils.job_queue import JobQueue
+
+
+def test_fail_schedules_retry_then_fails(tmp_path):
+    queue = JobQueue(tmp_path / "jobs.sqlite", max_attempts=2, retry_base_seconds=0)
+    job_id = queue.enqueue("Applicant")
+
+    assert queue.lease("w1")["id"] == job_id
+    assert queue.fail(job_id, "w1", "boom")
+    assert queue.get(job_id)["status"] == "pending"
+
+    assert queue.lease("w1")["id"] == job_id
+    assert queue.fail(job_id, "w1", "boom again")
+    job = queue.get(job_id)
+    assert job["status"] == "failed"
+    assert job["error"] == "boom again"
+
+
+def test_fail_after_lost_lease_keeps_new_lease(tmp_path):
+    queue = JobQueue(tmp_path / "jobs.sqlite", lease_seconds=0.01)
+    job_id = queue.enqueue("Applicant")
+    assert queue.lease("w1")["id"] == job_id
+    time.sleep(0.02)
+    queue.lease_seconds = 300
+    assert queue.lease("w2")["id"] == job_id
+
+    assert not queue.fail(job_id, "w1", "stale worker")
+    job = queue.get(job_id)
+    assert job["status"] == "leased"
+    assert job["lease_owner"] == "w2"
+    assert job["error"] is None
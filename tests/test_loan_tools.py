@@ -0,0 +1,71 @@
+"""Tests of the per-document field routing of the extraction tool."""
+
+from agents.loan_underwriting import loan_tools
+
+FILES = [
+    {"id": "1", "name": "credit_report.pdf"},
+    {"id": "2", "name": "pay_stub.pdf"},
+    {"id": "3", "name": "purchase_agreement.pdf"},
+    {"id": "4", "name": "vehicle_info.pdf"},
+    {"id": "5", "name": "vehicle_valuation.pdf"},
+    {"id": "6", "name": "drivers_license.pdf"},
+]
+
+
+def _routes(keys):
+    groups = loan_tools._route_fields_by_document_type(
+        FILES, [{"key": key} for key in keys]
+    )
+    return {
+        field["key"]: document_type
+        for document_type, (_, fields) in groups.items()
+        for field in fields
+    }
+
+
+def test_keywords_match_whole_words():
+    routes = _routes(
+        [
+            "appraised_value",
+            "years_at_address",
+            "driving_record",
+            "vehicle_year",
+            "apr",
+            "credit_score",
+            "gross_monthly_income",
+        ]
+    )
+    assert routes == {
+        "appraised_value": "vehicle_valuation",
+        "years_at_address": "drivers_license",
+        "driving_record": "all",
+        "vehicle_year": "vehicle_info",
+        "apr": "purchase_agreement",
+        "credit_score": "credit_report",
+        "gross_monthly_income": "pay_stub",
+    }
+
+
+def test_empty_routed_field_is_extracted_from_every_file(monkeypatch):
+    versions = {item["id"]: "v1" for item in FILES}
+    monkeypatch.setattr(loan_tools, "_list_folder_files", lambda _: (FILES, versions))
+    calls = []
+
+    def extract_fields(folder_id, file_versions, fields, use_cache):
+        keys = [field["key"] for field in fields]
+        calls.append((sorted(file_versions), keys))
+        if len(file_versions) == len(FILES):
+            return {key: f"{key} from all files" for key in keys}
+        return {key: 720 if key == "credit_score" else None for key in keys}
+
+    monkeypatch.setattr(loan_tools, "_extract_fields", extract_fields)
+    data, timings = loan_tools._extract_folder_data_by_document(
+        "123", [{"key": "credit_score"}, {"key": "vehicle_year"}]
+    )
+
+    assert data == {
+        "credit_score": 720,
+        "vehicle_year": "vehicle_year from all files",
+    }
+    assert calls[-1] == (sorted(versions), ["vehicle_year"])
+    assert timings["fallback"]["fields"] == 1
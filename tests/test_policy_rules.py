@@ -0,0 +1,88 @@
+"""Tests of the compiled policy rule table."""
+
+from pathlib import Path
+
+import pytest
+
+from agents.loan_underwriting.policy_rules import PolicyRuleTable
+
+POLICY_DIR = Path(__file__).parent.parent / "data" / "Policies"
+
+
+@pytest.fixture(scope="module")
+def table() -> PolicyRuleTable:
+    return PolicyRuleTable(policy_dir=POLICY_DIR)
+
+
+def _max_ltv(table: PolicyRuleTable, vehicle_type: str, vehicle_age: float) -> float:
+    thresholds = table.thresholds("ltv", vehicle_type, vehicle_age)
+    assert thresholds, f"No LTV limit for a {vehicle_type} vehicle of {vehicle_age}"
+    return thresholds[0]["high"]
+
+
+@pytest.mark.parametrize(
+    "vehicle_type, vehicle_age, expected",
+    [
+        ("used", 0, 1.15),
+        ("used", 3, 1.15),
+        ("used", 3.2, 1.15),
+        ("used", 3.99, 1.15),
+        ("used", 4, 1.10),
+        ("used", 7, 1.10),
+        ("used", 7.5, 1.10),
+        ("used", 8, 1.00),
+        ("used", 12, 1.00),
+        ("new", 0, 1.20),
+        ("new", 1, 1.20),
+        ("new", 9, 1.20),
+    ],
+)
+def test_ltv_limit_bands_are_contiguous(table, vehicle_type, vehicle_age, expected):
+    assert _max_ltv(table, vehicle_type, vehicle_age) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize(
+    "vehicle_type, vehicle_age, value, severity, authority",
+    [
+        ("used", 3.2, 0.90, "none", None),
+        ("used", 3.2, 1.15, "none", None),
+        ("used", 3.2, 1.18, "minor", "Manager Approval"),
+        ("used", 7.5, 1.18, "moderate", "Regional Director Approval"),
+        ("used", 7.5, 1.25, "major", "Automatic Denial"),
+        ("new", 1, 1.10, "none", None),
+        ("new", 1, 1.24, "minor", "Manager Approval"),
+    ],
+)
+def test_ltv_violation_between_bands(
+    table, vehicle_type, vehicle_age, value, severity, authority
+):
+    result = table.violation("ltv", value, vehicle_type, vehicle_age)
+    assert result["severity"] == severity
+    assert result["authority"] == authority
+    assert result["compliant"] is (severity == "none")
+
+
+def test_ltv_without_applicable_limit_is_unknown(table):
+    result = table.violation("ltv", 0.9, "used", -1)
+    assert result["threshold"] is None
+    assert result["compliant"] is None
+    assert result["severity"] == "unknown"
+    assert result["authority"] is None
+    assert result["note"]
+
+
+@pytest.mark.parametrize(
+    "months, compliant, severity",
+    [
+        (30, True, "none"),
+        (24, True, "none"),
+        (20, False, "minor"),
+        (18, False, "minor"),
+        (12, False, "unknown"),
+    ],
+)
+def test_employment_gap_below_violation_levels(table, months, compliant, severity):
+    result = table.violation("employment", months)
+    assert result["compliant"] is compliant
+    assert result["severity"] == severity
+    assert (result["note"] is not None) is (severity == "unknown")
@@ -0,0 +1,47 @@
+"""Tests of the vectorized risk engine."""
+
+import json
+from datetime import date
+
+import pytest
+
+from agents.loan_underwriting.loan_tools import compute_risk_metrics
+from agents.loan_underwriting.risk_engine import compute_risk_assessments
+
+AS_OF = date(2025, 6, 1)
+
+
+def _application(**overrides):
+    application = {
+        "monthly_income": 6000,
+        "monthly_debt": 500,
+        "credit_score": 720,
+        "loan_amount": 25000,
+        "vehicle_value": 30000,
+        "vehicle_year": 2023,
+        "proposed_payment": 450,
+    }
+    application.update(overrides)
+    return application
+
+
+def test_zero_vehicle_value_gives_unknown_ltv():
+    (assessment,) = compute_risk_assessments([_application(vehicle_value=0)], AS_OF)
+    ltv_rule = next(v for v in assessment["violations"] if v["rule"] == "LTV Maximum")
+    assert assessment["metrics"]["ltv"] is None
+    assert ltv_rule["actual"] is None
+    assert ltv_rule["severity"] == "unknown"
+
+
+@pytest.mark.parametrize("monthly_income", [0, -100])
+def test_non_positive_income_is_rejected(monthly_income):
+    with pytest.raises(ValueError, match="positive monthly_income"):
+        compute_risk_assessments([_application(monthly_income=monthly_income)], AS_OF)
+
+
+def test_tool_output_is_strict_json():
+    output = compute_risk_metrics.invoke(
+        {"applications_json": json.dumps(_application(vehicle_value=0))}
+    )
+    json.loads(output, parse_constant=pytest.fail)
+    assert "inf" not in output.lower()
@@ -0,0 +1,30 @@
+"""Tests of the crash-resumable upload journal."""
+
+from utils.upload_journal import UploadJournal
+
+
+def test_record_after_interrupted_write_survives_next_crash(tmp_path):
+    root_dir = tmp_path / "docs"
+    root_dir.mkdir()
+    for name in ("a.pdf", "b.pdf", "c.pdf"):
+        (root_dir / name).write_bytes(b"pdf")
+    journal_file = tmp_path / "upload.journal.jsonl"
+
+    journal = UploadJournal(journal_file, root_dir)
+    journal.record(root_dir / "a.pdf", "file", "1")
+    journal.close()
+    # Crash in the middle of writing the record of b.pdf
+    with open(journal_file, "a", encoding="utf-8") as f:
+        f.write('{"path": "b.pdf", "na')
+
+    journal = UploadJournal(journal_file, root_dir)
+    assert journal.completed(root_dir / "a.pdf")["id"] == "1"
+    assert journal.completed(root_dir / "b.pdf") is None
+    journal.record(root_dir / "b.pdf", "file", "2")
+    journal.record(root_dir / "c.pdf", "file", "3")
+    journal.close()
+
+    journal = UploadJournal(journal_file, root_dir)
+    assert journal.completed(root_dir / "b.pdf")["id"] == "2"
+    assert journal.completed(root_dir / "c.pdf")["id"] == "3"
+    journal.close()